@@ -0,0 +1,201 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.function.Consumer;
+import java.util.function.IntConsumer;
+
+import static com.dynatrace.research.shufflebench.matcher.RangeBasedMatchingRuleIndex.NUM_SLOTS;
+import static com.dynatrace.research.shufflebench.matcher.RangeBasedMatchingRuleIndex.SLOT_WIDTH;
+import static com.dynatrace.research.shufflebench.matcher.RangeBasedMatchingRuleIndex.SLOT_WIDTH_EXPONENT;
+
+/**
+ * Immutable variant of {@link RangeBasedMatchingRuleIndex} for large rule sets that do not change after construction.
+ *
+ * <p>Rules are referred to by their position. Their ranges are stored in primitive arrays and the rules overlapping
+ * each slot are stored contiguously in a single array (compressed sparse row layout). Matching a record therefore
+ * neither walks per-slot lists nor looks up rules by ID, and IDs are only accessed for rules that actually match. Rules
+ * matching all records are kept once instead of in every slot.
+ */
+public class CompactRangeBasedMatchingRuleIndex {
+
+    private static final long HASH_MASK = 0x7fffffffffffffffL;
+
+    final String[] ids;
+
+    final long[] rangeOffsets;
+
+    final long[] rangeWidths;
+
+    // the rules overlapping slot i are slotRules[slotStarts[i]], ..., slotRules[slotStarts[i + 1] - 1]
+    final int[] slotStarts;
+
+    final int[] slotRules;
+
+    final int[] alwaysMatchingRules;
+
+    CompactRangeBasedMatchingRuleIndex(String[] ids, long[] rangeOffsets, long[] rangeWidths) {
+        this.ids = ids;
+        this.rangeOffsets = rangeOffsets;
+        this.rangeWidths = rangeWidths;
+
+        // first pass: count the rules per slot, second pass: place them
+        this.slotStarts = new int[NUM_SLOTS + 1];
+        int numAlwaysMatching = 0;
+        long numEntries = 0;
+        for (int rule = 0; rule < ids.length; ++rule) {
+            if (rangeWidths[rule] < 0L) {
+                numAlwaysMatching++;
+                continue;
+            }
+            int firstSlot = firstSlot(rangeOffsets[rule]);
+            int numSlots = numOverlappingSlots(rangeWidths[rule]);
+            for (int i = 0; i < numSlots; ++i) {
+                slotStarts[((firstSlot + i) & (NUM_SLOTS - 1)) + 1]++;
+            }
+            numEntries += numSlots;
+        }
+        if (numEntries > Integer.MAX_VALUE - 8) {
+            throw new IllegalArgumentException("The rules overlap too many slots to be indexed: " + numEntries);
+        }
+        for (int slotIdx = 0; slotIdx < NUM_SLOTS; ++slotIdx) {
+            slotStarts[slotIdx + 1] += slotStarts[slotIdx];
+        }
+
+        this.slotRules = new int[(int) numEntries];
+        this.alwaysMatchingRules = new int[numAlwaysMatching];
+        final int[] slotEnds = Arrays.copyOf(slotStarts, NUM_SLOTS);
+        int alwaysMatchingIdx = 0;
+        for (int rule = 0; rule < ids.length; ++rule) {
+            if (rangeWidths[rule] < 0L) {
+                alwaysMatchingRules[alwaysMatchingIdx++] = rule;
+                continue;
+            }
+            int firstSlot = firstSlot(rangeOffsets[rule]);
+            int numSlots = numOverlappingSlots(rangeWidths[rule]);
+            for (int i = 0; i < numSlots; ++i) {
+                slotRules[slotEnds[(firstSlot + i) & (NUM_SLOTS - 1)]++] = rule;
+            }
+        }
+    }
+
+    private static int firstSlot(long rangeOffset) {
+        return (int) ((rangeOffset & HASH_MASK) >>> SLOT_WIDTH_EXPONENT);
+    }
+
+    // the slots of RangeBasedMatchingRuleIndex.forEachOverlappingSlot, but each slot at most once
+    private static int numOverlappingSlots(long rangeWidth) {
+        long numSlots = (rangeWidth >>> SLOT_WIDTH_EXPONENT) + 1 + ((rangeWidth & (SLOT_WIDTH - 1)) != 0 ? 1 : 0);
+        return (int) Math.min(numSlots, NUM_SLOTS);
+    }
+
+    /**
+     * Returns the number of rules in this index.
+     */
+    public int size() {
+        return ids.length;
+    }
+
+    /**
+     * Returns the ID of the rule at the given position.
+     */
+    public String getId(int rule) {
+        return ids[rule];
+    }
+
+    /**
+     * Passes the position of each rule matching a record with the given hash value (see
+     * {@link RangeBasedMatchingRule#extractHashValueFromRecord(Record)}) to the consumer.
+     */
+    public void forEachMatchingRule(long hashValue, IntConsumer ruleConsumer) {
+        for (int rule : alwaysMatchingRules) {
+            ruleConsumer.accept(rule);
+        }
+        int slotIdx = (int) ((hashValue & HASH_MASK) >>> SLOT_WIDTH_EXPONENT);
+        for (int i = slotStarts[slotIdx], end = slotStarts[slotIdx + 1]; i < end; ++i) {
+            int rule = slotRules[i];
+            if (((hashValue - rangeOffsets[rule]) & HASH_MASK) < rangeWidths[rule]) {
+                ruleConsumer.accept(rule);
+            }
+        }
+    }
+
+    public void forEachMatchingConsumer(Record record, Consumer<String> consumer) {
+        forEachMatchingRule(RangeBasedMatchingRule.extractHashValueFromRecord(record), rule -> consumer.accept(ids[rule]));
+    }
+
+    /**
+     * Builds an index of the given rules, where the i-th rule has the i-th ID. The IDs must be distinct.
+     */
+    static CompactRangeBasedMatchingRuleIndex of(List<String> ids, List<RangeBasedMatchingRule> rules) {
+        final long[] rangeOffsets = new long[rules.size()];
+        final long[] rangeWidths = new long[rules.size()];
+        for (int rule = 0; rule < rules.size(); ++rule) {
+            rangeOffsets[rule] = rules.get(rule).getRangeOffset();
+            rangeWidths[rule] = rules.get(rule).getRangeWidth();
+        }
+        return new CompactRangeBasedMatchingRuleIndex(ids.toArray(new String[0]), rangeOffsets, rangeWidths);
+    }
+
+    void addMatches(long hashValue, int recordIndex, MatchBuffer matches) {
+        for (int rule : alwaysMatchingRules) {
+            matches.add(ids[rule], recordIndex);
+        }
+        int slotIdx = (int) ((hashValue & HASH_MASK) >>> SLOT_WIDTH_EXPONENT);
+        for (int i = slotStarts[slotIdx], end = slotStarts[slotIdx + 1]; i < end; ++i) {
+            int rule = slotRules[i];
+            if (((hashValue - rangeOffsets[rule]) & HASH_MASK) < rangeWidths[rule]) {
+                matches.add(ids[rule], recordIndex);
+            }
+        }
+    }
+
+    public static Builder builder() {
+        return new Builder();
+    }
+
+    /**
+     * Collects rules for a {@link CompactRangeBasedMatchingRuleIndex}. Adding a rule with an ID that was already added
+     * replaces the previous rule.
+     */
+    public static class Builder {
+
+        private final List<String> ids = new ArrayList<>();
+
+        private final Map<String, Integer> positions = new HashMap<>();
+
+        private long[] rangeOffsets = new long[16];
+
+        private long[] rangeWidths = new long[16];
+
+        private Builder() {
+        }
+
+        public Builder add(String id, RangeBasedMatchingRule matchingRule) {
+            Integer position = positions.putIfAbsent(id, ids.size());
+            int rule = position != null ? position : ids.size();
+            if (position == null) {
+                ids.add(id);
+                if (rule == rangeOffsets.length) {
+                    rangeOffsets = Arrays.copyOf(rangeOffsets, 2 * rule);
+                    rangeWidths = Arrays.copyOf(rangeWidths, 2 * rule);
+                }
+            }
+            rangeOffsets[rule] = matchingRule.getRangeOffset();
+            rangeWidths[rule] = matchingRule.getRangeWidth();
+            return this;
+        }
+
+        public CompactRangeBasedMatchingRuleIndex build() {
+            return new CompactRangeBasedMatchingRuleIndex(
+                    ids.toArray(new String[0]),
+                    Arrays.copyOf(rangeOffsets, ids.size()),
+                    Arrays.copyOf(rangeWidths, ids.size()));
+        }
+    }
+}
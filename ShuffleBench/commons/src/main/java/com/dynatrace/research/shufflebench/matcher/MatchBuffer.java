@@ -0,0 +1,84 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.util.Arrays;
+
+/**
+ * Reusable buffer for the matches of a batch of records, filled by
+ * {@link MatcherService#match(Record[], int, MatchBuffer)}.
+ *
+ * <p>The i-th match consists of the ID of the matching rule and the index of the matched record in the batch. The
+ * arrays only grow, so matching further batches with the same buffer does not allocate once it is large enough. A
+ * buffer must not be used by several threads at the same time.
+ */
+public class MatchBuffer {
+
+  private String[] ruleIds;
+
+  private int[] recordIndices;
+
+  private int size;
+
+  private long[] hashValues = new long[0];
+
+  public MatchBuffer() {
+    this(64);
+  }
+
+  public MatchBuffer(int initialCapacity) {
+    this.ruleIds = new String[initialCapacity];
+    this.recordIndices = new int[initialCapacity];
+  }
+
+  /**
+   * Returns the number of matches.
+   */
+  public int size() {
+    return size;
+  }
+
+  /**
+   * Returns the ID of the rule of the i-th match.
+   */
+  public String getRuleId(int i) {
+    return ruleIds[i];
+  }
+
+  /**
+   * Returns the index of the record of the i-th match.
+   */
+  public int getRecordIndex(int i) {
+    return recordIndices[i];
+  }
+
+  public void clear() {
+    Arrays.fill(ruleIds, 0, size, null); // do not keep IDs of removed rules alive
+    size = 0;
+  }
+
+  public void add(String ruleId, int recordIndex) {
+    if (size == ruleIds.length) {
+      final int capacity = Math.max(2 * size, 16);
+      ruleIds = Arrays.copyOf(ruleIds, capacity);
+      recordIndices = Arrays.copyOf(recordIndices, capacity);
+    }
+    ruleIds[size] = ruleId;
+    recordIndices[size] = recordIndex;
+    size++;
+  }
+
+  /**
+   * Returns the hash values (see {@link RangeBasedMatchingRule#extractHashValueFromRecord(Record)}) of the first
+   * {@code numRecords} records, computed up front for the whole batch.
+   */
+  long[] hashValues(Record[] records, int numRecords) {
+    if (hashValues.length < numRecords) {
+      hashValues = new long[Math.max(numRecords, 2 * hashValues.length)];
+    }
+    for (int i = 0; i < numRecords; i++) {
+      hashValues[i] = RangeBasedMatchingRule.extractHashValueFromRecord(records[i]);
+    }
+    return hashValues;
+  }
+}
@@ -22,10 +22,17 @@ public class RangeBasedMatchingRule implements MatchingRule {
 
     @Override
     public boolean test(Record record) {
+        return rangeWidth < 0 || test(extractHashValueFromRecord(record));
+    }
+
+    /**
+     * Tests a record with the given hash value (see {@link #extractHashValueFromRecord(Record)}).
+     */
+    public boolean test(long hashValue) {
         if (rangeWidth < 0) {
             return true;
         } else {
-            return ((extractHashValueFromRecord(record) - rangeOffset) & 0x7fffffffffffffffL) < rangeWidth;
+            return ((hashValue - rangeOffset) & 0x7fffffffffffffffL) < rangeWidth;
         }
     }
 
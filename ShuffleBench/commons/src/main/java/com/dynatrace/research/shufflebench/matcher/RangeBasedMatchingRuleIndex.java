@@ -11,16 +11,59 @@ import static java.util.stream.Collectors.toList;
 
 public class RangeBasedMatchingRuleIndex {
 
-    private static final int NUM_SLOT_EXPONENT = 16;
-    private static final int NUM_SLOTS = 1 << NUM_SLOT_EXPONENT;
-    private static final int SLOT_WIDTH_EXPONENT = 63 - NUM_SLOT_EXPONENT;
-    private static final long SLOT_WIDTH = 1L << SLOT_WIDTH_EXPONENT;
+    static final int NUM_SLOT_EXPONENT = 16;
+    static final int NUM_SLOTS = 1 << NUM_SLOT_EXPONENT;
+    static final int SLOT_WIDTH_EXPONENT = 63 - NUM_SLOT_EXPONENT;
+    static final long SLOT_WIDTH = 1L << SLOT_WIDTH_EXPONENT;
 
-    private final List<List<String>> index = Stream.generate(ArrayList<String>::new).limit(NUM_SLOTS).collect(toList());
+    private final List<List<String>> index;
 
-    private final Map<String, RangeBasedMatchingRule> matchingRules = new HashMap<>();
+    private final Map<String, RangeBasedMatchingRule> matchingRules;
 
-    private void forEachOverlappingSlot(RangeBasedMatchingRule matchingRule, IntConsumer slotIndexConsumer) {
+    public RangeBasedMatchingRuleIndex() {
+        this(Stream.generate(ArrayList<String>::new).limit(NUM_SLOTS).collect(toList()), new HashMap<>());
+    }
+
+    private RangeBasedMatchingRuleIndex(List<List<String>> index, Map<String, RangeBasedMatchingRule> matchingRules) {
+        this.index = index;
+        this.matchingRules = matchingRules;
+    }
+
+    /**
+     * Builds an index of the given rules, where the i-th rule has the i-th ID. In contrast to adding the rules one by
+     * one, the slot lists are allocated with their final sizes and no rule needs to be removed first, so the IDs must
+     * be distinct.
+     */
+    static RangeBasedMatchingRuleIndex of(List<String> ids, List<RangeBasedMatchingRule> rules) {
+        final int[] slotSizes = new int[NUM_SLOTS];
+        for (RangeBasedMatchingRule rule : rules) {
+            forEachOverlappingSlot(rule, slotIdx -> slotSizes[slotIdx]++);
+        }
+        final List<List<String>> index = new ArrayList<>(NUM_SLOTS);
+        for (int slotSize : slotSizes) {
+            index.add(new ArrayList<>(slotSize));
+        }
+        final Map<String, RangeBasedMatchingRule> matchingRules = new HashMap<>((int) (rules.size() / 0.75f) + 1);
+        for (int i = 0; i < rules.size(); ++i) {
+            final String id = ids.get(i);
+            matchingRules.put(id, rules.get(i));
+            forEachOverlappingSlot(rules.get(i), slotIdx -> index.get(slotIdx).add(id));
+        }
+        return new RangeBasedMatchingRuleIndex(index, matchingRules);
+    }
+
+    /**
+     * Returns an independent copy of this index.
+     */
+    RangeBasedMatchingRuleIndex copy() {
+        final List<List<String>> indexCopy = new ArrayList<>(NUM_SLOTS);
+        for (List<String> slot : index) {
+            indexCopy.add(new ArrayList<>(slot));
+        }
+        return new RangeBasedMatchingRuleIndex(indexCopy, new HashMap<>(matchingRules));
+    }
+
+    private static void forEachOverlappingSlot(RangeBasedMatchingRule matchingRule, IntConsumer slotIndexConsumer) {
         long offset = matchingRule.getRangeOffset();
         long rangeWidth = matchingRule.getRangeWidth();
         if (rangeWidth < 0L) {
@@ -61,4 +104,13 @@ public class RangeBasedMatchingRuleIndex {
             if (matchingRules.get(id).test(record)) consumer.accept(id);
         }
     }
+
+    void addMatches(long hashValue, int recordIndex, MatchBuffer matches) {
+        int slotIdx = (int) ((hashValue & 0x7fffffffffffffffL) >>> SLOT_WIDTH_EXPONENT);
+        List<String> slot = index.get(slotIdx);
+        for (int i = 0; i < slot.size(); ++i) {
+            String id = slot.get(i);
+            if (matchingRules.get(id).test(hashValue)) matches.add(id, recordIndex);
+        }
+    }
 }
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from src.demand import OPERATORS, multi_metric_runs, suitable_configurations
+
+def crossing_load(lower_load, lower_value, upper_load, upper_value, threshold):
+    """
+    Linearly interpolates the load at which an SLI crosses the threshold between a load meeting
+    the SLO and the next tested load violating it. The result lies within both loads. If either
+    value is NaN, e.g., as the metric is missing for a run, the crossing cannot be estimated and
+    the load meeting the SLO is returned.
+    """
+    if np.isnan(lower_value) or np.isnan(upper_value) or upper_value == lower_value:
+        return lower_load
+    load = lower_load + (threshold - lower_value) * (upper_load - lower_load) / (upper_value - lower_value)
+    return min(max(load, lower_load), upper_load)
+
+def capacity_from_medians(medians, slos, interpolate=False):
+    """
+    Computes the maximal load meeting all SLOs per amount of resources from the output of
+    `suitable_configurations`. With `interpolate`, the capacity is placed between the highest
+    suitable load and the next tested load, where the first violated SLI is estimated to cross its
+    threshold. Amounts of resources without any suitable load are omitted.
+    """
+    capacities = []
+    for resources, configurations in medians.sort_values('load').groupby('resources'):
+        suitable = configurations.loc[configurations['suitable']]
+        if len(suitable) == 0:
+            continue
+        lower = suitable.iloc[-1]
+        capacity = lower['load']
+        higher = configurations.loc[configurations['load'] > capacity]
+        if interpolate and len(higher) > 0:
+            upper = higher.iloc[0]
+            # The capacity ends where the first of the violated SLOs is violated
+            capacity = min((crossing_load(lower['load'], lower[column], upper['load'], upper[column], threshold)
+                            for column, slo_operator, threshold in slos
+                            if not OPERATORS[slo_operator](upper[column], threshold)),
+                           default=capacity)
+        capacities.append({'resource': resources, 'loads': capacity})
+    return pd.DataFrame(capacities, columns=['resource', 'loads'])
+
+def capacity(exp_id, directory, threshold, warmup_sec, slis=None, slos=None, interpolate=False, ratios=None, index_path=None, workers=None):
+    """
+    Computes Theodolite's capacity metric, the maximal load per amount of resources for which the
+    median lag trend slope is below `threshold`, from the raw lag trend series. The result has the
+    format of the `exp<exp_id>_capacity.csv` files written by Theodolite. Slopes are taken from the
+    same index as for `demand` (see `lag_trend_runs` for `index_path` and `workers`). Further SLOs
+    on generic metrics and their ratios can be given as for `multi_metric_demand`. With
+    `interpolate`, the capacity is interpolated between the tested loads (see `capacity_from_medians`).
+    """
+    runs = multi_metric_runs(exp_id, directory, slis, ratios, warmup_sec, index_path, workers)
+    slos = [('trend_slope', 'lt', threshold)] + list(slos or [])
+    return capacity_from_medians(suitable_configurations(runs, slos), slos, interpolate)
@@ -1,51 +1,241 @@
+import json
+import operator
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from datetime import datetime, timedelta, timezone
+import numpy as np
 import pandas as pd
 from pandas.core.frame import DataFrame
-from sklearn.linear_model import LinearRegression
 
-def demand(exp_id, directory, threshold, warmup_sec):
-    raw_runs = []
+INDEX_FILENAME = '.demand-index.json'
+INDEX_VERSION = 1
+
+OPERATORS = {'lt': operator.lt, 'lte': operator.le, 'gt': operator.gt, 'gte': operator.ge}
+
+# exp<exp_id>_<load>_<resources>_generic_<metric>_<repetition>.csv, metric names may contain underscores
+GENERIC_FILENAME_PATTERN = re.compile(r'^exp(\d+)_(\d+)_(\d+)_generic_(.+)_(\d+)\.csv$')
+
+def parse_run_filename(filename):
+    """
+    Returns (exp_id, load, resources, repetition) of a lag trend CSV file, which is named
+    exp<exp_id>_<load>_<resources>_lag-trend_<slo name>_<repetition>.csv, or None for other files,
+    e.g., copies named exp<exp_id>_<load>_<resources>_lag-trend_<slo name>_<repetition>_old.csv.
+    """
+    if not (filename.startswith("exp") and "lag-trend" in filename and filename.endswith(".csv")):
+        return None
+    run_params = filename[:-4].split("_")
+    try:
+        return run_params[0][3:], int(run_params[1]), int(run_params[2]), int(run_params[-1])
+    except (IndexError, ValueError):
+        return None
+
+def read_series(path):
+    # Only parse the timestamp and value columns of a lag trend or generic metric series, with fixed types
+    return pd.read_csv(path, usecols=['timestamp', 'value'], dtype={'timestamp': np.float64, 'value': np.float64})
+
+def least_squares_slope(x, y):
+    """
+    Closed-form least-squares slope of `y` over `x`, as computed by the record-lag SLO checker.
+    Values are centered before summing, so large unix timestamps do not cost precision.
+    """
+    if len(x) == 0:
+        raise ValueError('Cannot compute the trend slope of an empty series.')
+    dx = x - x.mean()
+    sxx = np.dot(dx, dx)
+    # Without variance in x the slope is not defined; report 0 like sklearn's LinearRegression
+    return float(np.dot(dx, y - y.mean()) / sxx) if sxx != 0 else 0.0
+
+def trend_slope(path, warmup_sec):
+    input = read_series(path)
+    timestamps = input['timestamp'].to_numpy()
+    values = input['value'].to_numpy()
+
+    regress = timestamps - timestamps[0] >= warmup_sec # Warm-Up
+
+    return least_squares_slope(timestamps[regress], values[regress])
+
+def load_index(index_path):
+    try:
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+    return index['runs'] if index.get('version') == INDEX_VERSION else {}
+
+def save_index(index_path, runs):
+    # Write to a temporary file first, so that an interrupted analysis leaves a valid index
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, 'w') as index_file:
+        json.dump({'version': INDEX_VERSION, 'runs': runs}, index_file)
+    os.replace(temp_path, index_path)
+
+def trend_slopes(paths, warmup_sec, workers=None):
+    """
+    Computes the trend slopes of the given lag trend CSV files, concurrently in a pool of
+    `workers` processes (default: number of CPUs) if there is more than one file.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        return [trend_slope(path, warmup_sec) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        return list(executor.map(trend_slope, paths, repeat(warmup_sec)))
+
+def lag_trend_runs(exp_id, directory, warmup_sec, index_path=None, workers=None):
+    """
+    Returns the trend slope of each run of an experiment as a DataFrame with the columns load,
+    resources, repetition and trend_slope. The trend slope of each run is stored in an index file
+    (by default `.demand-index.json` in `directory`) along with the modification time and size of
+    its CSV file, so that only new or modified runs are read again. Pass `index_path=False` to
+    compute all slopes without an index. Slopes of new runs are computed by `workers` processes
+    (default: number of CPUs).
+    """
+    if index_path is None:
+        index_path = os.path.join(directory, INDEX_FILENAME)
+    index = load_index(index_path) if index_path else {}
+    index_changed = False
+    indexed_runs = []
+    unindexed_paths = []
 
     # Compute SLI, i.e., lag trend, for each tested configuration
-    filenames = [filename for filename in os.listdir(directory) if filename.startswith(f"exp{exp_id}") and "lag-trend" in filename and filename.endswith(".csv")]
-    for filename in filenames:
-        run_params = filename[:-4].split("_")
-        dim_value = run_params[1]
-        instances = run_params[2]
+    run_filenames = set()
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            run = parse_run_filename(entry.name)
+            if run is None:
+                continue
+            run_filenames.add(entry.name)
+            run_exp_id, load, resources, repetition = run
+            if run_exp_id != str(exp_id):
+                continue
+
+            stat = entry.stat()
+            indexed_run = index.get(entry.name)
+            if indexed_run is None or indexed_run['mtime'] != stat.st_mtime_ns or indexed_run['size'] != stat.st_size:
+                indexed_run = index[entry.name] = {
+                    'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'exp_id': run_exp_id, 'load': load,
+                    'resources': resources, 'repetition': repetition, 'trend_slopes': {}}
+            # Slopes depend on the warmup, so they are indexed per warmup
+            if str(warmup_sec) not in indexed_run['trend_slopes']:
+                unindexed_paths.append((entry.path, indexed_run))
+            indexed_runs.append(indexed_run)
+
+    for slope, (_, indexed_run) in zip(trend_slopes([path for path, _ in unindexed_paths], warmup_sec, workers), unindexed_paths):
+        indexed_run['trend_slopes'][str(warmup_sec)] = slope
+        index_changed = True
 
-        df = pd.read_csv(os.path.join(directory, filename))
-        input = df
+    # Forget runs whose files were removed
+    for filename in set(index) - run_filenames:
+        del index[filename]
+        index_changed = True
+    if index_path and index_changed:
+        save_index(index_path, index)
 
-        input['sec_start'] = input.loc[0:, 'timestamp'] - input.iloc[0]['timestamp']
-    
-        regress = input.loc[input['sec_start'] >= warmup_sec] # Warm-Up
+    return pd.DataFrame({
+        'load': [run['load'] for run in indexed_runs],
+        'resources': [run['resources'] for run in indexed_runs],
+        'repetition': [run['repetition'] for run in indexed_runs],
+        'trend_slope': [run['trend_slopes'][str(warmup_sec)] for run in indexed_runs]})
 
-        X = regress.iloc[:, 1].values.reshape(-1, 1)  # values converts it into a numpy array
-        Y = regress.iloc[:, 2].values.reshape(-1, 1)  # -1 means that calculate the dimension of rows, but have 1 column
+def aggregate_sli(values, aggregation):
+    # Percentiles are given as 'p99', 'p99.9', etc. as for the generic SLO checker
+    if re.fullmatch(r'p\d\d?(\.\d+)?', aggregation):
+        return values.quantile(float(aggregation[1:]) / 100)
+    return values.aggregate(aggregation)
 
-        linear_regressor = LinearRegression()  # create object for the class
-        linear_regressor.fit(X, Y)  # perform linear regression
-        Y_pred = linear_regressor.predict(X)  # make predictions
+def generic_sli_runs(exp_id, directory, slis, warmup_sec):
+    """
+    Aggregates the generic metrics recorded for each run of an experiment. `slis` maps the
+    column names of the returned DataFrame to (metric, aggregation) pairs, for example
+    `{'latency': ('latency_p99_120s', 'median')}`. The returned DataFrame has the columns
+    load, resources, repetition and one column per SLI. Runs lacking a metric get NaN.
+    """
+    columns = {column: {} for column in slis}
+    for filename in os.listdir(directory):
+        match = GENERIC_FILENAME_PATTERN.match(filename)
+        if match is None or match.group(1) != str(exp_id):
+            continue
+        run = int(match.group(2)), int(match.group(3)), int(match.group(5))
+        for column, (metric, aggregation) in slis.items():
+            if match.group(4) == metric:
+                input = read_series(os.path.join(directory, filename))
+                values = input.loc[input['timestamp'] - input['timestamp'].iloc[0] >= warmup_sec, 'value'] # Warm-Up
+                columns[column][run] = aggregate_sli(values, aggregation)
 
-        trend_slope = linear_regressor.coef_[0][0]
+    runs = sorted(set(run for values in columns.values() for run in values))
+    sli_runs = pd.DataFrame(runs, columns=['load', 'resources', 'repetition'])
+    for column, values in columns.items():
+        sli_runs[column] = [values.get(run, np.nan) for run in runs]
+    return sli_runs
 
-        row = {'load': int(dim_value), 'resources': int(instances), 'trend_slope': trend_slope}
-        raw_runs.append(row)
+def add_ratio_slis(runs, ratios):
+    """
+    Adds the ratio of two SLI columns of `runs` per run as a further SLI. `ratios` maps the new
+    column names to (numerator, denominator) column pairs, for example the ratio of output to input
+    throughput `{'throughput_ratio': ('output_throughput', 'input_throughput')}`.
+    """
+    for column, (numerator, denominator) in ratios.items():
+        runs[column] = runs[numerator] / runs[denominator]
+    return runs
 
-    runs = pd.DataFrame(raw_runs)
+def multi_metric_runs(exp_id, directory, slis, ratios, warmup_sec, index_path=None, workers=None):
+    """
+    Returns the lag trend slope (see `lag_trend_runs`), the SLIs aggregated from the generic metrics
+    (see `generic_sli_runs`) and the ratio SLIs (see `add_ratio_slis`) of each run of an experiment.
+    """
+    runs = lag_trend_runs(exp_id, directory, warmup_sec, index_path, workers)
+    if slis:
+        runs = runs.merge(generic_sli_runs(exp_id, directory, slis, warmup_sec), on=['load', 'resources', 'repetition'], how='left')
+    return add_ratio_slis(runs, ratios or {})
 
+def suitable_configurations(runs, slos):
+    """
+    Takes the median of each SLI over the repetitions of each (load, resources) configuration and
+    adds a column `suitable`, which is True if all `slos` are met. `slos` is a list of
+    (column, operator, threshold) tuples with the operators lt, lte, gt and gte. SLIs derived from
+    several metrics, e.g., the ratio of output to input throughput, can be added as columns of
+    `runs` beforehand (see `add_ratio_slis`).
+    """
+    sli_columns = list(dict.fromkeys(column for column, _, _ in slos))
     # Group by the load and resources to handle repetitions, and take from the reptitions the median
     # for even reptitions, the mean of the two middle values is used
-    medians = runs.groupby(by=['load', 'resources'], as_index=False).median()
+    medians = runs.groupby(by=['load', 'resources'], as_index=False)[sli_columns].median()
 
-    # Set suitable = True if SLOs are met, i.e., lag trend slope is below threshold
-    medians["suitable"] =  medians.apply(lambda row: row['trend_slope'] < threshold, axis=1)
+    # Set suitable = True if all SLOs are met, comparing whole columns at once
+    suitable = np.ones(len(medians), dtype=bool)
+    for column, slo_operator, threshold in slos:
+        suitable &= OPERATORS[slo_operator](medians[column].to_numpy(), threshold)
+    medians["suitable"] = suitable
+    return medians
 
-    suitable = medians[medians.apply(lambda x: x['suitable'], axis=1)]
-    
+def minimal_demand(medians):
     # Compute minimal demand per load intensity
-    demand_per_load = suitable.groupby(by=['load'], as_index=False)['resources'].min()
-    
-    return demand_per_load
+    return medians.loc[medians["suitable"]].groupby(by=['load'], as_index=False)['resources'].min()
+
+def demand(exp_id, directory, threshold, warmup_sec, index_path=None, workers=None):
+    """
+    Computes the minimal resources per load for which the median lag trend slope is below
+    `threshold`. See `lag_trend_runs` for `index_path` and `workers`.
+    """
+    runs = lag_trend_runs(exp_id, directory, warmup_sec, index_path, workers)
+    # Set suitable = True if SLOs are met, i.e., lag trend slope is below threshold
+    medians = suitable_configurations(runs, [('trend_slope', 'lt', threshold)])
+    return minimal_demand(medians)
+
+def multi_metric_demand(exp_id, directory, slis, slos, warmup_sec, ratios=None, index_path=None, workers=None):
+    """
+    Computes the minimal resources per load for which all `slos` are met. The lag trend slope is
+    available as the SLI `trend_slope`, further SLIs are aggregated from the generic metrics as
+    specified by `slis` (see `generic_sli_runs`) and computed as ratios of two SLIs per run as
+    specified by `ratios` (see `add_ratio_slis`), for example:
 
+        multi_metric_demand(1, 'results',
+                            {'latency': ('latency_p99_120s', 'p95'),
+                             'output_throughput': ('output_throughput', 'mean'),
+                             'input_throughput': ('input_throughput', 'mean')},
+                            [('trend_slope', 'lt', 2000), ('latency', 'lt', 1.0), ('throughput_ratio', 'gte', 0.99)],
+                            300, ratios={'throughput_ratio': ('output_throughput', 'input_throughput')})
+    """
+    runs = multi_metric_runs(exp_id, directory, slis, ratios, warmup_sec, index_path, workers)
+    return minimal_demand(suitable_configurations(runs, slos))
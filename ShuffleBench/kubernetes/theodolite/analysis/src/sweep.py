@@ -0,0 +1,134 @@
+"""
+Recommends the next load and resource configurations to benchmark from existing results, so that
+the capacity of each amount of resources is bracketed with few executions. Run from the analysis
+directory, for example:
+
+    python -m src.sweep 2 ../results ../../../evaluation/edge/kstreams-baseline-ft.yaml --threshold 2000 --warmup 300 --resources 1 2 3 4
+"""
+import argparse
+import re
+import numpy as np
+import pandas as pd
+from src.capacity import capacity_from_medians
+from src.demand import lag_trend_runs, suitable_configurations
+
+def capacity_brackets(medians):
+    """
+    Returns per amount of resources the highest tested load meeting the SLOs (`lower`, NaN if none
+    does) and the lowest tested load above it violating them (`upper`, NaN if none does).
+    """
+    brackets = []
+    for resources, configurations in medians.sort_values('load').groupby('resources'):
+        suitable_loads = configurations.loc[configurations['suitable'], 'load']
+        lower = suitable_loads.max() if len(suitable_loads) else np.nan
+        failed_loads = configurations.loc[~configurations['suitable'] & ~(configurations['load'] <= lower), 'load']
+        upper = failed_loads.min() if len(failed_loads) else np.nan
+        brackets.append({'resources': resources, 'lower': lower, 'upper': upper})
+    return pd.DataFrame(brackets, columns=['resources', 'lower', 'upper'])
+
+def fit_scalability(capacities):
+    """
+    Fits a linear scalability model `load = slope * resources + intercept` to capacities as
+    computed by `capacity_from_medians`. With a single amount of resources, the capacity is
+    assumed to be proportional to the resources.
+    """
+    resources = capacities['resource'].to_numpy(dtype=np.float64)
+    loads = capacities['loads'].to_numpy(dtype=np.float64)
+    if len(resources) == 0:
+        raise ValueError('No configuration meets the SLOs, cannot fit a scalability model.')
+    if len(np.unique(resources)) == 1:
+        return loads.mean() / resources[0], 0.0
+    slope, intercept = np.polyfit(resources, loads, 1)
+    return slope, intercept
+
+def round_load(load, load_step):
+    return int(max(load_step, round(load / load_step) * load_step))
+
+def recommend(medians, slos, resource_values=None, resolution=0.1, load_step=500):
+    """
+    Recommends one load per amount of resources (the tested ones and `resource_values`) that
+    narrows down its capacity the most:
+
+    * if the capacity is bracketed by a suitable and a failed load that differ by more than
+      `resolution` (relative), the load in between, where the violated SLIs are interpolated to
+      cross their thresholds (bisection if that load was already tested),
+    * if all tested loads are suitable, the capacity predicted by the scalability model or twice
+      the highest tested load, whichever is higher,
+    * if no tested load is suitable, half of the lowest tested load,
+    * for amounts of resources not tested yet, the capacity predicted by the scalability model.
+
+    Returns a DataFrame with the columns resources, load and reason, without capacities that are
+    already known precisely enough.
+    """
+    capacities = capacity_from_medians(medians, slos, interpolate=True)
+    brackets = capacity_brackets(medians).set_index('resources')
+    # Capacities without a failed load are only lower bounds, fit the model to the others if possible
+    bracketed = capacities.loc[capacities['resource'].map(brackets['upper']).notna()]
+    slope, intercept = fit_scalability(bracketed if len(bracketed) else capacities)
+    predicted = capacities.set_index('resource')['loads']
+    tested_loads = set(zip(medians['resources'], medians['load']))
+
+    recommendations = []
+    for resources in sorted(set(brackets.index) | set(resource_values or [])):
+        model_load = slope * resources + intercept
+        if resources not in brackets.index:
+            load, reason = model_load, 'untested resources, predicted capacity'
+        else:
+            lower, upper = brackets.loc[resources, 'lower'], brackets.loc[resources, 'upper']
+            tested = medians.loc[medians['resources'] == resources, 'load']
+            if np.isnan(lower):
+                load, reason = tested.min() / 2, 'no suitable load'
+            elif np.isnan(upper):
+                load, reason = max(model_load, 2 * lower), 'no failed load'
+            elif (upper - lower) / upper > resolution:
+                load, reason = predicted[resources], 'interpolated capacity'
+                if round_load(load, load_step) in (lower, upper) or (resources, round_load(load, load_step)) in tested_loads:
+                    load, reason = (lower + upper) / 2, 'bisection'
+            else:
+                continue
+        load = round_load(load, load_step)
+        if (resources, load) not in tested_loads:
+            recommendations.append({'resources': int(resources), 'load': load, 'reason': reason})
+    return pd.DataFrame(recommendations, columns=['resources', 'load', 'reason'])
+
+def render_executions(template, recommendations):
+    """
+    Renders one Theodolite execution per recommended amount of resources from an execution YAML
+    `template` by replacing its name, `loadValues` and `resourceValues`. Comments and all other
+    settings of the template are kept. Returns a multi-document YAML string.
+    """
+    name = re.search(r'^  name:\s*(\S+)\s*$', template, re.MULTILINE).group(1)
+    documents = []
+    for resources, loads in recommendations.groupby('resources')['load']:
+        document = re.sub(r'^  name:\s*\S+\s*$', f'  name: {name}-r{resources}', template, count=1, flags=re.MULTILINE)
+        document = re.sub(r'(loadValues:\s*)\[[^\]]*\]', lambda m: m.group(1) + '[' + ', '.join(str(load) for load in sorted(loads)) + ']', document)
+        document = re.sub(r'(resourceValues:\s*)\[[^\]]*\]', lambda m: m.group(1) + f'[{resources}]', document)
+        documents.append(document.rstrip('\n') + '\n')
+    return '---\n'.join(documents)
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommend the next configurations to benchmark.')
+    parser.add_argument('exp_id', help='ID of the experiment whose results are analyzed')
+    parser.add_argument('directory', help='directory with the results')
+    parser.add_argument('template', help='execution YAML to use as template')
+    parser.add_argument('--threshold', type=float, default=2000, help='maximal lag trend slope')
+    parser.add_argument('--warmup', type=int, default=300, help='warmup in seconds')
+    parser.add_argument('--resources', type=int, nargs='*', default=[], help='further amounts of resources to recommend loads for')
+    parser.add_argument('--resolution', type=float, default=0.1, help='relative width of a capacity bracket that is precise enough')
+    parser.add_argument('--load-step', type=int, default=500, help='granularity of the recommended loads')
+    args = parser.parse_args()
+
+    slos = [('trend_slope', 'lt', args.threshold)]
+    medians = suitable_configurations(lag_trend_runs(args.exp_id, args.directory, args.warmup), slos)
+    recommendations = recommend(medians, slos, args.resources, args.resolution, args.load_step)
+    if len(recommendations) == 0:
+        print('# All capacities are known with the requested resolution.')
+        return
+    with open(args.template) as template_file:
+        template = template_file.read()
+    for _, row in recommendations.iterrows():
+        print(f"# {row['resources']} resources, load {row['load']}: {row['reason']}")
+    print(render_executions(template, recommendations), end='')
+
+if __name__ == '__main__':
+    main()
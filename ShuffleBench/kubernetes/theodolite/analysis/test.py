@@ -0,0 +1,159 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src import capacity, demand, sweep
+
+def write_run(directory, filename, slope, samples=10):
+    with open(os.path.join(directory, filename), 'w') as csv_file:
+        csv_file.write('timestamp,value\n')
+        for second in range(samples):
+            csv_file.write(f'{1600000000 + second},{slope * second}\n')
+
+class TestDemand(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.results = self.directory.name
+        self.index_path = os.path.join(self.results, demand.INDEX_FILENAME)
+
+    def lag_trend_runs(self):
+        runs = demand.lag_trend_runs(1, self.results, 0, workers=1)
+        return runs.sort_values(by=['load', 'resources', 'repetition']).reset_index(drop=True)
+
+    def test_parse_run_filename(self):
+        self.assertEqual(demand.parse_run_filename('exp1_100_2_lag-trend_lag_0.csv'), ('1', 100, 2, 0))
+        self.assertIsNone(demand.parse_run_filename('exp1_100_2_lag-trend_lag_0_old.csv'))
+        self.assertIsNone(demand.parse_run_filename('exp1_lag-trend.csv'))
+        self.assertIsNone(demand.parse_run_filename('exp1_100_2_generic_latency_0.csv'))
+
+    def test_least_squares_slope(self):
+        x = np.arange(1600000000, 1600000100, dtype=np.float64)
+        self.assertAlmostEqual(demand.least_squares_slope(x, 3 * x + 7), 3)
+        self.assertAlmostEqual(demand.least_squares_slope(x, np.sin(x)), np.polyfit(x - x[0], np.sin(x), 1)[0])
+        self.assertEqual(demand.least_squares_slope(np.full(3, 5.0), np.arange(3.0)), 0)
+        self.assertRaises(ValueError, demand.least_squares_slope, np.empty(0), np.empty(0))
+
+    def test_index_hit(self):
+        write_run(self.results, 'exp1_100_1_lag-trend_lag_0.csv', 1)
+        write_run(self.results, 'exp1_200_1_lag-trend_lag_0.csv', 3)
+        write_run(self.results, 'exp2_100_1_lag-trend_lag_0.csv', 5) # other experiment
+        runs = self.lag_trend_runs()
+        self.assertEqual(runs['load'].tolist(), [100, 200])
+        self.assertEqual([round(slope, 6) for slope in runs['trend_slope']], [1, 3])
+        self.assertTrue(os.path.exists(self.index_path))
+
+        with mock.patch.object(demand, 'trend_slope', side_effect=AssertionError('slope recomputed')):
+            self.assertTrue(self.lag_trend_runs().equals(runs))
+
+    def test_index_invalidation(self):
+        filename = 'exp1_100_1_lag-trend_lag_0.csv'
+        path = os.path.join(self.results, filename)
+        write_run(self.results, filename, 1)
+        self.lag_trend_runs()
+
+        write_run(self.results, filename, 2, samples=20) # other size
+        self.assertAlmostEqual(self.lag_trend_runs()['trend_slope'][0], 2)
+
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000)) # same size, other mtime
+        with mock.patch.object(demand, 'trend_slope', wraps=demand.trend_slope) as trend_slope:
+            self.assertAlmostEqual(self.lag_trend_runs()['trend_slope'][0], 2)
+        self.assertEqual(trend_slope.call_count, 1)
+
+    def test_index_new_and_removed_runs(self):
+        write_run(self.results, 'exp1_100_1_lag-trend_lag_0.csv', 1)
+        self.lag_trend_runs()
+
+        write_run(self.results, 'exp1_100_1_lag-trend_lag_1.csv', 3)
+        with mock.patch.object(demand, 'trend_slope', wraps=demand.trend_slope) as trend_slope:
+            runs = self.lag_trend_runs()
+        self.assertEqual(runs['repetition'].tolist(), [0, 1])
+        self.assertEqual(trend_slope.call_count, 1)
+
+        os.remove(os.path.join(self.results, 'exp1_100_1_lag-trend_lag_0.csv'))
+        self.assertEqual(self.lag_trend_runs()['repetition'].tolist(), [1])
+        self.assertEqual(list(demand.load_index(self.index_path)), ['exp1_100_1_lag-trend_lag_1.csv'])
+
+    def test_multi_metric_demand_throughput_ratio(self):
+        for load, resources, output_throughput in [(100, 1, 100), (100, 2, 100), (200, 1, 150), (200, 2, 200)]:
+            write_run(self.results, f'exp1_{load}_{resources}_lag-trend_lag_0.csv', 0)
+            write_run(self.results, f'exp1_{load}_{resources}_generic_input_0.csv', 0)
+            write_run(self.results, f'exp1_{load}_{resources}_generic_output_0.csv', 0)
+            with open(os.path.join(self.results, f'exp1_{load}_{resources}_generic_input_0.csv'), 'a') as csv_file:
+                csv_file.write(f'1600000010,{load}\n')
+            with open(os.path.join(self.results, f'exp1_{load}_{resources}_generic_output_0.csv'), 'a') as csv_file:
+                csv_file.write(f'1600000010,{output_throughput}\n')
+        minimal = demand.multi_metric_demand(
+            1, self.results, {'input': ('input', 'max'), 'output': ('output', 'max')},
+            [('trend_slope', 'lt', 1), ('throughput_ratio', 'gte', 0.99)], 0,
+            ratios={'throughput_ratio': ('output', 'input')}, workers=1)
+        self.assertEqual(minimal['load'].tolist(), [100, 200])
+        self.assertEqual(minimal['resources'].tolist(), [1, 2])
+
+class TestCapacity(unittest.TestCase):
+
+    def test_crossing_load(self):
+        self.assertEqual(capacity.crossing_load(100, 1000, 200, 3000, 2000), 150)
+        self.assertEqual(capacity.crossing_load(100, 1000, 200, 3000, 5000), 200) # clamped to the tested loads
+        self.assertEqual(capacity.crossing_load(100, 3000, 200, 3000, 2000), 100)
+        self.assertEqual(capacity.crossing_load(100, 1000, 200, np.nan, 2000), 100)
+
+    def test_capacity_from_medians(self):
+        slos = [('trend_slope', 'lt', 2000), ('latency', 'lt', 1.0)]
+        medians = pd.DataFrame({
+            'load': [100, 200, 300, 100, 200, 100],
+            'resources': [1, 1, 1, 2, 2, 3],
+            'trend_slope': [1000, 3000, 4000, 0, 0, 5000],
+            'latency': [0.5, 0.5, 0.5, 0.6, np.nan, 0.1]})
+        medians = demand.suitable_configurations(medians.assign(repetition=0), slos)
+        self.assertEqual(capacity.capacity_from_medians(medians, slos).to_dict('list'),
+                         {'resource': [1, 2], 'loads': [100, 100]})
+        # NaN latency of the violating load falls back to the suitable load, resources 3 meet no SLO
+        self.assertEqual(capacity.capacity_from_medians(medians, slos, interpolate=True).to_dict('list'),
+                         {'resource': [1, 2], 'loads': [150, 100]})
+
+class TestSweep(unittest.TestCase):
+
+    TEMPLATE = """apiVersion: theodolite.rocks/v1beta1
+kind: execution
+metadata:
+  name: shufflebench-ft
+spec:
+  load:
+    loadType: "MessagesPerSecond"
+    loadValues: [20000] # replaced
+  resources:
+    resourceType: "Instances"
+    resourceValues: [1]
+  slos:
+    - name: lag trend
+"""
+
+    def test_recommend_and_render(self):
+        slos = [('trend_slope', 'lt', 2000)]
+        runs = pd.DataFrame({
+            'load': [1000, 2000, 1000, 2000, 3000, 4000, 1000],
+            'resources': [1, 1, 2, 2, 2, 2, 4],
+            'repetition': 0,
+            'trend_slope': [0, 4000, 0, 0, 0, 6000, 0]})
+        recommendations = sweep.recommend(demand.suitable_configurations(runs, slos), slos, [3])
+        # Capacities 1500 (1 resource) and 3333 (2 resources) give the model 1833 * resources - 333
+        self.assertEqual(recommendations.to_dict('list'), {
+            'resources': [1, 2, 3, 4],
+            'load': [1500, 3500, 5000, 7000],
+            'reason': ['interpolated capacity', 'interpolated capacity', 'untested resources, predicted capacity', 'no failed load']})
+
+        documents = sweep.render_executions(self.TEMPLATE, recommendations).split('---\n')
+        self.assertEqual(len(documents), 4)
+        self.assertEqual(documents[1], self.TEMPLATE
+                         .replace('name: shufflebench-ft', 'name: shufflebench-ft-r2')
+                         .replace('[20000]', '[3500]')
+                         .replace('resourceValues: [1]', 'resourceValues: [2]'))
+        self.assertIn('    - name: lag trend\n', documents[3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Measures the startup time of the SLO checkers, i.e., the time to import the app and to answer
+the first request, each in a fresh interpreter. The apps of a baseline revision (by default the
+one before the NumPy and streaming rewrites, as deployed so far) are checked out from git and
+measured as well, and each configuration is compared with the baseline of its app. Run from
+this directory:
+
+    python benchmark_startup.py [--runs 10] [--baseline <git revision>]
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Name, app directory, route, environment
+CONFIGURATIONS = [
+    ('generic (pandas)', 'generic', '/', {'AGGREGATION_BACKEND': 'pandas'}),
+    ('generic (numpy)', 'generic', '/', {'AGGREGATION_BACKEND': 'numpy'}),
+    ('record-lag', 'record-lag', '/evaluate-slope', {}),
+]
+
+# Name, app directory, route of the apps of the baseline revision (pandas and scikit-learn)
+BASELINE_CONFIGURATIONS = [
+    ('generic (baseline)', 'generic', '/', {}),
+    ('record-lag (baseline)', 'record-lag', '/evaluate-slope', {}),
+]
+
+BASELINE_REVISION = '70e49b2'
+
+# Modules the baseline apps import at startup, for reference
+REFERENCE_IMPORTS = ['numpy', 'pandas', 'sklearn.linear_model']
+
+STARTUP_SCRIPT = """
+import json, sys, time
+from fastapi.testclient import TestClient
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+with open('../resources/test-1-rep-success.json') as json_file:
+    data = json.load(json_file)
+response = TestClient(main.app).post(sys.argv[1], json=data)
+answered = time.perf_counter()
+assert response.status_code == 200, response.text
+print(json.dumps({'import': imported - start, 'first_request': answered - imported, 'result': response.json()}))
+"""
+
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({'import': time.perf_counter() - start}))
+"""
+
+def run(script, args, cwd=HERE, env=None):
+    output = subprocess.run([sys.executable, '-c', script, *args], cwd=cwd, env={**os.environ, **(env or {})},
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def checkout(revision, directory):
+    """Extracts the SLO checkers of a git revision into `directory`."""
+    toplevel, prefix = subprocess.run(['git', 'rev-parse', '--show-toplevel', '--show-prefix'], cwd=HERE,
+                                      capture_output=True, text=True, check=True).stdout.splitlines()
+    archive = subprocess.run(['git', 'archive', f'{revision}:{prefix.rstrip("/")}'], cwd=toplevel, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+
+def measure(name, root, app, route, env, runs, baselines, baseline=False):
+    runs = [run(STARTUP_SCRIPT, [route], os.path.join(root, app, 'app'), env) for _ in range(runs)]
+    results = {json.dumps(run['result']) for run in runs}
+    imported = 1000 * statistics.median(run['import'] for run in runs)
+    first_request = 1000 * statistics.median(run['first_request'] for run in runs)
+    # Speedup of the time until the first answer compared with the baseline of the same app
+    if baseline:
+        baselines[app] = imported + first_request
+    speedup = '%10.2fx' % (baselines[app] / (imported + first_request)) if app in baselines else '%11s' % 'n/a'
+    print('%-24s %12.1f %16.1f %s  %s' % (name, imported, first_request, speedup, ', '.join(sorted(results))))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of the SLO checkers.')
+    parser.add_argument('--runs', type=int, default=10, help='fresh interpreters per configuration')
+    parser.add_argument('--baseline', default=BASELINE_REVISION, help='git revision of the apps to compare with (empty to skip)')
+    args = parser.parse_args()
+
+    print('%-24s %12s %16s %11s  %s' % ('configuration', 'import [ms]', 'first req. [ms]', 'speedup', 'result'))
+    baselines = {}
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as baseline_dir:
+            checkout(args.baseline, baseline_dir)
+            for name, app, route, env in BASELINE_CONFIGURATIONS:
+                measure(name, baseline_dir, app, route, env, args.runs, baselines, baseline=True)
+    for name, app, route, env in CONFIGURATIONS:
+        measure(name, HERE, app, route, env, args.runs, baselines)
+    for module in REFERENCE_IMPORTS:
+        try:
+            runs = [run(IMPORT_SCRIPT, [module]) for _ in range(args.runs)]
+        except subprocess.CalledProcessError:
+            print('%-24s %12s' % ('import ' + module, 'n/a'))
+            continue
+        print('%-24s %12.1f' % ('import ' + module, 1000 * statistics.median(run['import'] for run in runs)))
+
+if __name__ == '__main__':
+    main()
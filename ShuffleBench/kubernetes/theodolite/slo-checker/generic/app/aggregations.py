@@ -0,0 +1,130 @@
+import numpy as np
+
+# NumPy implementations of the pandas aggregation functions supported by the evaluator. They
+# follow pandas' nanops step by step (NaNs are skipped by zero-filling them before summing), so
+# that the results are identical to `pd.Series(values).aggregate(func)`.
+
+def _masked(values):
+    values = np.asarray(values, dtype=np.float64)
+    mask = np.isnan(values)
+    count = np.float64(len(values) - np.count_nonzero(mask))
+    return np.where(mask, 0.0, values), mask, count
+
+def _zero_out_fperr(moment, tolerance):
+    return np.float64(0) if np.abs(moment) < tolerance else moment
+
+def nancount(values):
+    return int(np.count_nonzero(~np.isnan(np.asarray(values, dtype=np.float64))))
+
+def nansum(values):
+    filled, _, _ = _masked(values)
+    return filled.sum(dtype=np.float64)
+
+def nanmean(values):
+    filled, _, count = _masked(values)
+    if count == 0:
+        return np.nan
+    return filled.sum(dtype=np.float64) / count
+
+def nanmedian(values):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.nan
+    return np.median(values)
+
+def nanmin(values):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return values.min() if len(values) else np.nan
+
+def nanmax(values):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return values.max() if len(values) else np.nan
+
+def nanvar(values, ddof=1):
+    filled, mask, count = _masked(values)
+    if count <= ddof:
+        return np.nan
+    avg = filled.sum(dtype=np.float64) / count
+    sqr = (avg - filled) ** 2
+    np.putmask(sqr, mask, 0)
+    return sqr.sum(dtype=np.float64) / (count - ddof)
+
+def nanstd(values, ddof=1):
+    return np.sqrt(nanvar(values, ddof))
+
+def nanskew(values):
+    filled, mask, count = _masked(values)
+    if count < 3:
+        return np.nan
+    adjusted = filled - filled.sum(dtype=np.float64) / count
+    np.putmask(adjusted, mask, 0)
+    adjusted2 = adjusted ** 2
+    m2 = adjusted2.sum(dtype=np.float64)
+    m3 = (adjusted2 * adjusted).sum(dtype=np.float64)
+    max_abs = np.abs(filled).max(initial=0.0)
+    eps = np.finfo(np.float64).eps
+    m2 = _zero_out_fperr(m2, ((eps * max_abs) ** 2) * count)
+    m3 = _zero_out_fperr(m3, ((eps * max_abs) ** 3) * count)
+    if m2 == 0:
+        return np.float64(0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+
+def nankurt(values):
+    filled, mask, count = _masked(values)
+    if count < 4:
+        return np.nan
+    adjusted = filled - filled.sum(dtype=np.float64) / count
+    np.putmask(adjusted, mask, 0)
+    adjusted2 = adjusted ** 2
+    m2 = adjusted2.sum(dtype=np.float64)
+    m4 = (adjusted2 ** 2).sum(dtype=np.float64)
+    max_abs = np.abs(filled).max(initial=0.0)
+    eps = np.finfo(np.float64).eps
+    m2 = _zero_out_fperr(m2, ((eps * max_abs) ** 2) * count)
+    m4 = _zero_out_fperr(m4, ((eps * max_abs) ** 4) * count)
+    adj = 3 * (count - 1) ** 2 / ((count - 2) * (count - 3))
+    numerator = count * (count + 1) * (count - 1) * m4
+    denominator = (count - 2) * (count - 3) * m2 ** 2
+    if denominator == 0:
+        return np.float64(0)
+    return numerator / denominator - adj
+
+def nanmode(values):
+    """
+    Returns the smallest of the most frequent values, i.e., the first row pandas' `mode()`
+    returns. NaN if there are no values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.nan
+    unique, counts = np.unique(values, return_counts=True)
+    return unique[np.argmax(counts)]
+
+def nanquantile(values, q):
+    """
+    Linearly interpolated quantile of the values, NaNs excluded.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.nan
+    return np.percentile(values, q * 100)
+
+AGGREGATIONS = {
+    'mean': nanmean, 'median': nanmedian, 'mode': nanmode, 'sum': nansum, 'count': nancount, 'max': nanmax,
+    'min': nanmin, 'std': nanstd, 'var': nanvar, 'skew': nanskew, 'kurt': nankurt
+}
+
+def aggregate(values, aggr_func):
+    """
+    Applies an aggregation function as returned by `get_aggr_func`, i.e. either the name of
+    a pandas aggregation or a function of an array, to the values.
+    """
+    if isinstance(aggr_func, str):
+        return AGGREGATIONS[aggr_func](values)
+    return aggr_func(np.asarray(values))
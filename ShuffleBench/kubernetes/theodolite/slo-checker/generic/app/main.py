@@ -1,10 +1,19 @@
 from fastapi import FastAPI,Request
+from metrics import EVALUATION_TIME, PARSE_TIME, PAYLOAD_SIZE, metrics_response, register_result_cache
+from query_series import QueryResultsHandler, parse_samples, warmup_window
+from quantile_sketch import KllSketch
+from result_cache import ResultCache
+from stream_parser import parse_body, receive_body
+from worker_pool import create_executor, map_repetitions
+from typing import List
+import aggregations
+import functools
+import hashlib
 import logging
 import os
-import json
 import sys
 import re
-import pandas as pd
+import numpy as np
 
 
 app = FastAPI()
@@ -21,34 +30,118 @@ elif os.getenv('LOG_LEVEL') == 'WARNING':
 elif os.getenv('LOG_LEVEL') == 'DEBUG':
     logger.setLevel(logging.DEBUG)
 
+# 'exact' computes percentiles from the sorted values, 'sketch' from a KLL quantile sketch
+QUANTILE_BACKEND = os.getenv('QUANTILE_BACKEND', 'exact')
+QUANTILE_SKETCH_ERROR = float(os.getenv('QUANTILE_SKETCH_ERROR', '0.01'))
+
+if QUANTILE_BACKEND not in ['exact', 'sketch']:
+    raise ValueError('Invalid QUANTILE_BACKEND, expected exact or sketch.')
+
+# 'pandas' aggregates with pandas, 'numpy' with the equivalent NumPy implementations, which
+# allows running the evaluator without pandas installed
+AGGREGATION_BACKEND = os.getenv('AGGREGATION_BACKEND', 'pandas')
+
+if AGGREGATION_BACKEND == 'pandas':
+    import pandas as pd
+elif AGGREGATION_BACKEND != 'numpy':
+    raise ValueError('Invalid AGGREGATION_BACKEND, expected pandas or numpy.')
+
+# Theodolite re-sends identical requests when it retries or resumes an execution
+result_cache = ResultCache(max_size=int(os.getenv('RESULT_CACHE_SIZE', '128')),
+                           ttl=float(os.getenv('RESULT_CACHE_TTL', '3600')))
+
+# Repetitions are evaluated concurrently off the event loop, see worker_pool.create_executor
+executor = create_executor(os.getenv('EVALUATION_EXECUTOR', 'thread'), int(os.getenv('EVALUATION_WORKERS', '0')))
+
+SLO_TYPE = 'generic'
+register_result_cache(result_cache, SLO_TYPE)
+
 
 def get_aggr_func(func_string: str):
     if func_string in ['mean', 'median', 'mode', 'sum', 'count', 'max', 'min', 'std', 'var', 'skew', 'kurt']:
         return func_string
     elif func_string == 'first':
-        def first(x):
-            return x.iloc[0]
+        def first(x): # a Series with the pandas backend, an array with the numpy backend
+            return x.iloc[0] if hasattr(x, 'iloc') else x[0]
         first.__name__ = 'first'
         return first
     elif func_string == 'last':
         def last(x):
-            return x.iloc[-1]
+            return x.iloc[-1] if hasattr(x, 'iloc') else x[-1]
         last.__name__ = 'last'
         return last
     elif re.search(r'^p\d\d?(\.\d+)?$', func_string): # matches strings like 'p99', 'p99.99', 'p1', 'p0.001'
         def percentile(x):
-            return x.quantile(float(func_string[1:]) / 100)
+            if QUANTILE_BACKEND == 'sketch':
+                sketch = KllSketch.for_error(QUANTILE_SKETCH_ERROR)
+                sketch.update(x)
+                return sketch.quantile(float(func_string[1:]) / 100)
+            return aggregations.nanquantile(x, float(func_string[1:]) / 100)
         percentile.__name__ = func_string
+        percentile.quantile = float(func_string[1:]) / 100
         return percentile
     else:
         raise ValueError('Invalid function string.')
 
 def aggr_query(values: dict, warmup: int, aggr_func):
-    df = pd.DataFrame.from_dict(values)
-    df.columns = ['timestamp', 'value']
-    filtered = df[df['timestamp'] >= (df['timestamp'][0] + warmup)]
-    filtered['value'] = filtered['value'].astype(float)
-    return filtered['value'].aggregate(aggr_func)
+    timestamps, values = parse_samples(values)
+    return aggr_series(timestamps, values, warmup, aggr_func)
+
+def aggr_series(timestamps, values, warmup: int, aggr_func):
+    return aggregate(warmup_window(timestamps, values, warmup), aggr_func)
+
+def aggregate(values, aggr_func):
+    if AGGREGATION_BACKEND == 'numpy':
+        return aggregations.aggregate(values, aggr_func)
+    if callable(aggr_func):
+        # pandas 1.x would first apply the function to each value and only fall back to the
+        # whole Series for some errors
+        return aggr_func(pd.Series(values))
+    return pd.Series(values).aggregate(aggr_func)
+
+def is_order_statistic(aggr_func):
+    return hasattr(aggr_func, 'quantile') or aggr_func in ['median', 'min', 'max']
+
+def order_statistic(sorted_values, aggr_func):
+    n = len(sorted_values)
+    if n == 0:
+        return np.nan
+    if aggr_func == 'min':
+        return sorted_values[0]
+    if aggr_func == 'max':
+        return sorted_values[-1]
+    if aggr_func == 'median':
+        return np.mean(sorted_values[(n - 1) // 2:n // 2 + 1])
+    return np.percentile(sorted_values, aggr_func.quantile * 100)
+
+def aggr_series_many(timestamps, values, warmup: int, aggr_funcs: list):
+    """
+    Applies several aggregation functions to the values after the warmup. All percentiles,
+    the median, min and max are taken from one shared sort of the values (NaNs excluded,
+    as pandas does). With the sketch backend, percentiles are read from one shared sketch.
+    """
+    values = warmup_window(timestamps, values, warmup)
+    sorted_values = None
+    sketch = None
+    results = []
+    for aggr_func in aggr_funcs:
+        if QUANTILE_BACKEND == 'sketch' and hasattr(aggr_func, 'quantile'):
+            if sketch is None:
+                sketch = KllSketch.for_error(QUANTILE_SKETCH_ERROR)
+                sketch.update(values)
+            results.append(sketch.quantile(aggr_func.quantile))
+        elif QUANTILE_BACKEND == 'exact' and is_order_statistic(aggr_func):
+            if sorted_values is None:
+                sorted_values = np.sort(values[~np.isnan(values)])
+            results.append(order_statistic(sorted_values, aggr_func))
+        else:
+            results.append(aggregate(values, aggr_func))
+    return results
+
+def aggr_repetitions(query_results: list, aggr_func):
+    if AGGREGATION_BACKEND == 'numpy':
+        return aggregations.aggregate(query_results, aggr_func)
+    return pd.DataFrame(query_results).aggregate(aggr_func).at[0]
 
 def check_result(result, operator: str, threshold):
     if operator == 'lt':
@@ -68,19 +161,98 @@ def check_result(result, operator: str, threshold):
 
 
 
+def aggr_repetition(repetition, warmup: int, query_aggregations: list):
+    """
+    Computes the query aggregations of one repetition. The aggregations are passed by name,
+    so that the function can be run in a process pool.
+    """
+    timestamps, values = repetition
+    return aggr_series_many(timestamps, values, warmup, [get_aggr_func(query_aggregation) for query_aggregation in query_aggregations])
+
+async def evaluate_slo(repetitions, metadata):
+    warmup = int(metadata['warmup'])
+    query_aggregation = metadata['queryAggregation']
+    get_aggr_func(query_aggregation) # fail before dispatching the repetitions
+    rep_aggregation = get_aggr_func(metadata['repetitionAggregation'])
+    operator = metadata['operator']
+    threshold = float(metadata['threshold'])
+
+    if None in repetitions:
+        raise ValueError('Each repetition requires at least one series.')
+    aggr_func = functools.partial(aggr_repetition, warmup=warmup, query_aggregations=[query_aggregation])
+    query_results = [results[0] for results in await map_repetitions(executor, aggr_func, repetitions)]
+    result = aggr_repetitions(query_results, rep_aggregation)
+    return bool(check_result(result, operator, threshold))
+
+async def evaluate_slos(repetitions, metadata):
+    warmup = int(metadata['warmup'])
+    slos = metadata['slos']
+    # Each distinct query aggregation is computed only once per repetition
+    query_aggregations = list(dict.fromkeys(slo['queryAggregation'] for slo in slos))
+    for query_aggregation in query_aggregations:
+        get_aggr_func(query_aggregation) # fail before dispatching the repetitions
+
+    if None in repetitions:
+        raise ValueError('Each repetition requires at least one series.')
+    aggr_func = functools.partial(aggr_repetition, warmup=warmup, query_aggregations=query_aggregations)
+    repetition_results = [dict(zip(query_aggregations, results)) for results in await map_repetitions(executor, aggr_func, repetitions)]
+
+    verdicts = []
+    for slo in slos:
+        query_results = [query_results[slo['queryAggregation']] for query_results in repetition_results]
+        result = aggr_repetitions(query_results, get_aggr_func(slo['repetitionAggregation']))
+        verdicts.append(bool(check_result(result, slo['operator'], float(slo['threshold']))))
+    return verdicts
+
 @app.post("/",response_model=bool)
 async def check_slo(request: Request):
-    data = json.loads(await request.body())
-    logger.info('Received request with metadata: %s', data['metadata'])
-
-    warmup = int(data['metadata']['warmup'])
-    query_aggregation = get_aggr_func(data['metadata']['queryAggregation'])
-    rep_aggregation = get_aggr_func(data['metadata']['repetitionAggregation'])
-    operator = data['metadata']['operator']
-    threshold = float(data['metadata']['threshold'])
-
-    query_results = [aggr_query(r[0]["values"], warmup, query_aggregation) for r in data["results"]]
-    result = pd.DataFrame(query_results).aggregate(rep_aggregation).at[0]
-    return check_result(result, operator, threshold)
+    digest = hashlib.sha256(b'/')
+    body, size = await receive_body(request.stream(), digest)
+    PAYLOAD_SIZE.labels(SLO_TYPE, '/').observe(size)
+    with body:
+        cached = result_cache.get(digest.digest())
+        if cached is not None:
+            logger.info('Returning cached result %s', cached)
+            return cached
+        with PARSE_TIME.labels(SLO_TYPE, '/').time():
+            data = parse_body(body, QueryResultsHandler())
+    logger.info('Received request with metadata: %s', data.metadata)
+
+    with EVALUATION_TIME.labels(SLO_TYPE, '/').time():
+        verdict = await evaluate_slo(data.repetitions, data.metadata)
+    result_cache.put(digest.digest(), verdict)
+    return verdict
+
+@app.post("/batch",response_model=List[bool])
+async def check_slos(request: Request):
+    digest = hashlib.sha256(b'/batch')
+    body, size = await receive_body(request.stream(), digest)
+    PAYLOAD_SIZE.labels(SLO_TYPE, '/batch').observe(size)
+    with body:
+        cached = result_cache.get(digest.digest())
+        if cached is not None:
+            logger.info('Returning cached results %s', cached)
+            return cached
+        with PARSE_TIME.labels(SLO_TYPE, '/batch').time():
+            data = parse_body(body, QueryResultsHandler())
+    logger.info('Received batch request with metadata: %s', data.metadata)
+
+    with EVALUATION_TIME.labels(SLO_TYPE, '/batch').time():
+        verdicts = await evaluate_slos(data.repetitions, data.metadata)
+    result_cache.put(digest.digest(), verdicts)
+    return verdicts
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    if executor is not None:
+        executor.shutdown()
+
+@app.get("/cache")
+async def cache_stats():
+    return result_cache.stats()
+
+@app.get("/metrics")
+async def metrics():
+    return metrics_response()
 
 logger.info("SLO evaluator is online")
\ No newline at end of file
@@ -0,0 +1,83 @@
+import math
+import numpy as np
+
+_BLOCK_SIZE = 8192
+
+class KllSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016). Items of level h stand for 2^h input
+    values; a level that reaches its capacity is sorted and every other item is promoted to
+    the next level. The sketch needs O(k) memory plus one block of input regardless of the
+    number of values, instead of the sorted copy of the values an exact percentile needs, and
+    its rank error is about 1.65 / k. Randomness is seeded, so results are reproducible.
+    NaN values are ignored, as in pandas.
+    """
+
+    def __init__(self, k=200, seed=0):
+        if k < 2:
+            raise ValueError('The sketch size k must be at least 2.')
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def for_error(cls, rank_error, seed=0):
+        """
+        Creates a sketch whose normalized rank error is about `rank_error`, e.g. 0.01 for 1 %.
+        """
+        return cls(k=max(2, math.ceil(1.65 / rank_error)), seed=seed)
+
+    def __len__(self):
+        return self.count
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        # Values are added in blocks; a larger lowest level only makes compactions more accurate
+        for start in range(0, len(values), _BLOCK_SIZE):
+            chunk = values[start:start + _BLOCK_SIZE]
+            self.levels[0] = np.concatenate((self.levels[0], chunk))
+            self.count += len(chunk)
+            self._compress()
+
+    def _compress(self):
+        while sum(len(items) for items in self.levels) >= sum(self._capacity(level) for level in range(len(self.levels))):
+            for level, items in enumerate(self.levels):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append(np.empty(0))
+                    items = np.sort(items)
+                    odd = len(items) % 2 # an odd item out stays on its level
+                    promoted = items[odd + self._rng.integers(2)::2]
+                    self.levels[level] = items[:odd]
+                    self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+                    break
+
+    def quantiles(self, qs):
+        """
+        Estimates the given quantiles with the linear interpolation pandas uses, treating every
+        item of level h as 2^h equal values. Exact as long as no compaction took place.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.float64) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, weights = items[order], weights[order]
+        total = weights.sum()
+        # Item i covers the 0-based ranks [cumulative[i] - weights[i], cumulative[i] - 1]
+        cumulative = np.cumsum(weights)
+        rank = qs * (total - 1)
+        lower_rank = np.floor(rank)
+        lower = items[np.minimum(np.searchsorted(cumulative, lower_rank, side='right'), len(items) - 1)]
+        upper = items[np.minimum(np.searchsorted(cumulative, np.ceil(rank), side='right'), len(items) - 1)]
+        return lower + (upper - lower) * (rank - lower_rank)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
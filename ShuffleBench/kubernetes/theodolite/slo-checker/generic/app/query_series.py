@@ -0,0 +1,67 @@
+import numpy as np
+from stream_parser import ResultsHandler
+
+def parse_samples(samples):
+    """
+    Parses Prometheus `[<unix_timestamp>, "<sample_value>"]` pairs into a timestamp and a
+    value array.
+    """
+    return parse_columns([sample[0] for sample in samples], [sample[1] for sample in samples])
+
+def parse_columns(timestamps, values):
+    """
+    Converts lists of timestamps and sample values into float arrays in one pass. The
+    Prometheus special values 'NaN', '+Inf' and '-Inf' become the corresponding floats; NaN
+    samples are skipped by the aggregations, infinite ones are kept.
+    """
+    return np.array(timestamps, dtype=np.float64), np.array(values, dtype=np.float64)
+
+def warmup_window(timestamps, values, warmup):
+    """
+    Returns the values of the samples taken at least `warmup` seconds after the first one.
+    The samples of a Prometheus range query are ordered by time, which is not checked here:
+    the start of the window is found by a binary search and a view of `values` is returned.
+    """
+    if len(timestamps) == 0:
+        return values
+    return values[np.searchsorted(timestamps, timestamps[0] + warmup, side='left'):]
+
+class QueryResultsHandler(ResultsHandler):
+    """
+    Collects the samples of the first series of each repetition from a streamed evaluation
+    request as (timestamps, values) arrays. Memory is therefore linear in the number of these
+    samples (16 bytes per sample), but not in the size of the request: the samples cannot be
+    aggregated while they are parsed, as the warmup and aggregations are only known from the
+    metadata, which Theodolite sends after the results.
+    """
+
+    def __init__(self):
+        self.repetitions = []
+        self.metadata = None
+        self._series_count = 0
+        self._timestamps = []
+        self._values = []
+
+    def start_repetition(self, repetition):
+        self.repetitions.append(None)
+        self._series_count = 0
+
+    def start_series(self, repetition):
+        self._series_count += 1
+
+    def series_samples(self, timestamps, values):
+        if self._series_count == 1: # the generic SLO checker only evaluates the first series
+            timestamps, values = parse_columns(timestamps, values)
+            self._timestamps.append(timestamps)
+            self._values.append(values)
+
+    def end_series(self):
+        if self._series_count == 1:
+            self.repetitions[-1] = (
+                np.concatenate(self._timestamps) if self._timestamps else np.empty(0),
+                np.concatenate(self._values) if self._values else np.empty(0))
+            self._timestamps = []
+            self._values = []
+
+    def set_metadata(self, metadata):
+        self.metadata = metadata
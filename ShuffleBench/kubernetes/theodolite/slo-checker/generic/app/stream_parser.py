@@ -0,0 +1,238 @@
+import codecs
+import functools
+import json
+import re
+import tempfile
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# A `[<unix_timestamp>, "<sample_value>"]` pair as serialized by Theodolite
+_SAMPLE = r'\s*\[\s*([^\s,\]]+)\s*,\s*"([^"\\]*)"\s*\]'
+_SAMPLE_PATTERN = re.compile(_SAMPLE)
+_SAMPLE_RUN_PATTERN = re.compile(r'(?:%s\s*,\s*)+' % _SAMPLE)
+# Received bodies up to this size are kept in memory until they are parsed, larger ones on disk
+SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+class ResultsHandler:
+    """
+    Receives the parts of an SLO evaluation request while it is being parsed. Samples of a
+    series are passed on in batches of unconverted timestamp and value lists.
+    """
+
+    def start_repetition(self, repetition):
+        pass
+
+    def start_series(self, repetition):
+        pass
+
+    def series_metric(self, metric):
+        pass
+
+    def series_samples(self, timestamps, values):
+        pass
+
+    def end_series(self):
+        pass
+
+    def set_metadata(self, metadata):
+        pass
+
+class StreamingResultsParser:
+    """
+    Incremental parser for the `{"results": [[{"metric": ..., "values": ...}]], "metadata": ...}`
+    bodies Theodolite sends to SLO checkers. Chunks of the body are passed to `feed()` as they
+    arrive; only the not yet parsed remainder of the input is kept in memory. What is kept of
+    the parsed samples is up to the handler.
+    """
+
+    def __init__(self, handler, batch_size=65536):
+        self._handler = handler
+        self._batch_size = batch_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._done = False
+        self._parser = self._parse_document()
+        self._resume()
+
+    def feed(self, chunk):
+        if self._done:
+            if chunk.strip():
+                raise ValueError('Extra data after the end of the JSON document.')
+            return
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        self._resume()
+
+    def close(self):
+        if not self._done:
+            self._buffer = self._buffer[self._pos:] + self._decoder.decode(b'', final=True)
+            self._pos = 0
+            self._eof = True
+            self._resume()
+        if not self._done:
+            raise ValueError('Unexpected end of JSON input.')
+
+    def _resume(self):
+        try:
+            next(self._parser)
+        except StopIteration:
+            self._done = True
+
+    def _error(self, message):
+        return ValueError('%s at offset %s of the unparsed input.' % (message, self._pos))
+
+    def _peek(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or self._eof:
+                return self._buffer[self._pos:self._pos + 1]
+            yield
+
+    def _expect(self, char):
+        if (yield from self._peek()) != char:
+            raise self._error("Expected '%s'" % char)
+        self._pos += 1
+
+    def _parse_value(self):
+        while True:
+            yield from self._peek()
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            else:
+                # A number that reaches the end of the input may continue in the next chunk
+                if end < len(self._buffer) or self._eof or not isinstance(value, (int, float)):
+                    self._pos = end
+                    return value
+            yield
+
+    def _parse_object(self, parse_member):
+        yield from self._expect('{')
+        if (yield from self._peek()) == '}':
+            self._pos += 1
+            return
+        while True:
+            key = yield from self._parse_value()
+            if not isinstance(key, str):
+                raise self._error('Expected an object key')
+            yield from self._expect(':')
+            yield from parse_member(key)
+            separator = yield from self._peek()
+            self._pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise self._error("Expected ',' or '}'")
+
+    def _parse_array(self, parse_element):
+        yield from self._expect('[')
+        if (yield from self._peek()) == ']':
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield from parse_element(index)
+            index += 1
+            separator = yield from self._peek()
+            self._pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise self._error("Expected ',' or ']'")
+
+    def _parse_document(self):
+        yield from self._parse_object(self._parse_document_member)
+        if (yield from self._peek()) != '':
+            raise self._error('Extra data after the end of the JSON document')
+
+    def _parse_document_member(self, key):
+        if key == 'results':
+            yield from self._parse_array(self._parse_repetition)
+        elif key == 'metadata':
+            self._handler.set_metadata((yield from self._parse_value()))
+        else:
+            yield from self._parse_value()
+
+    def _parse_repetition(self, repetition):
+        self._handler.start_repetition(repetition)
+        yield from self._parse_array(lambda _: self._parse_series(repetition))
+
+    def _parse_series(self, repetition):
+        self._handler.start_series(repetition)
+        yield from self._parse_object(self._parse_series_member)
+        self._handler.end_series()
+
+    def _parse_series_member(self, key):
+        if key == 'values':
+            yield from self._parse_samples()
+        elif key == 'metric':
+            self._handler.series_metric((yield from self._parse_value()))
+        else:
+            yield from self._parse_value()
+
+    def _parse_samples(self):
+        yield from self._expect('[')
+        if (yield from self._peek()) == ']':
+            self._pos += 1
+            return
+        timestamps, values = [], []
+        while True:
+            # Fast path: consume all complete samples followed by a comma with one regex
+            run = _SAMPLE_RUN_PATTERN.match(self._buffer, self._pos)
+            if run is not None:
+                run_timestamps, run_values = zip(*_SAMPLE_PATTERN.findall(self._buffer, self._pos, run.end()))
+                timestamps.extend(run_timestamps)
+                values.extend(run_values)
+                self._pos = run.end()
+            else:
+                sample = _SAMPLE_PATTERN.match(self._buffer, self._pos)
+                if sample is not None:
+                    timestamps.append(sample.group(1))
+                    values.append(sample.group(2))
+                    self._pos = sample.end()
+                else:
+                    # Slow path for samples split across chunks or serialized unusually
+                    timestamp, value = yield from self._parse_value()
+                    timestamps.append(timestamp)
+                    values.append(value)
+                separator = yield from self._peek()
+                self._pos += 1
+                if separator == ']':
+                    break
+                if separator != ',':
+                    raise self._error("Expected ',' or ']'")
+            if len(timestamps) >= self._batch_size:
+                self._handler.series_samples(timestamps, values)
+                timestamps, values = [], []
+        if timestamps:
+            self._handler.series_samples(timestamps, values)
+
+async def receive_body(chunks, digest, max_memory=SPOOL_MAX_MEMORY):
+    """
+    Copies an asynchronous iterable of body chunks, e.g. a Starlette `request.stream()`, into
+    a temporary file and updates the `hashlib` object `digest` with them, so that cached
+    results can be looked up before the body is parsed. The file stays in memory up to
+    `max_memory` bytes and is moved to disk beyond. Returns the file, positioned at its start,
+    and the size of the body.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    async for chunk in chunks:
+        digest.update(chunk)
+        body.write(chunk)
+    size = body.tell()
+    body.seek(0)
+    return body, size
+
+def parse_body(body, handler, chunk_size=65536):
+    """
+    Parses a body returned by `receive_body()` chunk by chunk.
+    """
+    parser = StreamingResultsParser(handler)
+    for chunk in iter(functools.partial(body.read, chunk_size), b''):
+        parser.feed(chunk)
+    parser.close()
+    return handler
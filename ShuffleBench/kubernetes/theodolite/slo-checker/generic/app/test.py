@@ -1,6 +1,15 @@
 import unittest
 from main import app, get_aggr_func, check_result
+import aggregations
+from query_series import QueryResultsHandler, parse_columns, warmup_window
+from quantile_sketch import KllSketch
+from result_cache import ResultCache
+from stream_parser import StreamingResultsParser
+from worker_pool import create_executor, map_repetitions
+import asyncio
 import json
+import os
+import numpy as np
 from fastapi.testclient import TestClient
 
 class TestSloEvaluation(unittest.TestCase):
@@ -12,6 +21,114 @@ class TestSloEvaluation(unittest.TestCase):
             response = self.client.post("/", json=data)
             self.assertEqual(response.json(), True)
 
+    def test_batch(self):
+        with open('../resources/test-1-rep-success.json') as json_file:
+            data = json.load(json_file)
+        slos = [
+            {'queryAggregation': 'p50', 'repetitionAggregation': 'median', 'operator': 'lt', 'threshold': 2000000},
+            {'queryAggregation': 'p99', 'repetitionAggregation': 'median', 'operator': 'lt', 'threshold': 0},
+            {'queryAggregation': 'max', 'repetitionAggregation': 'mean', 'operator': 'gte', 'threshold': 0},
+            {'queryAggregation': 'mean', 'repetitionAggregation': 'median', 'operator': 'lt', 'threshold': 100}
+        ]
+        expected = []
+        for slo in slos:
+            response = self.client.post("/", json={'results': data['results'], 'metadata': dict(warmup=data['metadata']['warmup'], **slo)})
+            expected.append(response.json())
+        response = self.client.post("/batch", json={'results': data['results'], 'metadata': {'warmup': data['metadata']['warmup'], 'slos': slos}})
+        self.assertEqual(response.json(), expected)
+
+    def test_metrics(self):
+        with open('../resources/test-1-rep-success.json') as json_file:
+            data = json.load(json_file)
+        self.client.post("/", json=data)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('slo_checker_evaluation_seconds_count{route="/",slo_type="generic"}', response.text)
+
+    def test_map_repetitions_keeps_order(self):
+        for kind in ['inline', 'thread']:
+            executor = create_executor(kind, 4)
+            self.assertEqual(asyncio.run(map_repetitions(executor, abs, [-3, 2, -1, 0])), [3, 2, 1, 0])
+            if executor is not None:
+                executor.shutdown()
+        with self.assertRaises(ValueError):
+            create_executor('gpu')
+
+    def test_stream_parser_chunked(self):
+        with open('../resources/test-1-rep-success.json', 'rb') as json_file:
+            body = json_file.read()
+        data = json.loads(body)
+        handler = QueryResultsHandler()
+        parser = StreamingResultsParser(handler, batch_size=4)
+        for i in range(0, len(body), 7):
+            parser.feed(body[i:i + 7])
+        parser.close()
+        self.assertEqual(handler.metadata, data['metadata'])
+        timestamps, values = handler.repetitions[0]
+        self.assertEqual(timestamps.tolist(), [float(v[0]) for v in data['results'][0][0]['values']])
+        self.assertEqual(values.tolist(), [float(v[1]) for v in data['results'][0][0]['values']])
+
+    def test_shared_modules_in_sync(self):
+        # Each checker is built as its own image from its app/ folder, so the modules they
+        # share are copies that have to be kept identical
+        for module in ['metrics.py', 'result_cache.py', 'stream_parser.py', 'worker_pool.py']:
+            other = os.path.join('..', '..', 'record-lag', 'app', module)
+            if not os.path.exists(other):
+                self.skipTest('record-lag checker not available')
+            with open(module, 'rb') as own_file, open(other, 'rb') as other_file:
+                self.assertEqual(own_file.read(), other_file.read(), module)
+
+    def test_warmup_window(self):
+        timestamps, values = parse_columns([100, 101, 102, 103], ['1', 'NaN', '+Inf', '4'])
+        self.assertTrue(np.isnan(values[1]))
+        self.assertEqual(values[2], np.inf)
+        window = warmup_window(timestamps, values, 2)
+        self.assertEqual(window.tolist(), [np.inf, 4.0])
+        self.assertTrue(np.shares_memory(window, values))
+        self.assertEqual(len(warmup_window(np.empty(0), np.empty(0), 2)), 0)
+
+    def test_numpy_aggregations_match_pandas(self):
+        import pandas as pd
+        values = np.random.default_rng(1).normal(1000, 50, size=200)
+        values[::17] = np.nan
+        for aggr_func in ['mean', 'median', 'sum', 'count', 'max', 'min', 'std', 'var', 'skew', 'kurt']:
+            self.assertEqual(aggregations.aggregate(values, aggr_func), pd.Series(values).aggregate(aggr_func), aggr_func)
+        self.assertEqual(aggregations.aggregate(values, get_aggr_func('p99')), pd.Series(values).quantile(0.99))
+        np.testing.assert_equal(aggregations.aggregate(values, get_aggr_func('first')), pd.Series(values).iloc[0]) # NaN, compared as equal
+        np.testing.assert_equal(aggregations.aggregate(values, get_aggr_func('last')), pd.Series(values).iloc[-1])
+        self.assertEqual(aggregations.nanmode([3, 1, 1, 3, 2]), 1)
+
+    def test_sketch_exact_without_compaction(self):
+        values = np.random.default_rng(1).normal(size=100)
+        sketch = KllSketch(k=200)
+        sketch.update(values)
+        self.assertTrue(np.allclose(sketch.quantiles([0, 0.5, 0.99, 1]), np.quantile(values, [0, 0.5, 0.99, 1])))
+
+    def test_sketch_rank_error(self):
+        rng = np.random.default_rng(2)
+        first, second = rng.uniform(size=200000), rng.uniform(size=100000)
+        sketch = KllSketch.for_error(0.01)
+        sketch.update(first)
+        sketch.update(np.append(second, np.nan))
+        self.assertEqual(len(sketch), 300000)
+        estimates = sketch.quantiles([0.1, 0.5, 0.99])
+        ranks = np.searchsorted(np.sort(np.concatenate((first, second))), estimates) / 300000
+        self.assertTrue(np.all(np.abs(ranks - [0.1, 0.5, 0.99]) < 0.01))
+
+    def test_result_cache_lru_and_ttl(self):
+        now = [0.0]
+        cache = ResultCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.put('a', True)
+        cache.put('b', False)
+        self.assertEqual(cache.get('a'), True)
+        cache.put('c', True) # evicts 'b', the least recently used entry
+        self.assertIsNone(cache.get('b'))
+        now[0] = 10.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
+        self.assertEqual(len(cache), 1)
+
     def test_get_aggr_func_mean(self):
         self.assertEqual(get_aggr_func('median'), 'median')
     
@@ -41,6 +158,19 @@ class TestSloEvaluation(unittest.TestCase):
 
     def test_get_aggr_func_last(self):
         self.assertTrue(callable(get_aggr_func('last')))
+
+    def test_first_and_last(self):
+        with open('../resources/test-1-rep-success.json') as json_file:
+            data = json.load(json_file)
+        samples = data['results'][0][0]['values']
+        for aggr_func, sample in [('first', samples[0]), ('last', samples[-1])]:
+            data['metadata']['queryAggregation'] = aggr_func
+            data['metadata']['warmup'] = 0
+            for threshold, expected in [(float(sample[1]) + 1, True), (float(sample[1]), False)]:
+                data['metadata']['threshold'] = threshold
+                response = self.client.post("/", json=data)
+                self.assertEqual(response.status_code, 200, aggr_func)
+                self.assertEqual(response.json(), expected, aggr_func)
     
     def test_check_result_lt(self):
         self.assertEqual(check_result(100, 'lt', 200), True)
@@ -0,0 +1,113 @@
+import numpy as np
+import trend_slope_computer as trend_slope_computer
+from stream_parser import ResultsHandler
+
+def parse_samples(samples):
+    """
+    Parses Prometheus `[<unix_timestamp>, "<sample_value>"]` pairs into a timestamp and a
+    value array.
+    """
+    return parse_columns([sample[0] for sample in samples], [sample[1] for sample in samples])
+
+def parse_columns(timestamps, values):
+    """
+    Converts lists of timestamps and sample values into float arrays. Timestamps are
+    truncated to whole seconds and 'NaN' samples count as 0.
+    """
+    timestamps = np.array(timestamps, dtype=np.float64)
+    values = np.array(values, dtype=np.float64)
+    np.trunc(timestamps, out=timestamps)
+    values[np.isnan(values)] = 0
+    return timestamps, values
+
+class LagSeries:
+    """
+    Columnar store of the lag series of one repetition. Samples are kept in typed arrays
+    along with the index of their consumer group.
+    """
+
+    def __init__(self):
+        self.groups = []
+        self._group_ids = {}
+        self._timestamps = []
+        self._values = []
+        self._group_index = []
+
+    @classmethod
+    def from_results(cls, results):
+        series = cls()
+        for result in results:
+            series.append(result['metric'].get('consumergroup', "default"), *parse_samples(result['values']))
+        return series
+
+    def append(self, group, timestamps, values):
+        group_id = self._group_ids.get(group)
+        if group_id is None:
+            group_id = self._group_ids[group] = len(self.groups)
+            self.groups.append(group)
+        self._timestamps.append(timestamps)
+        self._values.append(values)
+        self._group_index.append(np.full(len(timestamps), group_id, dtype=np.intp))
+
+    def __len__(self):
+        return sum(len(timestamps) for timestamps in self._timestamps)
+
+    def trend_slopes(self, warmup_sec):
+        """
+        Returns the trend slope of each consumer group and the trend slope over the samples of
+        all groups. The warmup is counted from the first sample of the repetition.
+        """
+        if len(self) == 0:
+            raise ValueError('Cannot compute the trend slope of a repetition without samples.')
+        timestamps = np.concatenate(self._timestamps)
+        values = np.concatenate(self._values)
+        group_index = np.concatenate(self._group_index)
+
+        regress = (timestamps - timestamps[0]) >= warmup_sec # Warm-Up
+        timestamps, values, group_index = timestamps[regress], values[regress], group_index[regress]
+        if len(timestamps) == 0:
+            raise ValueError('No samples left after a warmup of %s seconds.' % warmup_sec)
+
+        group_slopes = trend_slope_computer.grouped_slopes(timestamps, values, group_index, len(self.groups))
+        total_slope = trend_slope_computer.slopes(timestamps, values, [len(timestamps)])[0]
+        return dict(zip(self.groups, group_slopes.tolist())), float(total_slope)
+
+class LagResultsHandler(ResultsHandler):
+    """
+    Collects one LagSeries per repetition from a streamed evaluation request. Memory is
+    linear in the number of samples (24 bytes per sample), as the warmup is only known from
+    the metadata, which Theodolite sends after the results.
+    """
+
+    def __init__(self):
+        self.repetitions = []
+        self.metadata = None
+        self._group = "default"
+        self._timestamps = []
+        self._values = []
+
+    def start_repetition(self, repetition):
+        self.repetitions.append(LagSeries())
+
+    def start_series(self, repetition):
+        self._group = "default"
+        self._timestamps = []
+        self._values = []
+
+    def series_metric(self, metric):
+        self._group = metric.get('consumergroup', "default")
+
+    def series_samples(self, timestamps, values):
+        timestamps, values = parse_columns(timestamps, values)
+        self._timestamps.append(timestamps)
+        self._values.append(values)
+
+    def end_series(self):
+        timestamps = np.concatenate(self._timestamps) if self._timestamps else np.empty(0)
+        values = np.concatenate(self._values) if self._values else np.empty(0)
+        self.repetitions[-1].append(self._group, timestamps, values)
+        self._timestamps = []
+        self._values = []
+
+    def set_metadata(self, metadata):
+        self.metadata = metadata
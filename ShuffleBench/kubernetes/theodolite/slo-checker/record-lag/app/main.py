@@ -1,9 +1,13 @@
 from fastapi import FastAPI,Request
-import trend_slope_computer as trend_slope_computer
+from metrics import EVALUATION_TIME, PARSE_TIME, PAYLOAD_SIZE, metrics_response, register_result_cache
+from lag_series import LagResultsHandler
+from stream_parser import parse_body, receive_body
+from result_cache import ResultCache
+from worker_pool import create_executor, map_repetitions
+import functools
+import hashlib
 import logging
 import os
-import pandas as pd
-import json
 import sys
 from statistics import median
 
@@ -21,25 +25,27 @@ elif os.getenv('LOG_LEVEL') == 'WARNING':
 elif os.getenv('LOG_LEVEL') == 'DEBUG':
     logger.setLevel(logging.DEBUG)
 
-def calculate_slope_trend(results, warmup):
-    d = []
-    for result in results:
-        group = result['metric'].get('consumergroup', "default")
-        for value in result['values']:
-            d.append({'group': group, 'timestamp': int(
-                value[0]), 'value': float(value[1]) if value[1] != 'NaN' else 0})
+# Theodolite re-sends identical requests when it retries or resumes an execution
+result_cache = ResultCache(max_size=int(os.getenv('RESULT_CACHE_SIZE', '128')),
+                           ttl=float(os.getenv('RESULT_CACHE_TTL', '3600')))
 
-    df = pd.DataFrame(d)
+# Repetitions are evaluated concurrently off the event loop, see worker_pool.create_executor
+executor = create_executor(os.getenv('EVALUATION_EXECUTOR', 'thread'), int(os.getenv('EVALUATION_WORKERS', '0')))
 
-    logger.info("Calculating trend slope with warmup of %s seconds for data frame:\n %s", warmup, df)
+SLO_TYPE = 'lag trend'
+register_result_cache(result_cache, SLO_TYPE)
+
+def calculate_slope_trend(lag_series, warmup):
     try:
-        trend_slope = trend_slope_computer.compute(df, warmup)
+        logger.info("Calculating trend slope with warmup of %s seconds for %s samples of consumer groups %s", warmup, len(lag_series), lag_series.groups)
+        group_slopes, trend_slope = lag_series.trend_slopes(warmup)
     except Exception as e:
         err_msg = 'Computing trend slope failed.'
         logger.exception(err_msg)
         logger.error('Mark this subexperiment as not successful and continue benchmark.')
         return float('inf')
 
+    logger.info("Computed lag trend slopes per consumer group are %s", group_slopes)
     logger.info("Computed lag trend slope is '%s'", trend_slope)
     return trend_slope
 
@@ -48,8 +54,34 @@ def check_service_level_objective(results, threshold):
 
 @app.post("/evaluate-slope",response_model=bool)
 async def evaluate_slope(request: Request):
-    data = json.loads(await request.body())
-    results = [calculate_slope_trend(total_lag, data['metadata']['warmup']) for total_lag in data['results']]
-    return check_service_level_objective(results=results, threshold=data['metadata']["threshold"])
+    digest = hashlib.sha256(b'/evaluate-slope')
+    body, size = await receive_body(request.stream(), digest)
+    PAYLOAD_SIZE.labels(SLO_TYPE, '/evaluate-slope').observe(size)
+    with body:
+        cached = result_cache.get(digest.digest())
+        if cached is not None:
+            logger.info('Returning cached result %s', cached)
+            return cached
+        with PARSE_TIME.labels(SLO_TYPE, '/evaluate-slope').time():
+            data = parse_body(body, LagResultsHandler())
+
+    with EVALUATION_TIME.labels(SLO_TYPE, '/evaluate-slope').time():
+        results = await map_repetitions(executor, functools.partial(calculate_slope_trend, warmup=data.metadata['warmup']), data.repetitions)
+        verdict = check_service_level_objective(results=results, threshold=data.metadata["threshold"])
+    result_cache.put(digest.digest(), verdict)
+    return verdict
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    if executor is not None:
+        executor.shutdown()
+
+@app.get("/cache")
+async def cache_stats():
+    return result_cache.stats()
+
+@app.get("/metrics")
+async def metrics():
+    return metrics_response()
 
 logger.info("SLO evaluator is online")
\ No newline at end of file
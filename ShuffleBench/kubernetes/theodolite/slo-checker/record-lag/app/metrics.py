@@ -0,0 +1,34 @@
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+from prometheus_client.core import REGISTRY, CounterMetricFamily
+
+PAYLOAD_SIZE = Histogram(
+    'slo_checker_payload_bytes', 'Size of the bodies of SLO evaluation requests.', ['slo_type', 'route'],
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 3e7, 1e8, 3e8, 1e9))
+PARSE_TIME = Histogram(
+    'slo_checker_parse_seconds', 'Time spent parsing SLO evaluation requests that missed the result cache.', ['slo_type', 'route'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60))
+EVALUATION_TIME = Histogram(
+    'slo_checker_evaluation_seconds', 'Time spent aggregating the parsed results of SLO evaluation requests.', ['slo_type', 'route'],
+    buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60))
+
+class ResultCacheCollector:
+    """
+    Exposes the hit and miss counters of a ResultCache.
+    """
+
+    def __init__(self, result_cache, slo_type):
+        self._result_cache = result_cache
+        self._slo_type = slo_type
+
+    def collect(self):
+        lookups = CounterMetricFamily('slo_checker_cache_lookups', 'Lookups in the result cache.', labels=['slo_type', 'result'])
+        lookups.add_metric([self._slo_type, 'hit'], self._result_cache.hits)
+        lookups.add_metric([self._slo_type, 'miss'], self._result_cache.misses)
+        yield lookups
+
+def register_result_cache(result_cache, slo_type):
+    REGISTRY.register(ResultCacheCollector(result_cache, slo_type))
+
+def metrics_response():
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
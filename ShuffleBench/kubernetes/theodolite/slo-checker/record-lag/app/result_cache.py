@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import OrderedDict
+
+class ResultCache:
+    """
+    Bounded LRU cache with a time-to-live for evaluation results, keyed by a digest of the
+    request body. A `max_size` of 0 disables caching.
+    """
+
+    def __init__(self, max_size=128, ttl=3600.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached result for `key`, or None if there is no unexpired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._clock() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self), 'maxSize': self.max_size, 'ttl': self.ttl}
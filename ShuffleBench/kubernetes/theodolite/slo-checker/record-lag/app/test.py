@@ -1,5 +1,10 @@
 import unittest
 from main import app, check_service_level_objective
+import trend_slope_computer
+from lag_series import LagSeries, LagResultsHandler
+from stream_parser import StreamingResultsParser
+from worker_pool import create_executor, map_repetitions
+import asyncio
 import json
 from fastapi.testclient import TestClient
 
@@ -18,6 +23,34 @@ class TestSloEvaluation(unittest.TestCase):
             response = self.client.post("/evaluate-slope", json=data)
             self.assertEquals(response.json(), True)
 
+    def test_cached_result(self):
+        with open('../resources/test-3-rep-success.json') as json_file:
+            data = json.load(json_file)
+        data['metadata']['threshold'] = 2001 # not evaluated by any other test
+        hits = self.client.get("/cache").json()['hits']
+        self.assertEqual(self.client.post("/evaluate-slope", json=data).json(), True)
+        parsed = self.parse_count()
+        self.assertEqual(self.client.post("/evaluate-slope", json=data).json(), True)
+        self.assertEqual(self.client.get("/cache").json()['hits'], hits + 1)
+        self.assertEqual(self.parse_count(), parsed) # cached results are not parsed again
+
+    def parse_count(self):
+        prefix = 'slo_checker_parse_seconds_count{route="/evaluate-slope",slo_type="lag trend"} '
+        for line in self.client.get("/metrics").text.splitlines():
+            if line.startswith(prefix):
+                return float(line[len(prefix):])
+        return 0.0
+
+    def test_metrics(self):
+        with open('../resources/test-1-rep-success.json') as json_file:
+            data = json.load(json_file)
+        self.client.post("/evaluate-slope", json=data)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('slo_checker_parse_seconds_count{route="/evaluate-slope",slo_type="lag trend"}', response.text)
+        self.assertIn('slo_checker_payload_bytes_bucket', response.text)
+        self.assertIn('slo_checker_cache_lookups_total{result="hit",slo_type="lag trend"}', response.text)
+
     def test_check_service_level_objective(self):
         list = [1,2,3,4]
         self.assertEquals(check_service_level_objective(list, 2), False)
@@ -26,5 +59,62 @@ class TestSloEvaluation(unittest.TestCase):
         self.assertEquals(check_service_level_objective(list, 2), False)
         self.assertEquals(check_service_level_objective(list, 4), True)
 
+    def test_compute_warmup(self):
+        data = {'timestamp': [0, 10, 20, 30], 'value': [100, 0, 10, 20]}
+        self.assertAlmostEqual(trend_slope_computer.compute(data, 10), 1.0)
+        self.assertEqual(data, {'timestamp': [0, 10, 20, 30], 'value': [100, 0, 10, 20]})
+
+    def test_compute_many(self):
+        series = [([1.6e9, 1.6e9 + 1, 1.6e9 + 2], [0, 2, 4]), ([5, 6], [3, 2]), ([7], [1])]
+        slopes = trend_slope_computer.compute_many(series)
+        self.assertEqual(len(slopes), 3)
+        self.assertAlmostEqual(slopes[0], 2.0)
+        self.assertAlmostEqual(slopes[1], -1.0)
+        self.assertEqual(slopes[2], 0.0)
+
+    def test_compute_many_empty_series(self):
+        self.assertRaises(ValueError, trend_slope_computer.compute_many, [([], [])])
+
+    def test_lag_series_trend_slopes(self):
+        results = [
+            {'metric': {'consumergroup': 'a'}, 'values': [[0, '0'], [10, '10'], [20, 'NaN'], [30, '30']]},
+            {'metric': {'consumergroup': 'b'}, 'values': [[10, '50'], [20, '40'], [30, '30']]},
+            {'metric': {}, 'values': [[30, '7']]}
+        ]
+        group_slopes, total_slope = LagSeries.from_results(results).trend_slopes(10)
+        self.assertEqual(list(group_slopes), ['a', 'b', 'default'])
+        self.assertAlmostEqual(group_slopes['a'], 1.0)
+        self.assertAlmostEqual(group_slopes['b'], -1.0)
+        self.assertEqual(group_slopes['default'], 0.0)
+        self.assertAlmostEqual(total_slope, -59 / 170)
+
+    def test_map_repetitions_keeps_order(self):
+        for kind in ['inline', 'thread']:
+            executor = create_executor(kind, 4)
+            self.assertEqual(asyncio.run(map_repetitions(executor, abs, [-3, 2, -1, 0])), [3, 2, 1, 0])
+            if executor is not None:
+                executor.shutdown()
+        with self.assertRaises(ValueError):
+            create_executor('gpu')
+
+    def test_stream_parser_chunked(self):
+        with open('../resources/test-3-rep-success.json', 'rb') as json_file:
+            body = json_file.read()
+        data = json.loads(body)
+        handler = LagResultsHandler()
+        parser = StreamingResultsParser(handler, batch_size=4)
+        for i in range(0, len(body), 7):
+            parser.feed(body[i:i + 7])
+        parser.close()
+        self.assertEqual(handler.metadata, data['metadata'])
+        self.assertEqual(len(handler.repetitions), len(data['results']))
+        for lag_series, results in zip(handler.repetitions, data['results']):
+            self.assertEqual(lag_series.trend_slopes(0), LagSeries.from_results(results).trend_slopes(0))
+
+    def test_stream_parser_incomplete(self):
+        parser = StreamingResultsParser(LagResultsHandler())
+        parser.feed(b'{"results": [[{"metric": {}, "values": [[1, "2"]')
+        self.assertRaises(ValueError, parser.close)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
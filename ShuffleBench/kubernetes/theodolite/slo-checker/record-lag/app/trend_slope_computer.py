@@ -1,17 +1,48 @@
-from sklearn.linear_model import LinearRegression
-import pandas as pd
-import os
+import numpy as np
 
 def compute(data, warmup_sec):
-    data['sec_start'] = data.loc[0:, 'timestamp'] - data.iloc[0]['timestamp']
-    regress = data.loc[data['sec_start'] >= warmup_sec] # Warm-Up
+    timestamps = np.asarray(data['timestamp'], dtype=np.float64)
+    values = np.asarray(data['value'], dtype=np.float64)
+    regress = (timestamps - timestamps[0]) >= warmup_sec # Warm-Up
 
-    X = regress.iloc[:, 1].values.reshape(-1, 1)  # values converts it into a numpy array
-    Y = regress.iloc[:, 2].values.reshape(-1, 1)  # -1 means that calculate the dimension of rows, but have 1 column
-    linear_regressor = LinearRegression()  # create object for the class
-    linear_regressor.fit(X, Y)  # perform linear regression
-    Y_pred = linear_regressor.predict(X)  # make predictions
+    return float(compute_many([(timestamps[regress], values[regress])])[0])
 
-    trend_slope = linear_regressor.coef_[0][0]
+def compute_many(series):
+    """
+    Computes the least-squares trend slope of each (timestamps, values) pair in `series`.
+    Series may differ in length, all of them are solved in one batched pass.
+    """
+    if len(series) == 0:
+        return np.empty(0)
+    lengths = np.fromiter((len(timestamps) for timestamps, _ in series), dtype=np.int64, count=len(series))
+    x = np.concatenate([np.asarray(timestamps, dtype=np.float64) for timestamps, _ in series])
+    y = np.concatenate([np.asarray(values, dtype=np.float64) for _, values in series])
+    return slopes(x, y, lengths)
 
-    return trend_slope
+def slopes(x, y, lengths):
+    """
+    Closed-form least-squares slopes of consecutive segments of `x` and `y`, where segment
+    i has `lengths[i]` samples.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if np.any(lengths <= 0):
+        raise ValueError('Cannot compute the trend slope of an empty series.')
+    return grouped_slopes(x, y, np.repeat(np.arange(len(lengths)), lengths), len(lengths))
+
+def grouped_slopes(x, y, segment, num_segments):
+    """
+    Closed-form least-squares slopes of the samples of `x` and `y` sharing the same
+    `segment` id. Values are centered per segment before summing, so large unix timestamps
+    do not cost precision. Segments without samples get a NaN slope.
+    """
+    counts = np.bincount(segment, minlength=num_segments)
+    sample_counts = np.maximum(counts, 1)
+    dx = x - (np.bincount(segment, weights=x, minlength=num_segments) / sample_counts)[segment]
+    dy = y - (np.bincount(segment, weights=y, minlength=num_segments) / sample_counts)[segment]
+    sxy = np.bincount(segment, weights=dx * dy, minlength=num_segments)
+    sxx = np.bincount(segment, weights=dx * dx, minlength=num_segments)
+
+    # A segment without variance in x has no defined slope; report 0 like sklearn's LinearRegression
+    result = np.divide(sxy, sxx, out=np.zeros(num_segments), where=sxx != 0)
+    result[counts == 0] = np.nan
+    return result
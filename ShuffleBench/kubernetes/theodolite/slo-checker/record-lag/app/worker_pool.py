@@ -0,0 +1,31 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+EXECUTORS = ['inline', 'thread', 'process']
+
+def create_executor(kind='thread', workers=None):
+    """
+    Creates the pool repetitions are evaluated in. 'thread' suits the NumPy code paths, which
+    release the GIL, 'process' also parallelizes pure Python code at the cost of pickling the
+    repetitions, and 'inline' evaluates them one by one in the event loop (returns None).
+    """
+    if kind not in EXECUTORS:
+        raise ValueError('Invalid executor, expected one of %s.' % ', '.join(EXECUTORS))
+    if kind == 'inline':
+        return None
+    workers = workers or os.cpu_count() or 1
+    if kind == 'process':
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='evaluation')
+
+async def map_repetitions(executor, func, repetitions):
+    """
+    Applies `func` to each repetition concurrently in `executor`, off the event loop, and
+    returns the results in the order of the repetitions. With the process executor, `func`
+    and the repetitions must be picklable.
+    """
+    if executor is None:
+        return [func(repetition) for repetition in repetitions]
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(loop.run_in_executor(executor, func, repetition) for repetition in repetitions))
@@ -3,7 +3,7 @@ package com.dynatrace.research.shufflebench;
 import com.dynatrace.research.shufflebench.consumer.*;
 import com.dynatrace.research.shufflebench.matcher.MatcherService;
 import com.dynatrace.research.shufflebench.matcher.SerializableMatcherService;
-import com.dynatrace.research.shufflebench.matcher.SimpleMatcherService;
+import com.dynatrace.research.shufflebench.matcher.MatcherEngine;
 import com.dynatrace.research.shufflebench.record.*;
 import io.smallrye.config.SmallRyeConfig;
 import org.apache.flink.api.common.eventtime.WatermarkStrategy;
@@ -56,16 +56,19 @@ public class FlinkShuffle {
     final double totalSelectivity = config.getValue("matcher.zipf.total.selectivity", Double.class);
     final int numRules = config.getValue("matcher.zipf.num.rules", Integer.class);
     final double s = config.getValue("matcher.zipf.s", Double.class);
+    final MatcherEngine matcherEngine = MatcherEngine.fromName(config.getValue("matcher.engine", String.class));
+    final String snapshotDirectory = config.getValue("matcher.snapshot.dir", String.class);
     final MatcherService<TimestampedRecord> matcherService = new SerializableMatcherService<>(
         () -> {
           if (selectivities != null) {
-            return SimpleMatcherService.createFromFrequencyMap(selectivities, 0x2e3fac4f58fc98b4L);
+            return matcherEngine.createFromFrequencyMap(selectivities, 0x2e3fac4f58fc98b4L, snapshotDirectory);
           } else {
-            return SimpleMatcherService.createFromZipf(
+            return matcherEngine.createFromZipf(
                 numRules,
                 totalSelectivity,
                 s,
-                0x2e3fac4f58fc98b4L);
+                0x2e3fac4f58fc98b4L,
+                snapshotDirectory);
           }
         });
     final int outputRate = config.getValue("consumer.output.rate", Integer.class);
@@ -1,14 +1,15 @@
 package com.dynatrace.research.shufflebench;
 
 import com.dynatrace.research.shufflebench.consumer.*;
+import com.dynatrace.research.shufflebench.matcher.MatchBuffer;
 import com.dynatrace.research.shufflebench.matcher.MatcherService;
 import com.dynatrace.research.shufflebench.matcher.SerializableMatcherService;
-import com.dynatrace.research.shufflebench.matcher.SimpleMatcherService;
+import com.dynatrace.research.shufflebench.matcher.MatcherEngine;
 import com.dynatrace.research.shufflebench.record.TimestampedRecord;
 import io.smallrye.config.SmallRyeConfig;
-import org.apache.spark.api.java.function.FlatMapFunction;
 import org.apache.spark.api.java.function.FlatMapGroupsWithStateFunction;
 import org.apache.spark.api.java.function.MapFunction;
+import org.apache.spark.api.java.function.MapPartitionsFunction;
 import org.apache.spark.internal.config.Kryo;
 import org.apache.spark.sql.streaming.*;
 import org.eclipse.microprofile.config.Config;
@@ -26,6 +27,56 @@ public class SparkStructuredStreamingShuffle {
 
     private static final String APPLICATION_ID = "shufflebench-sparkStructuredStreaming";
 
+    private static final int MATCH_BATCH_SIZE = 256;
+
+    /**
+     * Matches the records of a partition in batches of {@value #MATCH_BATCH_SIZE} records with
+     * {@link MatcherService#match(com.dynatrace.research.shufflebench.record.Record[], int, MatchBuffer)} and iterates
+     * over the resulting (rule ID, record) pairs. The next batch is only read once all matches of the previous one have
+     * been consumed.
+     */
+    private static final class BatchMatchingIterator implements Iterator<Tuple2<String, TimestampedRecord>> {
+
+        private final Iterator<TimestampedRecord> records;
+
+        private final MatcherService<TimestampedRecord> matcherService;
+
+        private final TimestampedRecord[] batch = new TimestampedRecord[MATCH_BATCH_SIZE];
+
+        private final MatchBuffer matches = new MatchBuffer();
+
+        private int nextMatch;
+
+        BatchMatchingIterator(Iterator<TimestampedRecord> records, MatcherService<TimestampedRecord> matcherService) {
+            this.records = records;
+            this.matcherService = matcherService;
+        }
+
+        @Override
+        public boolean hasNext() {
+            while (nextMatch == matches.size() && records.hasNext()) {
+                int numRecords = 0;
+                while (numRecords < batch.length && records.hasNext()) {
+                    batch[numRecords++] = records.next();
+                }
+                matcherService.match(batch, numRecords, matches);
+                nextMatch = 0;
+            }
+            return nextMatch < matches.size();
+        }
+
+        @Override
+        public Tuple2<String, TimestampedRecord> next() {
+            if (!hasNext()) {
+                throw new NoSuchElementException();
+            }
+            final Tuple2<String, TimestampedRecord> match =
+                    new Tuple2<>(matches.getRuleId(nextMatch), batch[matches.getRecordIndex(nextMatch)]);
+            nextMatch++;
+            return match;
+        }
+    }
+
     public static void main(String[] args) throws StreamingQueryException, TimeoutException {
 
         SparkSession spark = SparkSession.builder()
@@ -65,16 +116,19 @@ public class SparkStructuredStreamingShuffle {
         final double totalSelectivity = config.getValue("matcher.zipf.total.selectivity", Double.class);
         final int numRules = config.getValue("matcher.zipf.num.rules", Integer.class);
         final double s = config.getValue("matcher.zipf.s", Double.class);
+        final MatcherEngine matcherEngine = MatcherEngine.fromName(config.getValue("matcher.engine", String.class));
+        final String snapshotDirectory = config.getValue("matcher.snapshot.dir", String.class);
         final MatcherService<TimestampedRecord> matcherService = new SerializableMatcherService<>(
                 () -> {
                     if (selectivities != null) {
-                        return SimpleMatcherService.createFromFrequencyMap(selectivities, 0x2e3fac4f58fc98b4L);
+                        return matcherEngine.createFromFrequencyMap(selectivities, 0x2e3fac4f58fc98b4L, snapshotDirectory);
                     } else {
-                        return SimpleMatcherService.createFromZipf(
+                        return matcherEngine.createFromZipf(
                                 numRules,
                                 totalSelectivity,
                                 s,
-                                0x2e3fac4f58fc98b4L);
+                                0x2e3fac4f58fc98b4L,
+                                snapshotDirectory);
                     }
                 });
         final int outputRate = config.getValue("consumer.output.rate", Integer.class);
@@ -90,19 +144,8 @@ public class SparkStructuredStreamingShuffle {
                 .map(
                         (MapFunction<Tuple2<byte[], Timestamp>, TimestampedRecord>) timestampedArray -> new TimestampedRecord(timestampedArray._2.getTime(), timestampedArray._1),
                         Encoders.kryo(TimestampedRecord.class)
-                ).flatMap((FlatMapFunction<TimestampedRecord, Tuple2<String, TimestampedRecord>>)
-                            x -> {
-                                // return matcherService.match(x)
-                                //        .stream()
-                                //        .map(entry -> new Tuple2<>(entry.getKey(), entry.getValue()))
-                                //        .iterator();
-                                List<Tuple2<String, TimestampedRecord>> tuples = new ArrayList<>();
-                                Collection<Map.Entry<String, TimestampedRecord>> entries = matcherService.match(x);
-                                for (Map.Entry<String, TimestampedRecord> entry : entries) {
-                                    tuples.add(new Tuple2<>(entry.getKey(), entry.getValue()));
-                                }
-                                return tuples.iterator();
-                            },
+                ).mapPartitions((MapPartitionsFunction<TimestampedRecord, Tuple2<String, TimestampedRecord>>)
+                            records -> new BatchMatchingIterator(records, matcherService),
                     Encoders.tuple(Encoders.STRING(), Encoders.kryo(TimestampedRecord.class))
                 );
 
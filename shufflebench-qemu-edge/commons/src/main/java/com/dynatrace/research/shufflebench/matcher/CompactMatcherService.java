@@ -0,0 +1,80 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.util.*;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.stream.Stream;
+
+/**
+ * A {@link MatcherService} for a fixed set of range-based matching rules, backed by a
+ * {@link CompactRangeBasedMatchingRuleIndex}.
+ */
+public class CompactMatcherService<T extends Record> implements MatcherService<T> {
+
+  // indices built by createFromZipf, shared by all matcher services of this JVM created with the same parameters
+  private static final Map<List<Object>, CompactRangeBasedMatchingRuleIndex> ZIPF_INDICES = new ConcurrentHashMap<>();
+
+  private final CompactRangeBasedMatchingRuleIndex index;
+
+  public CompactMatcherService(CompactRangeBasedMatchingRuleIndex index) {
+    this.index = index;
+  }
+
+  @Override
+  public void addMatchingRule(String id, MatchingRule matchingRule) {
+    throw new UnsupportedOperationException("A CompactMatcherService cannot be changed after it has been constructed.");
+  }
+
+  @Override
+  public boolean removeMatchingRule(String id) {
+    throw new UnsupportedOperationException("A CompactMatcherService cannot be changed after it has been constructed.");
+  }
+
+  @Override
+  public Collection<Map.Entry<String, T>> match(T record) {
+    List<Map.Entry<String, T>> result = new ArrayList<>();
+    index.forEachMatchingConsumer(record, id -> result.add(Map.entry(id, record)));
+    return result;
+  }
+
+  @Override
+  public void match(T[] records, int numRecords, MatchBuffer matches) {
+    matches.clear();
+    final long[] hashValues = matches.hashValues(records, numRecords);
+    for (int i = 0; i < numRecords; i++) {
+      index.addMatches(hashValues[i], i, matches);
+    }
+  }
+
+  public static <T extends Record> CompactMatcherService<T> createFromZipf(
+      final int numRules,
+      final double totalSelectivity,
+      final double s,
+      final long seed
+  ) {
+    final CompactRangeBasedMatchingRuleIndex index = ZIPF_INDICES.computeIfAbsent(
+        List.of(numRules, totalSelectivity, s, seed),
+        key -> buildIndex(SimpleMatcherService.zipfFrequencies(numRules, totalSelectivity, s), seed, numRules));
+    return new CompactMatcherService<>(index);
+  }
+
+  public static <T extends Record> CompactMatcherService<T> createFromFrequencyMap(Map<Double, Integer> selectivities, final long seed) {
+    return createFromFrequencyStream(selectivities.entrySet().stream(), seed);
+  }
+
+  public static <T extends Record> CompactMatcherService<T> createFromFrequencyStream(Stream<Map.Entry<Double, Integer>> selectivities, final long seed) {
+    return new CompactMatcherService<>(buildIndex(selectivities, seed, 16));
+  }
+
+  static CompactRangeBasedMatchingRuleIndex buildIndex(Stream<Map.Entry<Double, Integer>> selectivities, final long seed, final int expectedNumRules) {
+    final List<String> ids = new ArrayList<>(expectedNumRules);
+    final List<RangeBasedMatchingRule> rules = new ArrayList<>(expectedNumRules);
+    SimpleMatcherService.forEachRule(selectivities, seed, (id, rule) -> {
+      ids.add(id);
+      rules.add(rule);
+    });
+    return CompactRangeBasedMatchingRuleIndex.of(ids, rules);
+  }
+
+}
@@ -0,0 +1,84 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.util.*;
+import java.util.stream.Stream;
+
+/**
+ * A {@link MatcherService} like {@link SimpleMatcherService}, but indexing range-based matching rules in an
+ * {@link IntervalMatchingRuleIndex}. Its memory use is linear in the number of rules, independent of their
+ * selectivities, which suits rule sets with very wide ranges.
+ */
+public class IntervalMatcherService<T extends Record> implements MatcherService<T> {
+
+  private final Map<String, MatchingRule> matchingRuleEntries = new HashMap<>();
+
+  private final IntervalMatchingRuleIndex intervalMatchingRuleIndex = new IntervalMatchingRuleIndex();
+
+
+  @Override
+  public void addMatchingRule(String id, MatchingRule matchingRule) {
+    if (matchingRule instanceof RangeBasedMatchingRule) {
+      matchingRuleEntries.remove(id);
+      intervalMatchingRuleIndex.add(id, (RangeBasedMatchingRule) matchingRule);
+    } else {
+      intervalMatchingRuleIndex.remove(id);
+      matchingRuleEntries.put(id, matchingRule);
+    }
+  }
+
+  @Override
+  public boolean removeMatchingRule(String id) {
+    return (matchingRuleEntries.remove(id) != null) || intervalMatchingRuleIndex.remove(id);
+  }
+
+  @Override
+  public Collection<Map.Entry<String, T>> match(T record) {
+    List<Map.Entry<String, T>> result = new ArrayList<>();
+
+    intervalMatchingRuleIndex.forEachMatchingConsumer(record, id -> result.add(Map.entry(id, record)));
+
+    for (Map.Entry<String, MatchingRule> entry : matchingRuleEntries.entrySet()) {
+      if (entry.getValue().test(record)) {
+        result.add(Map.entry(entry.getKey(), record));
+      }
+    }
+
+    return result;
+  }
+
+  @Override
+  public void match(T[] records, int numRecords, MatchBuffer matches) {
+    matches.clear();
+    final long[] hashValues = matches.hashValues(records, numRecords);
+    for (int i = 0; i < numRecords; i++) {
+      intervalMatchingRuleIndex.addMatches(hashValues[i], i, matches);
+      for (Map.Entry<String, MatchingRule> entry : matchingRuleEntries.entrySet()) {
+        if (entry.getValue().test(records[i])) {
+          matches.add(entry.getKey(), i);
+        }
+      }
+    }
+  }
+
+  public static <T extends Record> IntervalMatcherService<T> createFromZipf(
+      final int numRules,
+      final double totalSelectivity,
+      final double s,
+      final long seed
+  ) {
+    return createFromFrequencyStream(SimpleMatcherService.zipfFrequencies(numRules, totalSelectivity, s), seed);
+  }
+
+  public static <T extends Record> IntervalMatcherService<T> createFromFrequencyMap(Map<Double, Integer> selectivities, final long seed) {
+    return createFromFrequencyStream(selectivities.entrySet().stream(), seed);
+  }
+
+  public static <T extends Record> IntervalMatcherService<T> createFromFrequencyStream(Stream<Map.Entry<Double, Integer>> selectivities, final long seed) {
+    final IntervalMatcherService<T> matcherService = new IntervalMatcherService<>();
+    SimpleMatcherService.forEachRule(selectivities, seed, matcherService::addMatchingRule);
+    return matcherService;
+  }
+
+}
@@ -0,0 +1,225 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.util.HashMap;
+import java.util.LinkedHashSet;
+import java.util.Map;
+import java.util.Set;
+import java.util.SplittableRandom;
+import java.util.function.Consumer;
+
+/**
+ * Indexes {@link RangeBasedMatchingRule}s as intervals of the 63-bit hash space in an interval tree (a treap ordered by
+ * interval start and augmented with the maximal interval end of each subtree).
+ *
+ * <p>In contrast to {@link RangeBasedMatchingRuleIndex}, each rule is stored once (twice if its range wraps around the
+ * end of the hash space) regardless of its width, so memory is linear in the number of rules, and adding and removing a
+ * rule takes logarithmic time. Rules matching all records are kept in a separate set.
+ */
+public class IntervalMatchingRuleIndex {
+
+    private static final long HASH_MASK = 0x7fffffffffffffffL;
+
+    private static final Node[] NO_NODES = new Node[0];
+
+    private final Map<String, Node[]> intervals = new HashMap<>();
+
+    private final Set<String> alwaysMatching = new LinkedHashSet<>();
+
+    private final SplittableRandom random = new SplittableRandom(0x5be0cd19137e2179L);
+
+    private Node root;
+
+    private long sequenceNumber;
+
+    private static final class Node {
+
+        private final String id;
+
+        private final long start;
+
+        private final long last; // inclusive
+
+        private final long sequenceNumber; // to order intervals with the same start
+
+        private final int priority;
+
+        private long maxLast;
+
+        private Node left;
+
+        private Node right;
+
+        private Node(String id, long start, long last, long sequenceNumber, int priority) {
+            this.id = id;
+            this.start = start;
+            this.last = last;
+            this.sequenceNumber = sequenceNumber;
+            this.priority = priority;
+            this.maxLast = last;
+        }
+
+        private void update() {
+            maxLast = last;
+            if (left != null && left.maxLast > maxLast) maxLast = left.maxLast;
+            if (right != null && right.maxLast > maxLast) maxLast = right.maxLast;
+        }
+
+        private int compareTo(Node other) {
+            int result = Long.compare(start, other.start);
+            return result != 0 ? result : Long.compare(sequenceNumber, other.sequenceNumber);
+        }
+    }
+
+    public void add(String id, RangeBasedMatchingRule matchingRule) {
+        remove(id); // to make sure that there is no rule with same id
+        long rangeWidth = matchingRule.getRangeWidth();
+        if (rangeWidth < 0L) {
+            alwaysMatching.add(id);
+            intervals.put(id, NO_NODES);
+            return;
+        }
+        long start = matchingRule.getRangeOffset() & HASH_MASK;
+        Node[] nodes;
+        if (rangeWidth == 0L) {
+            nodes = NO_NODES; // matches no record
+        } else if (rangeWidth - 1 <= HASH_MASK - start) {
+            nodes = new Node[]{newNode(id, start, start + rangeWidth - 1)};
+        } else {
+            // the range wraps around the end of the hash space
+            nodes = new Node[]{newNode(id, start, HASH_MASK), newNode(id, 0L, rangeWidth - 2 - (HASH_MASK - start))};
+        }
+        for (Node node : nodes) {
+            root = insert(root, node);
+        }
+        intervals.put(id, nodes);
+    }
+
+    public boolean remove(String id) {
+        Node[] nodes = intervals.remove(id);
+        if (nodes == null) {
+            return false;
+        }
+        alwaysMatching.remove(id);
+        for (Node node : nodes) {
+            root = remove(root, node);
+        }
+        return true;
+    }
+
+    public void forEachMatchingConsumer(Record record, Consumer<String> consumer) {
+        alwaysMatching.forEach(consumer);
+        long value = RangeBasedMatchingRule.extractHashValueFromRecord(record) & HASH_MASK;
+        forEachContaining(root, value, consumer);
+    }
+
+    void addMatches(long hashValue, int recordIndex, MatchBuffer matches) {
+        for (String id : alwaysMatching) {
+            matches.add(id, recordIndex);
+        }
+        addContaining(root, hashValue & HASH_MASK, recordIndex, matches);
+    }
+
+    private Node newNode(String id, long start, long last) {
+        return new Node(id, start, last, sequenceNumber++, random.nextInt());
+    }
+
+    private static void forEachContaining(Node node, long value, Consumer<String> consumer) {
+        while (node != null && node.maxLast >= value) {
+            forEachContaining(node.left, value, consumer);
+            if (node.start > value) {
+                return; // all intervals in the right subtree start after the value
+            }
+            if (node.last >= value) {
+                consumer.accept(node.id);
+            }
+            node = node.right;
+        }
+    }
+
+    private static void addContaining(Node node, long value, int recordIndex, MatchBuffer matches) {
+        while (node != null && node.maxLast >= value) {
+            addContaining(node.left, value, recordIndex, matches);
+            if (node.start > value) {
+                return;
+            }
+            if (node.last >= value) {
+                matches.add(node.id, recordIndex);
+            }
+            node = node.right;
+        }
+    }
+
+    private static Node insert(Node node, Node newNode) {
+        if (node == null) {
+            return newNode;
+        }
+        if (newNode.compareTo(node) < 0) {
+            node.left = insert(node.left, newNode);
+            if (node.left.priority > node.priority) {
+                node = rotateRight(node);
+            }
+        } else {
+            node.right = insert(node.right, newNode);
+            if (node.right.priority > node.priority) {
+                node = rotateLeft(node);
+            }
+        }
+        node.update();
+        return node;
+    }
+
+    private static Node remove(Node node, Node target) {
+        if (node == null) {
+            return null;
+        }
+        int comparison = target.compareTo(node);
+        if (comparison < 0) {
+            node.left = remove(node.left, target);
+        } else if (comparison > 0) {
+            node.right = remove(node.right, target);
+        } else {
+            return merge(node.left, node.right);
+        }
+        node.update();
+        return node;
+    }
+
+    // all intervals in the left tree precede those in the right tree
+    private static Node merge(Node left, Node right) {
+        if (left == null) {
+            return right;
+        }
+        if (right == null) {
+            return left;
+        }
+        if (left.priority > right.priority) {
+            left.right = merge(left.right, right);
+            left.update();
+            return left;
+        } else {
+            right.left = merge(left, right.left);
+            right.update();
+            return right;
+        }
+    }
+
+    private static Node rotateRight(Node node) {
+        Node left = node.left;
+        node.left = left.right;
+        left.right = node;
+        node.update();
+        left.update();
+        return left;
+    }
+
+    private static Node rotateLeft(Node node) {
+        Node right = node.right;
+        node.right = right.left;
+        right.left = node;
+        node.update();
+        right.update();
+        return right;
+    }
+}
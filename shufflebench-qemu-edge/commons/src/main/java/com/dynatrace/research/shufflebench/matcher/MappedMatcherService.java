@@ -0,0 +1,114 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.hash4j.hashing.HashStream64;
+import com.dynatrace.hash4j.hashing.Hashing;
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.io.IOException;
+import java.io.UncheckedIOException;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.*;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.function.Supplier;
+
+/**
+ * A {@link MatcherService} for a fixed set of range-based matching rules, backed by a
+ * {@link MappedRangeBasedMatchingRuleIndex}.
+ *
+ * <p>The index files are kept in a snapshot directory (configured with {@code matcher.snapshot.dir}) and named after
+ * the parameters the rules are generated from, the version of the rule generation and the version of the file format.
+ * A missing file is generated once, after which all matcher services of all processes using the same directory map the
+ * same file.
+ */
+public class MappedMatcherService<T extends Record> implements MatcherService<T> {
+
+  /**
+   * Version of the generation of rules from their parameters. It must be incremented whenever
+   * {@link SimpleMatcherService#zipfFrequencies(int, double, double)} or
+   * {@link CompactMatcherService#buildIndex} generate different rules for the same parameters, so that files
+   * generated by older versions are not mapped anymore.
+   */
+  static final int RULES_VERSION = 1;
+
+  // indices mapped by this JVM, so that each file is generated and mapped at most once
+  private static final Map<Path, MappedRangeBasedMatchingRuleIndex> INDICES = new ConcurrentHashMap<>();
+
+  private final MappedRangeBasedMatchingRuleIndex index;
+
+  public MappedMatcherService(MappedRangeBasedMatchingRuleIndex index) {
+    this.index = index;
+  }
+
+  @Override
+  public void addMatchingRule(String id, MatchingRule matchingRule) {
+    throw new UnsupportedOperationException("A MappedMatcherService cannot be changed after it has been constructed.");
+  }
+
+  @Override
+  public boolean removeMatchingRule(String id) {
+    throw new UnsupportedOperationException("A MappedMatcherService cannot be changed after it has been constructed.");
+  }
+
+  @Override
+  public Collection<Map.Entry<String, T>> match(T record) {
+    List<Map.Entry<String, T>> result = new ArrayList<>();
+    index.forEachMatchingConsumer(record, id -> result.add(Map.entry(id, record)));
+    return result;
+  }
+
+  @Override
+  public void match(T[] records, int numRecords, MatchBuffer matches) {
+    matches.clear();
+    final long[] hashValues = matches.hashValues(records, numRecords);
+    for (int i = 0; i < numRecords; i++) {
+      index.addMatches(hashValues[i], i, matches);
+    }
+  }
+
+  public static <T extends Record> MappedMatcherService<T> createFromZipf(
+      final Path snapshotDirectory,
+      final int numRules,
+      final double totalSelectivity,
+      final double s,
+      final long seed
+  ) {
+    final String fileName = String.format(
+        Locale.ROOT, "zipf-%d-%s-%s-%016x-r%d-v%d.matcher",
+        numRules, totalSelectivity, s, seed, RULES_VERSION, MappedRangeBasedMatchingRuleIndex.VERSION);
+    return load(snapshotDirectory.resolve(fileName),
+        () -> CompactMatcherService.buildIndex(SimpleMatcherService.zipfFrequencies(numRules, totalSelectivity, s), seed, numRules));
+  }
+
+  public static <T extends Record> MappedMatcherService<T> createFromFrequencyMap(
+      final Path snapshotDirectory,
+      final Map<Double, Integer> selectivities,
+      final long seed
+  ) {
+    // rules are numbered in iteration order, so the order is part of the file name
+    final HashStream64 hashStream = Hashing.komihash4_3().hashStream();
+    selectivities.forEach((selectivity, frequency) -> hashStream.putDouble(selectivity).putInt(frequency));
+    final String fileName = String.format(
+        Locale.ROOT, "frequencies-%016x-%016x-r%d-v%d.matcher",
+        hashStream.getAsLong(), seed, RULES_VERSION, MappedRangeBasedMatchingRuleIndex.VERSION);
+    return load(snapshotDirectory.resolve(fileName),
+        () -> CompactMatcherService.buildIndex(selectivities.entrySet().stream(), seed, 16));
+  }
+
+  /**
+   * Maps the index file, generating it first with the given supplier if it does not exist.
+   */
+  public static <T extends Record> MappedMatcherService<T> load(Path file, Supplier<CompactRangeBasedMatchingRuleIndex> indexSupplier) {
+    return new MappedMatcherService<>(INDICES.computeIfAbsent(file, f -> {
+      try {
+        if (Files.notExists(f)) {
+          MappedRangeBasedMatchingRuleIndex.write(indexSupplier.get(), f);
+        }
+        return MappedRangeBasedMatchingRuleIndex.open(f);
+      } catch (IOException e) {
+        throw new UncheckedIOException(e);
+      }
+    }));
+  }
+
+}
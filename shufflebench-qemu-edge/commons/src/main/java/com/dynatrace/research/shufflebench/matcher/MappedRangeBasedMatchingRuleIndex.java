@@ -0,0 +1,235 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.io.BufferedOutputStream;
+import java.io.DataOutputStream;
+import java.io.IOException;
+import java.nio.ByteBuffer;
+import java.nio.IntBuffer;
+import java.nio.LongBuffer;
+import java.nio.MappedByteBuffer;
+import java.nio.channels.FileChannel;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.StandardCopyOption;
+import java.nio.file.StandardOpenOption;
+import java.util.function.Consumer;
+import java.util.function.IntConsumer;
+
+import static com.dynatrace.research.shufflebench.matcher.RangeBasedMatchingRuleIndex.NUM_SLOTS;
+import static com.dynatrace.research.shufflebench.matcher.RangeBasedMatchingRuleIndex.SLOT_WIDTH_EXPONENT;
+
+/**
+ * A {@link CompactRangeBasedMatchingRuleIndex} stored in a file and read through a {@link MappedByteBuffer}.
+ *
+ * <p>The index lives outside the heap, so loading it costs no more than mapping the file, and all processes on a host
+ * mapping the same file share a single copy of it in the page cache. The file is written once with
+ * {@link #write(CompactRangeBasedMatchingRuleIndex, Path)} and contains, in big-endian byte order, a header of
+ * {@value #HEADER_INTS} ints (magic number, format version, number of rules, number of slots, number of slot entries,
+ * number of always matching rules, number of ID bytes, zero), the range offsets and range widths of all rules as longs,
+ * the arrays of the compact index as ints, the start of the ID of each rule (plus the end of the last ID) as ints, and
+ * finally the UTF-8 encoded IDs.
+ */
+public class MappedRangeBasedMatchingRuleIndex {
+
+    static final int MAGIC = 0x53424d49; // "SBMI"
+
+    static final int VERSION = 1;
+
+    static final int HEADER_INTS = 8;
+
+    private static final long HASH_MASK = 0x7fffffffffffffffL;
+
+    private final LongBuffer rangeOffsets;
+
+    private final LongBuffer rangeWidths;
+
+    private final IntBuffer slotStarts;
+
+    private final IntBuffer slotRules;
+
+    private final IntBuffer alwaysMatchingRules;
+
+    private final IntBuffer idStarts;
+
+    private final ByteBuffer idBytes;
+
+    private final String[] ids; // decoded on first access
+
+    private MappedRangeBasedMatchingRuleIndex(ByteBuffer buffer, int numRules, int numEntries, int numAlwaysMatching, int numIdBytes) {
+        int position = HEADER_INTS * Integer.BYTES;
+        this.rangeOffsets = section(buffer, position, numRules * Long.BYTES).asLongBuffer();
+        position += numRules * Long.BYTES;
+        this.rangeWidths = section(buffer, position, numRules * Long.BYTES).asLongBuffer();
+        position += numRules * Long.BYTES;
+        this.slotStarts = section(buffer, position, (NUM_SLOTS + 1) * Integer.BYTES).asIntBuffer();
+        position += (NUM_SLOTS + 1) * Integer.BYTES;
+        this.slotRules = section(buffer, position, numEntries * Integer.BYTES).asIntBuffer();
+        position += numEntries * Integer.BYTES;
+        this.alwaysMatchingRules = section(buffer, position, numAlwaysMatching * Integer.BYTES).asIntBuffer();
+        position += numAlwaysMatching * Integer.BYTES;
+        this.idStarts = section(buffer, position, (numRules + 1) * Integer.BYTES).asIntBuffer();
+        position += (numRules + 1) * Integer.BYTES;
+        this.idBytes = section(buffer, position, numIdBytes);
+        this.ids = new String[numRules];
+    }
+
+    private static ByteBuffer section(ByteBuffer buffer, int position, int length) {
+        ByteBuffer duplicate = buffer.duplicate();
+        duplicate.position(position).limit(position + length);
+        return duplicate.slice();
+    }
+
+    private static long expectedFileSize(int numRules, int numEntries, int numAlwaysMatching, long numIdBytes) {
+        return (long) HEADER_INTS * Integer.BYTES
+                + 2L * numRules * Long.BYTES
+                + ((long) NUM_SLOTS + 1 + numEntries + numAlwaysMatching + numRules + 1) * Integer.BYTES
+                + numIdBytes;
+    }
+
+    /**
+     * Writes the given index to a file. The file is first written under a temporary name and then renamed, so that
+     * processes opening the file concurrently never see it incomplete.
+     */
+    public static void write(CompactRangeBasedMatchingRuleIndex index, Path file) throws IOException {
+        final byte[][] encodedIds = new byte[index.size()][];
+        long numIdBytes = 0;
+        for (int rule = 0; rule < index.size(); ++rule) {
+            encodedIds[rule] = index.ids[rule].getBytes(StandardCharsets.UTF_8);
+            numIdBytes += encodedIds[rule].length;
+        }
+        final long fileSize = expectedFileSize(index.size(), index.slotRules.length, index.alwaysMatchingRules.length, numIdBytes);
+        if (fileSize > Integer.MAX_VALUE) {
+            throw new IllegalArgumentException("The index is too large to be mapped: " + fileSize + " bytes");
+        }
+
+        final Path directory = file.toAbsolutePath().getParent();
+        Files.createDirectories(directory);
+        final Path temporaryFile = Files.createTempFile(directory, file.getFileName().toString(), ".tmp");
+        try {
+            try (DataOutputStream out = new DataOutputStream(new BufferedOutputStream(Files.newOutputStream(temporaryFile)))) {
+                out.writeInt(MAGIC);
+                out.writeInt(VERSION);
+                out.writeInt(index.size());
+                out.writeInt(NUM_SLOTS);
+                out.writeInt(index.slotRules.length);
+                out.writeInt(index.alwaysMatchingRules.length);
+                out.writeInt((int) numIdBytes);
+                out.writeInt(0);
+                for (long rangeOffset : index.rangeOffsets) {
+                    out.writeLong(rangeOffset);
+                }
+                for (long rangeWidth : index.rangeWidths) {
+                    out.writeLong(rangeWidth);
+                }
+                for (int slotStart : index.slotStarts) {
+                    out.writeInt(slotStart);
+                }
+                for (int rule : index.slotRules) {
+                    out.writeInt(rule);
+                }
+                for (int rule : index.alwaysMatchingRules) {
+                    out.writeInt(rule);
+                }
+                int idStart = 0;
+                for (byte[] encodedId : encodedIds) {
+                    out.writeInt(idStart);
+                    idStart += encodedId.length;
+                }
+                out.writeInt(idStart);
+                for (byte[] encodedId : encodedIds) {
+                    out.write(encodedId);
+                }
+            }
+            Files.move(temporaryFile, file, StandardCopyOption.ATOMIC_MOVE, StandardCopyOption.REPLACE_EXISTING);
+        } finally {
+            Files.deleteIfExists(temporaryFile);
+        }
+    }
+
+    /**
+     * Maps an index written with {@link #write(CompactRangeBasedMatchingRuleIndex, Path)}.
+     */
+    public static MappedRangeBasedMatchingRuleIndex open(Path file) throws IOException {
+        final MappedByteBuffer buffer;
+        try (FileChannel channel = FileChannel.open(file, StandardOpenOption.READ)) {
+            if (channel.size() < HEADER_INTS * Integer.BYTES || channel.size() > Integer.MAX_VALUE) {
+                throw new IOException("Not a matcher index file: " + file);
+            }
+            buffer = channel.map(FileChannel.MapMode.READ_ONLY, 0, channel.size());
+        }
+        final int magic = buffer.getInt(0);
+        final int version = buffer.getInt(4);
+        final int numRules = buffer.getInt(8);
+        final int numSlots = buffer.getInt(12);
+        final int numEntries = buffer.getInt(16);
+        final int numAlwaysMatching = buffer.getInt(20);
+        final int numIdBytes = buffer.getInt(24);
+        if (magic != MAGIC) {
+            throw new IOException("Not a matcher index file: " + file);
+        }
+        if (version != VERSION || numSlots != NUM_SLOTS) {
+            throw new IOException("Unsupported matcher index file (version " + version + ", " + numSlots + " slots): " + file);
+        }
+        if (numRules < 0 || numEntries < 0 || numAlwaysMatching < 0 || numIdBytes < 0
+                || expectedFileSize(numRules, numEntries, numAlwaysMatching, numIdBytes) != buffer.capacity()) {
+            throw new IOException("Truncated or corrupt matcher index file: " + file);
+        }
+        return new MappedRangeBasedMatchingRuleIndex(buffer, numRules, numEntries, numAlwaysMatching, numIdBytes);
+    }
+
+    /**
+     * Returns the number of rules in this index.
+     */
+    public int size() {
+        return ids.length;
+    }
+
+    /**
+     * Returns the ID of the rule at the given position.
+     */
+    public String getId(int rule) {
+        String id = ids[rule];
+        if (id == null) {
+            id = StandardCharsets.UTF_8.decode(section(idBytes, idStarts.get(rule), idStarts.get(rule + 1) - idStarts.get(rule))).toString();
+            ids[rule] = id; // racy, but all threads decode the same string
+        }
+        return id;
+    }
+
+    /**
+     * Passes the position of each rule matching a record with the given hash value (see
+     * {@link RangeBasedMatchingRule#extractHashValueFromRecord(Record)}) to the consumer.
+     */
+    public void forEachMatchingRule(long hashValue, IntConsumer ruleConsumer) {
+        for (int i = 0, end = alwaysMatchingRules.limit(); i < end; ++i) {
+            ruleConsumer.accept(alwaysMatchingRules.get(i));
+        }
+        int slotIdx = (int) ((hashValue & HASH_MASK) >>> SLOT_WIDTH_EXPONENT);
+        for (int i = slotStarts.get(slotIdx), end = slotStarts.get(slotIdx + 1); i < end; ++i) {
+            int rule = slotRules.get(i);
+            if (((hashValue - rangeOffsets.get(rule)) & HASH_MASK) < rangeWidths.get(rule)) {
+                ruleConsumer.accept(rule);
+            }
+        }
+    }
+
+    public void forEachMatchingConsumer(Record record, Consumer<String> consumer) {
+        forEachMatchingRule(RangeBasedMatchingRule.extractHashValueFromRecord(record), rule -> consumer.accept(getId(rule)));
+    }
+
+    void addMatches(long hashValue, int recordIndex, MatchBuffer matches) {
+        for (int i = 0, end = alwaysMatchingRules.limit(); i < end; ++i) {
+            matches.add(getId(alwaysMatchingRules.get(i)), recordIndex);
+        }
+        int slotIdx = (int) ((hashValue & HASH_MASK) >>> SLOT_WIDTH_EXPONENT);
+        for (int i = slotStarts.get(slotIdx), end = slotStarts.get(slotIdx + 1); i < end; ++i) {
+            int rule = slotRules.get(i);
+            if (((hashValue - rangeOffsets.get(rule)) & HASH_MASK) < rangeWidths.get(rule)) {
+                matches.add(getId(rule), recordIndex);
+            }
+        }
+    }
+}
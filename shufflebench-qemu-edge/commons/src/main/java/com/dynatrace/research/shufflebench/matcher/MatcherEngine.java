@@ -0,0 +1,87 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+
+import java.nio.file.Paths;
+import java.util.Arrays;
+import java.util.Map;
+
+/**
+ * The available {@link MatcherService} implementations, selected with the {@code matcher.engine} configuration.
+ */
+public enum MatcherEngine {
+  /**
+   * {@link SimpleMatcherService}, which supports adding and removing rules.
+   */
+  SIMPLE("simple"),
+  /**
+   * {@link CompactMatcherService}, an immutable array-backed index for large rule sets.
+   */
+  COMPACT("compact"),
+  /**
+   * {@link IntervalMatcherService}, which needs memory linear in the number of rules regardless of their widths.
+   */
+  INTERVAL("interval"),
+  /**
+   * {@link MappedMatcherService}, which generates its index once and shares it through memory-mapped files.
+   */
+  MAPPED("mapped");
+
+  private final String name;
+
+  MatcherEngine(final String name) {
+    this.name = name;
+  }
+
+  public static MatcherEngine fromName(final String name) {
+    return Arrays.stream(MatcherEngine.values())
+        .filter(e -> e.name.equals(name))
+        .findFirst()
+        .orElseThrow(() -> new IllegalArgumentException("Unknown matcher engine: " + name));
+  }
+
+  /**
+   * Creates a matcher service with Zipf-distributed rule selectivities. {@code snapshotDirectory} (configured with
+   * {@code matcher.snapshot.dir}) is the directory in which {@link #MAPPED} keeps its index files; the other engines
+   * ignore it.
+   */
+  public <T extends Record> MatcherService<T> createFromZipf(
+      final int numRules,
+      final double totalSelectivity,
+      final double s,
+      final long seed,
+      final String snapshotDirectory
+  ) {
+    switch (this) {
+      case COMPACT:
+        return CompactMatcherService.createFromZipf(numRules, totalSelectivity, s, seed);
+      case INTERVAL:
+        return IntervalMatcherService.createFromZipf(numRules, totalSelectivity, s, seed);
+      case MAPPED:
+        return MappedMatcherService.createFromZipf(Paths.get(snapshotDirectory), numRules, totalSelectivity, s, seed);
+      default:
+        return SimpleMatcherService.createFromZipf(numRules, totalSelectivity, s, seed);
+    }
+  }
+
+  /**
+   * Creates a matcher service with the given numbers of rules per selectivity. See
+   * {@link #createFromZipf(int, double, double, long, String)} for {@code snapshotDirectory}.
+   */
+  public <T extends Record> MatcherService<T> createFromFrequencyMap(
+      final Map<Double, Integer> selectivities,
+      final long seed,
+      final String snapshotDirectory
+  ) {
+    switch (this) {
+      case COMPACT:
+        return CompactMatcherService.createFromFrequencyMap(selectivities, seed);
+      case INTERVAL:
+        return IntervalMatcherService.createFromFrequencyMap(selectivities, seed);
+      case MAPPED:
+        return MappedMatcherService.createFromFrequencyMap(Paths.get(snapshotDirectory), selectivities, seed);
+      default:
+        return SimpleMatcherService.createFromFrequencyMap(selectivities, seed);
+    }
+  }
+}
@@ -29,4 +29,20 @@ public interface MatcherService<T extends Record> {
    * @param record The record to be matched
    */
   Collection<Map.Entry<String, T>> match(T record);
+
+  /**
+   * Finds the IDs of all corresponding consumers for a batch of records, replacing the previous content of the buffer.
+   *
+   * @param records    the records to be matched
+   * @param numRecords the number of records to be matched, starting at the first one
+   * @param matches    the buffer receiving the ID of the rule and the index of the record of each match
+   */
+  default void match(T[] records, int numRecords, MatchBuffer matches) {
+    matches.clear();
+    for (int i = 0; i < numRecords; i++) {
+      for (Map.Entry<String, T> entry : match(records[i])) {
+        matches.add(entry.getKey(), i);
+      }
+    }
+  }
 }
@@ -38,6 +38,12 @@ public class SerializableMatcherService<T extends Record> implements MatcherServ
     return this.matcherService.match(record);
   }
 
+  @Override
+  public void match(T[] records, int numRecords, MatchBuffer matches) {
+    this.buildMatcherServiceIfAbsent();
+    this.matcherService.match(records, numRecords, matches);
+  }
+
   private void buildMatcherServiceIfAbsent() {
     if (this.matcherService == null) {
       this.matcherService = this.matcherServiceFactory.get();
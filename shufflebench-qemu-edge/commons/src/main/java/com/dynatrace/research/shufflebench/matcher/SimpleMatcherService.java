@@ -1,34 +1,58 @@
 package com.dynatrace.research.shufflebench.matcher;
 
+import com.dynatrace.hash4j.hashing.HashStream64;
 import com.dynatrace.hash4j.hashing.Hashing;
 import com.dynatrace.research.shufflebench.record.Record;
 
 import java.util.*;
+import java.util.concurrent.ConcurrentHashMap;
 import java.util.concurrent.atomic.AtomicInteger;
+import java.util.function.BiConsumer;
 import java.util.stream.IntStream;
 import java.util.stream.Stream;
 
 public class SimpleMatcherService<T extends Record> implements MatcherService<T> {
 
+  // indices built by createFromZipf, shared by all matcher services of this JVM created with the same parameters
+  private static final Map<List<Object>, RangeBasedMatchingRuleIndex> ZIPF_INDICES = new ConcurrentHashMap<>();
+
   private final Map<String, MatchingRule> matchingRuleEntries = new HashMap<>();
 
-  private final RangeBasedMatchingRuleIndex rangeBasedMatchingRuleIndex = new RangeBasedMatchingRuleIndex();
+  private RangeBasedMatchingRuleIndex rangeBasedMatchingRuleIndex;
+
+  private boolean indexShared; // a shared index is copied before it is changed
 
+  public SimpleMatcherService() {
+    this(new RangeBasedMatchingRuleIndex(), false);
+  }
+
+  private SimpleMatcherService(RangeBasedMatchingRuleIndex rangeBasedMatchingRuleIndex, boolean indexShared) {
+    this.rangeBasedMatchingRuleIndex = rangeBasedMatchingRuleIndex;
+    this.indexShared = indexShared;
+  }
+
+  private RangeBasedMatchingRuleIndex modifiableIndex() {
+    if (indexShared) {
+      rangeBasedMatchingRuleIndex = rangeBasedMatchingRuleIndex.copy();
+      indexShared = false;
+    }
+    return rangeBasedMatchingRuleIndex;
+  }
 
   @Override
   public void addMatchingRule(String id, MatchingRule matchingRule) {
     if (matchingRule instanceof RangeBasedMatchingRule) {
       matchingRuleEntries.remove(id);
-      rangeBasedMatchingRuleIndex.add(id, (RangeBasedMatchingRule) matchingRule);
+      modifiableIndex().add(id, (RangeBasedMatchingRule) matchingRule);
     } else {
-      rangeBasedMatchingRuleIndex.remove(id);
+      modifiableIndex().remove(id);
       matchingRuleEntries.put(id, matchingRule);
     }
   }
 
   @Override
   public boolean removeMatchingRule(String id) {
-    return (matchingRuleEntries.remove(id) != null) || rangeBasedMatchingRuleIndex.remove(id);
+    return (matchingRuleEntries.remove(id) != null) || modifiableIndex().remove(id);
   }
 
   @Override
@@ -46,11 +70,63 @@ public class SimpleMatcherService<T extends Record> implements MatcherService<T>
     return result;
   }
 
+  @Override
+  public void match(T[] records, int numRecords, MatchBuffer matches) {
+    matches.clear();
+    final long[] hashValues = matches.hashValues(records, numRecords);
+    for (int i = 0; i < numRecords; i++) {
+      rangeBasedMatchingRuleIndex.addMatches(hashValues[i], i, matches);
+      for (Map.Entry<String, MatchingRule> entry : matchingRuleEntries.entrySet()) {
+        if (entry.getValue().test(records[i])) {
+          matches.add(entry.getKey(), i);
+        }
+      }
+    }
+  }
+
+  /**
+   * Creates a matcher service with {@code numRules} rules whose selectivities follow a Zipf distribution. The index of
+   * these rules is built only once per JVM and shared by all matcher services created with the same parameters until
+   * they are changed.
+   */
   public static <T extends Record> SimpleMatcherService<T> createFromZipf(
       final int numRules,
       final double totalSelectivity,
       final double s,
       final long seed
+  ) {
+    final RangeBasedMatchingRuleIndex index = ZIPF_INDICES.computeIfAbsent(
+        List.of(numRules, totalSelectivity, s, seed),
+        key -> buildIndex(zipfFrequencies(numRules, totalSelectivity, s), seed, numRules));
+    return new SimpleMatcherService<>(index, true);
+  }
+
+  public static <T extends Record> SimpleMatcherService<T> createFromFrequencyMap(Map<Double, Integer> selectivities, final long seed) {
+    return createFromFrequencyStream(selectivities.entrySet().stream(), seed);
+  }
+
+  public static <T extends Record> SimpleMatcherService<T> createFromFrequencyStream(Stream<Map.Entry<Double, Integer>> selectivities, final long seed) {
+    return new SimpleMatcherService<>(buildIndex(selectivities, seed, 16), false);
+  }
+
+  private static RangeBasedMatchingRuleIndex buildIndex(Stream<Map.Entry<Double, Integer>> selectivities, final long seed, final int expectedNumRules) {
+    final List<String> ids = new ArrayList<>(expectedNumRules);
+    final List<RangeBasedMatchingRule> rules = new ArrayList<>(expectedNumRules);
+    forEachRule(selectivities, seed, (id, rule) -> {
+      ids.add(id);
+      rules.add(rule);
+    });
+    return RangeBasedMatchingRuleIndex.of(ids, rules);
+  }
+
+  /**
+   * Returns the selectivities of {@code numRules} rules whose selectivities follow a Zipf distribution with exponent
+   * {@code s} and sum up to {@code totalSelectivity}, each with frequency 1.
+   */
+  static Stream<Map.Entry<Double, Integer>> zipfFrequencies(
+      final int numRules,
+      final double totalSelectivity,
+      final double s
   ) {
     double weightsTotal = 0.0;
     final double[] weigths = new double[numRules];
@@ -59,32 +135,29 @@ public class SimpleMatcherService<T extends Record> implements MatcherService<T>
       weightsTotal += weigths[k - 1];
     }
     final double finalWeightsTotal = weightsTotal;
-    final Stream<Map.Entry<Double, Integer>> frequencyStream = IntStream.range(0, numRules)
+    return IntStream.range(0, numRules)
         .mapToObj(ruleId -> Map.entry(
             (weigths[ruleId] / finalWeightsTotal) * totalSelectivity, // selectivity
             1 // frequency
         ));
-    return createFromFrequencyStream(frequencyStream, seed);
-  }
-
-  public static <T extends Record> SimpleMatcherService<T> createFromFrequencyMap(Map<Double, Integer> selectivities, final long seed) {
-    return createFromFrequencyStream(selectivities.entrySet().stream(), seed);
   }
 
-  public static <T extends Record> SimpleMatcherService<T> createFromFrequencyStream(Stream<Map.Entry<Double, Integer>> selectivities, final long seed) {
-    final SimpleMatcherService<T> matcherService = new SimpleMatcherService<>();
+  /**
+   * Generates the rules "consumer_0", "consumer_1", ... for the given selectivities and their frequencies.
+   */
+  static void forEachRule(Stream<Map.Entry<Double, Integer>> selectivities, final long seed, BiConsumer<String, RangeBasedMatchingRule> ruleConsumer) {
     final AtomicInteger ruleCounter = new AtomicInteger(0);
+    final HashStream64 hashStream = Hashing.komihash4_3().hashStream();
     selectivities.forEach(entry -> {
       final int numRules = entry.getValue();
       final double selectivity = entry.getKey();
       for (int i = 0; i < numRules; i++) {
         final int ruleNumber = ruleCounter.getAndIncrement();
-        matcherService.addMatchingRule(
+        ruleConsumer.accept(
             "consumer_" + ruleNumber,
-            new RangeBasedMatchingRule(Hashing.komihash4_3().hashStream().putLong(seed).putInt(ruleNumber).getAsLong(), selectivity));
+            new RangeBasedMatchingRule(hashStream.reset().putLong(seed).putInt(ruleNumber).getAsLong(), selectivity));
       }
     });
-    return matcherService;
   }
 
 }
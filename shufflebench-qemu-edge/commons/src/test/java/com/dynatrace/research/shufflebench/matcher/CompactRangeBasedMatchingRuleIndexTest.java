@@ -0,0 +1,57 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+import org.junit.jupiter.api.Test;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.SplittableRandom;
+
+import static org.assertj.core.api.Assertions.assertThat;
+
+public class CompactRangeBasedMatchingRuleIndexTest {
+
+    @Test
+    void testSameMatchesAsRangeBasedMatchingRuleIndex() {
+
+        SplittableRandom random = new SplittableRandom(0x6a09e667f3bcc909L);
+
+        RangeBasedMatchingRuleIndex expectedIndex = new RangeBasedMatchingRuleIndex();
+        CompactRangeBasedMatchingRuleIndex.Builder builder = CompactRangeBasedMatchingRuleIndex.builder();
+        for (int i = 0; i < 1000; ++i) {
+            String id = "consumer_" + i;
+            RangeBasedMatchingRule rule = new RangeBasedMatchingRule(random.nextLong(), 0.99 * Math.pow(random.nextDouble(), 8));
+            expectedIndex.add(id, rule);
+            builder.add(id, rule);
+        }
+        expectedIndex.add("all", new RangeBasedMatchingRule(random.nextLong(), 1));
+        builder.add("all", new RangeBasedMatchingRule(random.nextLong(), 1));
+        CompactRangeBasedMatchingRuleIndex index = builder.build();
+        assertThat(index.size()).isEqualTo(1001);
+
+        for (int i = 0; i < 10000; ++i) {
+            byte[] data = new byte[16];
+            random.nextBytes(data);
+            Record record = new Record(data);
+            List<String> expected = new ArrayList<>();
+            expectedIndex.forEachMatchingConsumer(record, expected::add);
+            List<String> actual = new ArrayList<>();
+            index.forEachMatchingConsumer(record, actual::add);
+            assertThat(actual).containsExactlyInAnyOrderElementsOf(expected);
+        }
+    }
+
+    @Test
+    void testAddReplacesRule() {
+
+        CompactRangeBasedMatchingRuleIndex index = CompactRangeBasedMatchingRuleIndex.builder()
+                .add("1", new RangeBasedMatchingRule(1, 0))
+                .add("1", new RangeBasedMatchingRule(1, 1))
+                .build();
+
+        List<String> matches = new ArrayList<>();
+        index.forEachMatchingConsumer(new Record(new byte[8]), matches::add);
+        assertThat(index.size()).isEqualTo(1);
+        assertThat(matches).containsExactly("1");
+    }
+}
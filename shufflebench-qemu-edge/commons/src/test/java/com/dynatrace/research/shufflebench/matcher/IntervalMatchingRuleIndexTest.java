@@ -0,0 +1,56 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+import org.junit.jupiter.api.Test;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.SplittableRandom;
+
+import static org.assertj.core.api.Assertions.assertThat;
+
+public class IntervalMatchingRuleIndexTest {
+
+    @Test
+    void testAddAndRemove() {
+
+        IntervalMatchingRuleIndex index = new IntervalMatchingRuleIndex();
+        RangeBasedMatchingRule rule = new RangeBasedMatchingRule(1, 0.5);
+        index.add("1", rule);
+
+        assertThat(index.remove("2")).isFalse();
+        assertThat(index.remove("1")).isTrue();
+        assertThat(index.remove("1")).isFalse();
+    }
+
+    @Test
+    void testSameMatchesAsRangeBasedMatchingRuleIndex() {
+
+        SplittableRandom random = new SplittableRandom(0x510e527fade682d1L);
+
+        RangeBasedMatchingRuleIndex expectedIndex = new RangeBasedMatchingRuleIndex();
+        IntervalMatchingRuleIndex index = new IntervalMatchingRuleIndex();
+        for (int i = 0; i < 3000; ++i) {
+            String id = "consumer_" + random.nextInt(1000);
+            if (random.nextInt(4) == 0) {
+                assertThat(index.remove(id)).isEqualTo(expectedIndex.remove(id));
+            } else {
+                double probability = random.nextInt(100) == 0 ? 1 : 0.99 * Math.pow(random.nextDouble(), 8);
+                RangeBasedMatchingRule rule = new RangeBasedMatchingRule(random.nextLong(), probability);
+                expectedIndex.add(id, rule);
+                index.add(id, rule);
+            }
+        }
+
+        for (int i = 0; i < 10000; ++i) {
+            byte[] data = new byte[16];
+            random.nextBytes(data);
+            Record record = new Record(data);
+            List<String> expected = new ArrayList<>();
+            expectedIndex.forEachMatchingConsumer(record, expected::add);
+            List<String> actual = new ArrayList<>();
+            index.forEachMatchingConsumer(record, actual::add);
+            assertThat(actual).containsExactlyInAnyOrderElementsOf(expected);
+        }
+    }
+}
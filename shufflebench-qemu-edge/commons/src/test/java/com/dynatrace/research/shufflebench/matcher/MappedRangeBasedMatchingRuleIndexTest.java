@@ -0,0 +1,59 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+import org.junit.jupiter.api.Test;
+import org.junit.jupiter.api.io.TempDir;
+
+import java.io.IOException;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.SplittableRandom;
+
+import static org.assertj.core.api.Assertions.assertThat;
+import static org.assertj.core.api.Assertions.assertThatThrownBy;
+
+public class MappedRangeBasedMatchingRuleIndexTest {
+
+    @TempDir
+    Path directory;
+
+    @Test
+    void testSameMatchesAsCompactRangeBasedMatchingRuleIndex() throws IOException {
+
+        SplittableRandom random = new SplittableRandom(0x1f83d9abfb41bd6bL);
+
+        CompactRangeBasedMatchingRuleIndex.Builder builder = CompactRangeBasedMatchingRuleIndex.builder();
+        for (int i = 0; i < 1000; ++i) {
+            builder.add("consumer_" + i, new RangeBasedMatchingRule(random.nextLong(), Math.pow(random.nextDouble(), 8)));
+        }
+        builder.add("all ä", new RangeBasedMatchingRule(random.nextLong(), 1));
+        CompactRangeBasedMatchingRuleIndex expectedIndex = builder.build();
+
+        Path file = directory.resolve("index.matcher");
+        MappedRangeBasedMatchingRuleIndex.write(expectedIndex, file);
+        MappedRangeBasedMatchingRuleIndex index = MappedRangeBasedMatchingRuleIndex.open(file);
+        assertThat(index.size()).isEqualTo(1001);
+        assertThat(index.getId(1000)).isEqualTo("all ä");
+
+        for (int i = 0; i < 10000; ++i) {
+            byte[] data = new byte[16];
+            random.nextBytes(data);
+            Record record = new Record(data);
+            List<String> expected = new ArrayList<>();
+            expectedIndex.forEachMatchingConsumer(record, expected::add);
+            List<String> actual = new ArrayList<>();
+            index.forEachMatchingConsumer(record, actual::add);
+            assertThat(actual).containsExactlyElementsOf(expected);
+        }
+    }
+
+    @Test
+    void testOpenRejectsOtherFiles() throws IOException {
+
+        Path file = directory.resolve("other.matcher");
+        Files.write(file, new byte[64]);
+        assertThatThrownBy(() -> MappedRangeBasedMatchingRuleIndex.open(file)).isInstanceOf(IOException.class);
+    }
+}
@@ -0,0 +1,76 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+import org.junit.jupiter.api.Test;
+import org.junit.jupiter.api.io.TempDir;
+
+import java.nio.file.Path;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Map;
+import java.util.SplittableRandom;
+
+import static org.assertj.core.api.Assertions.assertThat;
+
+public class MatchBufferTest {
+
+    @TempDir
+    Path directory;
+
+    private static Record[] randomRecords(int numRecords) {
+        SplittableRandom random = new SplittableRandom(0xbb67ae8584caa73bL);
+        Record[] records = new Record[numRecords];
+        for (int i = 0; i < numRecords; ++i) {
+            byte[] data = new byte[16];
+            random.nextBytes(data);
+            records[i] = new Record(data);
+        }
+        return records;
+    }
+
+    private static void assertSameMatchesAsSingleRecords(MatcherService<Record> matcherService) {
+        Record[] records = randomRecords(1000);
+        MatchBuffer matches = new MatchBuffer(1);
+        for (int numRecords : new int[]{1000, 10, 0}) { // reusing the buffer
+            matcherService.match(records, numRecords, matches);
+            List<String> expected = new ArrayList<>();
+            for (int i = 0; i < numRecords; ++i) {
+                for (Map.Entry<String, Record> entry : matcherService.match(records[i])) {
+                    expected.add(entry.getKey() + "@" + i);
+                }
+            }
+            List<String> actual = new ArrayList<>();
+            for (int i = 0; i < matches.size(); ++i) {
+                actual.add(matches.getRuleId(i) + "@" + matches.getRecordIndex(i));
+            }
+            assertThat(actual).containsExactlyElementsOf(expected);
+        }
+    }
+
+    @Test
+    void testSimpleMatcherService() {
+        SimpleMatcherService<Record> matcherService = SimpleMatcherService.createFromZipf(1000, 2.0, 0.5, 0x2e3fac4f58fc98b4L);
+        matcherService.addMatchingRule("all", new RangeBasedMatchingRule(1, 1));
+        matcherService.addMatchingRule("hash", new HashBasedMatchingRule(2, 0.5));
+        assertSameMatchesAsSingleRecords(matcherService);
+    }
+
+    @Test
+    void testCompactMatcherService() {
+        assertSameMatchesAsSingleRecords(CompactMatcherService.createFromZipf(1000, 2.0, 0.5, 0x2e3fac4f58fc98b4L));
+    }
+
+    @Test
+    void testIntervalMatcherService() {
+        IntervalMatcherService<Record> matcherService = IntervalMatcherService.createFromZipf(1000, 2.0, 0.5, 0x2e3fac4f58fc98b4L);
+        matcherService.addMatchingRule("all", new RangeBasedMatchingRule(1, 1));
+        assertSameMatchesAsSingleRecords(matcherService);
+    }
+
+    @Test
+    void testMappedMatcherService() {
+        assertSameMatchesAsSingleRecords(MappedMatcherService.load(
+                directory.resolve("zipf.matcher"),
+                () -> CompactMatcherService.buildIndex(SimpleMatcherService.zipfFrequencies(1000, 2.0, 0.5), 0x2e3fac4f58fc98b4L, 1000)));
+    }
+}
@@ -0,0 +1,50 @@
+package com.dynatrace.research.shufflebench.matcher;
+
+import com.dynatrace.research.shufflebench.record.Record;
+import org.junit.jupiter.api.Test;
+
+import java.util.Collection;
+import java.util.Map;
+import java.util.SplittableRandom;
+
+import static org.assertj.core.api.Assertions.assertThat;
+
+public class SimpleMatcherServiceTest {
+
+    private static Record randomRecord(SplittableRandom random) {
+        byte[] data = new byte[16];
+        random.nextBytes(data);
+        return new Record(data);
+    }
+
+    @Test
+    void testCreateFromZipfMatchesAddingRulesOneByOne() {
+
+        SimpleMatcherService<Record> expectedService = new SimpleMatcherService<>();
+        SimpleMatcherService.forEachRule(
+                SimpleMatcherService.zipfFrequencies(1000, 2.0, 0.5), 0x2e3fac4f58fc98b4L, expectedService::addMatchingRule);
+        SimpleMatcherService<Record> service = SimpleMatcherService.createFromZipf(1000, 2.0, 0.5, 0x2e3fac4f58fc98b4L);
+
+        SplittableRandom random = new SplittableRandom(0x510e527fade682d1L);
+        for (int i = 0; i < 10000; ++i) {
+            Record record = randomRecord(random);
+            Collection<Map.Entry<String, Record>> expected = expectedService.match(record);
+            assertThat(service.match(record)).containsExactlyInAnyOrderElementsOf(expected);
+        }
+    }
+
+    @Test
+    void testChangingSharedIndexDoesNotAffectOtherServices() {
+
+        SimpleMatcherService<Record> service = SimpleMatcherService.createFromZipf(10, 1.0, 1.0, 42L);
+        SimpleMatcherService<Record> otherService = SimpleMatcherService.createFromZipf(10, 1.0, 1.0, 42L);
+
+        assertThat(service.removeMatchingRule("consumer_0")).isTrue();
+        service.addMatchingRule("all", new RangeBasedMatchingRule(1, 1));
+
+        Record record = randomRecord(new SplittableRandom(0x9b05688c2b3e6c1fL));
+        assertThat(service.match(record)).extracting(Map.Entry::getKey).contains("all").doesNotContain("consumer_0");
+        assertThat(otherService.match(record)).extracting(Map.Entry::getKey).doesNotContain("all");
+        assertThat(otherService.removeMatchingRule("consumer_0")).isTrue();
+    }
+}
@@ -5,7 +5,7 @@ import com.dynatrace.research.shufflebench.consumer.SerializableStatefulConsumer
 import com.dynatrace.research.shufflebench.consumer.State;
 import com.dynatrace.research.shufflebench.consumer.StatefulConsumer;
 import com.dynatrace.research.shufflebench.matcher.MatcherService;
-import com.dynatrace.research.shufflebench.matcher.SimpleMatcherService;
+import com.dynatrace.research.shufflebench.matcher.MatcherEngine;
 import com.dynatrace.research.shufflebench.record.*;
 import com.hazelcast.config.JoinConfig;
 import com.hazelcast.core.Hazelcast;
@@ -90,6 +90,8 @@ public class HazelcastShuffle {
     final double totalSelectivity = config.getValue("matcher.zipf.total.selectivity", Double.class);
     final int numRules = config.getValue("matcher.zipf.num.rules", Integer.class);
     final double s = config.getValue("matcher.zipf.s", Double.class);
+    final MatcherEngine matcherEngine = MatcherEngine.fromName(config.getValue("matcher.engine", String.class));
+    final String snapshotDirectory = config.getValue("matcher.snapshot.dir", String.class);
     final int outputRate = config.getValue("consumer.output.rate", Integer.class);
     final int stateSizeBytes = config.getValue("consumer.state.size.bytes", Integer.class);
     final boolean initCountRandom = config.getValue("consumer.init.count.random", Boolean.class);
@@ -98,13 +100,14 @@ public class HazelcastShuffle {
     ServiceFactory<?, MatcherService<TimestampedRecord>> matcherServiceFactory = nonSharedService(
         pctx -> {
           if (selectivities != null) {
-            return SimpleMatcherService.createFromFrequencyMap(selectivities, 0x2e3fac4f58fc98b4L);
+            return matcherEngine.createFromFrequencyMap(selectivities, 0x2e3fac4f58fc98b4L, snapshotDirectory);
           } else {
-            return SimpleMatcherService.createFromZipf(
+            return matcherEngine.createFromZipf(
                 numRules,
                 totalSelectivity,
                 s,
-                0x2e3fac4f58fc98b4L);
+                0x2e3fac4f58fc98b4L,
+                snapshotDirectory);
           }
         });
     
@@ -3,7 +3,7 @@ package com.dynatrace.research.shufflebench;
 import com.dynatrace.research.shufflebench.consumer.AdvancedStateConsumer;
 import com.dynatrace.research.shufflebench.consumer.StatefulConsumer;
 import com.dynatrace.research.shufflebench.matcher.MatcherService;
-import com.dynatrace.research.shufflebench.matcher.SimpleMatcherService;
+import com.dynatrace.research.shufflebench.matcher.MatcherEngine;
 import com.dynatrace.research.shufflebench.record.*;
 import io.smallrye.config.SmallRyeConfig;
 import org.apache.kafka.common.serialization.Serdes;
@@ -44,18 +44,21 @@ public class KafkaStreamsShuffle {
 
     final Optional<Map<Double, Integer>> selectivities =
             config.getOptionalValues("matcher.selectivities", Double.class, Integer.class);
+    final MatcherEngine matcherEngine = MatcherEngine.fromName(config.getValue("matcher.engine", String.class));
+    final String snapshotDirectory = config.getValue("matcher.snapshot.dir", String.class);
     final MatcherService<TimestampedRecord> matcherService;
     if (selectivities.isPresent()) {
-      matcherService = SimpleMatcherService.createFromFrequencyMap(selectivities.get(), 0x2e3fac4f58fc98b4L);
+      matcherService = matcherEngine.createFromFrequencyMap(selectivities.get(), 0x2e3fac4f58fc98b4L, snapshotDirectory);
     } else {
       final double totalSelectivity = config.getValue("matcher.zipf.total.selectivity", Double.class);
       final int numRules = config.getValue("matcher.zipf.num.rules", Integer.class);
       final double s = config.getValue("matcher.zipf.s", Double.class);
-      matcherService = SimpleMatcherService.createFromZipf(
+      matcherService = matcherEngine.createFromZipf(
           numRules,
           totalSelectivity,
           s,
-          0x2e3fac4f58fc98b4L);
+          0x2e3fac4f58fc98b4L,
+          snapshotDirectory);
     }
     final int outputRate = config.getValue("consumer.output.rate", Integer.class);
     final int stateSizeBytes = config.getValue("consumer.state.size.bytes", Integer.class);
@@ -0,0 +1,147 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from results_catalog import ResultsCatalog
+
+# --- GERAÇÃO EM LOTE DE TODOS OS GRÁFICOS ---
+
+# Nome usado nos arquivos de saída para cada framework (ex: kafka-5000-final.png)
+PLOT_NAMES = {'kstreams': 'kafka'}
+
+# Métricas que precisam existir para gerar cada tipo de gráfico
+THROUGHPUT_METRIC = 'input_throughput_60s'
+RESOURCES_METRIC = 'workerNodesCPUsPercentageUtilization_60s'
+
+def discover_jobs(root, resolution=None):
+    """
+    Descobre todos os experimentos em `root` e retorna os gráficos a gerar, como tuplas
+    (tipo, nome de saída, argumentos): um gráfico de performance por experimento e uma comparação
+    de recursos por carga e número de instâncias que tenha experimentos Kafka Streams e Spark.
+    """
+    catalog = ResultsCatalog(root)
+    experiments = (catalog.find(kind='generic', metric=THROUGHPUT_METRIC, repetition=1)
+                   .drop_duplicates(['directory', 'exp_id', 'load', 'instances']))
+    jobs = []
+    for _, entry in experiments.iterrows():
+        name = f"{PLOT_NAMES.get(entry['framework'], entry['framework'])}-{entry['load']}-final"
+        jobs.append(('throughput', name, dict(exp_id=entry['exp_id'], registers=entry['load'], instances=entry['instances'],
+                                              input_path=entry['directory'], resolution=resolution)))
+
+    workers = catalog.find(framework=['kstreams', 'spark'], kind='generic', metric=RESOURCES_METRIC).drop_duplicates(['framework', 'directory', 'exp_id', 'load', 'instances'])
+    for (load, instances), runs in workers.groupby(['load', 'instances']):
+        kafka_runs = runs.loc[runs['framework'] == 'kstreams']
+        spark_runs = runs.loc[runs['framework'] == 'spark']
+        # Se houver mais de um experimento por framework, compara os mais recentes
+        if len(kafka_runs) == 0 or len(spark_runs) == 0:
+            continue
+        kafka = kafka_runs.loc[kafka_runs['exp_id'].astype(int).idxmax()]
+        spark = spark_runs.loc[spark_runs['exp_id'].astype(int).idxmax()]
+        jobs.append(('resources', f'resources-average-{load}-final', dict(kafka_exp=kafka['exp_id'], spark_exp=spark['exp_id'], registers=load, instances=instances,
+                                                                          spark_path=spark['directory'], kafka_path=kafka['directory'], resolution=resolution)))
+    return _unique_names(jobs)
+
+def _unique_names(jobs):
+    """Acrescenta o ID do experimento (e as instâncias) aos nomes de saída repetidos."""
+    counts = {}
+    for _, name, _ in jobs:
+        counts[name] = counts.get(name, 0) + 1
+    unique_jobs = []
+    for kind, name, kwargs in jobs:
+        if counts[name] > 1:
+            exp_id = kwargs.get('exp_id') or f"{kwargs['kafka_exp']}-{kwargs['spark_exp']}"
+            name = f"{name}-exp{exp_id}-{kwargs['instances']}"
+        unique_jobs.append((kind, name, kwargs))
+    return unique_jobs
+
+def _experiments(job):
+    """Experimentos (diretório, ID) cujos resultados um gráfico lê."""
+    kind, _, kwargs = job
+    if kind == 'throughput':
+        return [(kwargs['input_path'], kwargs['exp_id'])]
+    return [(kwargs['spark_path'], kwargs['spark_exp']), (kwargs['kafka_path'], kwargs['kafka_exp'])]
+
+def group_jobs(jobs):
+    """
+    Agrupa os gráficos que leem resultados dos mesmos experimentos (ex: o de performance de um
+    experimento e a comparação de recursos que o usa), para que sejam gerados no mesmo processo
+    e reaproveitem as séries em cache. Retorna listas de índices em `jobs`.
+    """
+    parents = {}
+
+    def find(experiment):
+        while parents.setdefault(experiment, experiment) != experiment:
+            experiment = parents[experiment]
+        return experiment
+
+    for job in jobs:
+        first, *others = _experiments(job)
+        for experiment in others:
+            parents[find(experiment)] = find(first)
+    groups = {}
+    for index, job in enumerate(jobs):
+        groups.setdefault(find(_experiments(job)[0]), []).append(index)
+    return list(groups.values())
+
+def _init_worker():
+    """Prepara um processo de geração: backend sem interface e cache das séries lidas."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import results_store
+    results_store.cache_frames()
+
+def render(job, output_path):
+    """Gera um gráfico descoberto por `discover_jobs` e retorna o caminho base dos arquivos salvos."""
+    # Importados aqui para que só os processos de geração paguem o custo do matplotlib
+    import resources_plot
+    import throughput_plot
+    kind, name, kwargs = job
+    if kind == 'throughput':
+        return throughput_plot.plot_experiment(output_path=output_path, output_name=name, **kwargs)
+    return resources_plot.plot_resources(output_dir=output_path, output_name=name, **kwargs)
+
+def render_group(jobs, output_path):
+    """Gera em sequência, no mesmo processo, um grupo de gráficos formado por `group_jobs`."""
+    return [render(job, output_path) for job in jobs]
+
+def render_all(jobs, output_path, workers=None):
+    """
+    Gera todos os gráficos em `workers` processos (todos os núcleos por padrão). Cada processo
+    importa o matplotlib uma única vez e gera juntos os gráficos dos mesmos experimentos (veja
+    `group_jobs`), reaproveitando as séries já lidas. Com um único worker, os gráficos são gerados
+    no processo atual. Retorna os resultados na ordem de `jobs`.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker()
+        return render_group(jobs, output_path)
+    groups = group_jobs(jobs)
+    outputs = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(groups) or 1), initializer=_init_worker) as executor:
+        for group, group_outputs in zip(groups, executor.map(render_group, [[jobs[index] for index in group] for group in groups],
+                                                             [output_path] * len(groups))):
+            for index, output in zip(group, group_outputs):
+                outputs[index] = output
+    return outputs
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera os gráficos de todos os experimentos de um diretório de resultados.')
+    parser.add_argument('--root', type=str, default='../results', help='Diretório com os resultados (ex: ../results).')
+    parser.add_argument('--output-path', type=str, default='../plots', help='Diretório para salvar os gráficos gerados.')
+    parser.add_argument('--workers', type=int, default=None, help='Número de processos (padrão: número de núcleos).')
+    parser.add_argument('--resolution', type=int, default=None, help='Agrega os valores pela média em intervalos desta duração em segundos.')
+    parser.add_argument('--list', action='store_true', help='Apenas lista os gráficos que seriam gerados.')
+    args = parser.parse_args()
+
+    jobs = discover_jobs(args.root, args.resolution)
+    if args.list:
+        for kind, name, kwargs in jobs:
+            print(f"{name} ({kind}): {kwargs}")
+        return
+    started = time.perf_counter()
+    outputs = render_all(jobs, args.output_path, args.workers)
+    generated = [output for output in outputs if output is not None]
+    print(f"{len(generated)} de {len(jobs)} gráficos gerados em {time.perf_counter() - started:.1f} s.")
+
+if __name__ == '__main__':
+    main()
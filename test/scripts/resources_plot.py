@@ -4,105 +4,55 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import matplotlib.ticker as mticker
 import numpy as np
-import glob
 import matplotlib as mpl
 from datetime import datetime, timedelta
 import argparse
-
-def process_series_data(file_pattern, smooth=False):
-    # (Função para dados de workers, sem alterações)
-    all_runs = []
-    files = glob.glob(file_pattern)
-    if not files: return None
-    for file_path in files:
-        try:
-            df = pd.read_csv(file_path)
-            if 'timestamp' in df.columns and 'value' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
-                df['value'] = pd.to_numeric(df['value'], errors='coerce')
-                df.dropna(subset=['value'], inplace=True)
-                all_runs.append(df)
-        except Exception as e:
-            print(f"Erro ao processar {file_path}: {e}")
-            continue
-    if not all_runs: return None
-    concatenated_df = pd.concat(all_runs).sort_values('timestamp')
-    if 'labels' in concatenated_df.columns:
-        all_pod_data = [
-            pod_series.set_index('timestamp')['value'].resample('S').mean()
-            for _, pod_series in concatenated_df.groupby('labels')
-        ]
-        aligned_df = pd.concat(all_pod_data, axis=1)
-        mean_df = aligned_df.mean(axis=1).reset_index()
-    else:
-        mean_df = concatenated_df.set_index('timestamp')['value'].resample('S').mean().reset_index()
-    mean_df.columns = ['timestamp', 'value']
-    if smooth:
-        mean_df['value'] = mean_df['value'].rolling(window=10).mean()
-    return mean_df
-
-def process_pivoted_data(file_pattern):
+import re
+import results_store
+import series_alignment
+
+def process_series_data(file_pattern, resolution=None, start=None, end=None):
+    # (Função para dados de workers; `resolution` em segundos, `start`/`end` em timestamps Unix)
+    # Média entre os pods (coluna 'labels'), alinhados em intervalos de `resolution` segundos
+    samples = series_alignment.load_metric(file_pattern, start, end, resolution)
+    if samples is None: return None
+    aligned = series_alignment.align(samples['timestamp'], samples['value'], samples['labels'], resolution or 1)
+    if aligned is None: return None
+    return aligned.mean()
+
+def instance_name(file_path, labels):
     """
-    -- FUNÇÃO CORRIGIDA --
     Mantém a separação entre broker/manager pelo nome do arquivo, mas, para os brokers,
     usa o IP extraído da coluna 'labels' como o identificador para a agregação.
     """
-    all_runs = []
-    files = sorted(glob.glob(file_pattern))
-    
-    if not files:
+    if 'kafkaBroker' in file_path:
+        # Para arquivos de broker, o identificador é o IP extraído da coluna 'labels'
+        match = re.search(r'instance=([^:]+)', labels)
+        return 'Broker ' + match.group(1) if match else None
+    if 'manager' in file_path:
+        # Para o manager, o identificador é um nome fixo
+        return 'Manager'
+    # Fallback para qualquer outro tipo de arquivo
+    return os.path.basename(file_path)
+
+def process_pivoted_data(file_pattern, resolution=None, start=None, end=None):
+    """Uma coluna por instância (brokers e manager), com lacunas preenchidas para garantir linhas contínuas no gráfico."""
+    samples = series_alignment.load_metric(file_pattern, start, end, resolution)
+    if samples is None:
         print(f"Aviso: Nenhum arquivo encontrado para o padrão pivot: {file_pattern}")
         return None
-    
-    for file_path in files:
-        try:
-            df = pd.read_csv(file_path)
-            
-            # Decide como criar a coluna 'instance' com base no nome do arquivo
-            if 'kafkaBroker' in file_path:
-                # Para arquivos de broker, o identificador é o IP extraído da coluna 'labels'
-                #ip = df['labels'].str.extract(r'instance=([^:]+)')
-                df['instance'] = 'Broker ' + df['labels'].str.extract(r'instance=([^:]+)')
-                
-            
-            elif 'manager' in file_path:
-                # Para o manager, o identificador é um nome fixo
-                df['instance'] = 'Manager'
-            
-            else:
-                # Fallback para qualquer outro tipo de arquivo
-                df['instance'] = os.path.basename(file_path)
-
-            # Adiciona os dados já com a coluna 'instance' correta
-            all_runs.append(df[['timestamp', 'value', 'instance']])
-        except Exception as e:
-            print(f"Erro ao processar o arquivo pivot {file_path}: {e}")
-            continue
-
-    if not all_runs: return None
-
-    # Consolida todos os DataFrames em um só
-    concatenated_df = pd.concat(all_runs)
-    
-    # Converte o timestamp
-    concatenated_df['timestamp'] = pd.to_datetime(concatenated_df['timestamp'], unit='s')
-    
-    # Pivota a tabela usando a coluna 'instance', que agora contém os IPs únicos e 'Manager'
-    pivoted_df = concatenated_df.pivot_table(
-        index='timestamp', 
-        columns='instance', 
-        values='value',
-        aggfunc='mean'
-    )
-    
-    # Reamostra e preenche lacunas para garantir linhas contínuas no gráfico
-    pivoted_df = pivoted_df.resample('S').mean().ffill()
-    pivoted_df.sort_index(inplace=True)
-    
-    return pivoted_df
-
-def create_subplot(ax_obj, definition, start_time, duration):
-    # (Função de plotagem, sem alterações)
+    # Cada combinação de arquivo e labels é identificada uma única vez
+    codes = samples.groupby(['file', 'labels'], sort=False).ngroup().to_numpy()
+    series_keys = samples[['file', 'labels']].drop_duplicates()
+    names = pd.Series(np.array([instance_name(file_path, labels) for file_path, labels in series_keys.itertuples(index=False)], dtype=object)[codes])
+    identified = names.notna()
+    aligned = series_alignment.align(samples['timestamp'][identified], samples['value'][identified], names[identified],
+                                     resolution or 1, average_duplicates=True)
+    if aligned is None: return None
+    return aligned.pivot()
+
+def create_subplot(ax_obj, definition, start_time, duration, resolution=None):
+    # (Função de plotagem; só lê os dados dentro da janela exibida)
     ax_obj.set_title(definition['title'], pad=20)
     ax_obj.set_ylabel(definition['ylabel'])
     if definition.get('ylim'): ax_obj.set_ylim(definition['ylim'])
@@ -111,8 +61,11 @@ def create_subplot(ax_obj, definition, start_time, duration):
 
     for series in definition['series']:
         is_pivot = series.get('pivot', False)
-        processor = process_pivoted_data if is_pivot else process_series_data
-        series_df = processor(series['pattern'])
+        window = dict(resolution=resolution, start=start_time.timestamp(), end=start_time.timestamp() + duration * 60)
+        if is_pivot:
+            series_df = process_pivoted_data(series['pattern'], **window)
+        else:
+            series_df = process_series_data(series['pattern'], **window)
         
         if series_df is not None:
             if is_pivot:
@@ -131,25 +84,11 @@ def create_subplot(ax_obj, definition, start_time, duration):
     ax_obj.legend(loc='upper right')
     ax_obj.set_xlabel('Time (Minutes)')
 
-def main():
-    # (O resto do script permanece o mesmo)
-    parser = argparse.ArgumentParser(description='Generate resource consumption plots from experiment data.')
-    parser.add_argument('--kafka-exp', type=str, required=True, help='Experiment ID for Kafka.')
-    parser.add_argument('--spark-exp', type=str, required=True, help='Experiment ID for Spark.')
-    parser.add_argument('--registers', type=str, default='5000', help='Number of registers per second.')
-    parser.add_argument('--instances', type=str, default='3', help='Number of instances.')
-    parser.add_argument('--spark-path', type=str, required=True, help='Path to the Spark results directory.')
-    parser.add_argument('--kafka-path', type=str, required=True, help='Path to the Kafka Streams results directory.')
-    parser.add_argument('--broker-cpu-pattern', type=str, 
-                        default='generic_kafkaBrokerNodesCPUsPercentageUtilization_60s_*.csv',
-                        help='Filename pattern for Kafka brokers, use *.')
-    parser.add_argument('--manager-cpu-pattern', type=str,
-                        default='generic_managerNodesCPUsPercentageUtilization_60s_*.csv',
-                        help='Filename pattern for the manager node CPU usage.')
-    parser.add_argument('--duration', type=int, default=64, 
-                        help='Experiment duration in minutes for the x-axis limit.')
-    
-    args = parser.parse_args()
+def plot_resources(kafka_exp, spark_exp, registers, instances, spark_path, kafka_path,
+                   broker_cpu_pattern='generic_kafkaBrokerNodesCPUsPercentageUtilization_60s_*.csv',
+                   manager_cpu_pattern='generic_managerNodesCPUsPercentageUtilization_60s_*.csv',
+                   duration=64, resolution=None, output_dir='../plots', output_name=None):
+    """Gera a comparação de recursos de um experimento Kafka Streams e um Spark e retorna o caminho base dos arquivos salvos."""
 
     plt.rc("text", usetex=False)
     mpl.rcParams.update({'font.size': 18})
@@ -157,78 +96,104 @@ def main():
     fig, ax = plt.subplots(4, 2, figsize=(20, 20), sharex=False)
 
     def get_pattern(base_path, framework_exp, metric):
-        return f'{base_path}/exp{framework_exp}_{args.registers}_{args.instances}_{metric}'
+        return f'{base_path}/exp{framework_exp}_{registers}_{instances}_{metric}'
 
     plot_definitions = {
         'spark_cpu_worker': {
             'ax': ax[0][0], 'title': 'Spark Structured Streaming - Worker CPUs Usage', 'ylabel': 'CPUs Usage (%)', 'ylim': (0, 100),
-            'series': [{'label': 'Workers', 'pattern': get_pattern(args.spark_path, args.spark_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv'), 'smooth': True}]
+            'series': [{'label': 'Workers', 'pattern': get_pattern(spark_path, spark_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv')}]
         },
         'spark_mem_worker': {
             'ax': ax[1][0], 'title': 'Spark Structured Streaming - Worker Memory Usage', 'ylabel': 'Memory (GB)', 'ylim': (0, 4.5),
-            'series': [{'label': 'Workers', 'pattern': get_pattern(args.spark_path, args.spark_exp, 'generic_workerNodesTotalMemoryUsageWithoutConsidBufferedandCachedGB_*.csv')}]
+            'series': [{'label': 'Workers', 'pattern': get_pattern(spark_path, spark_exp, 'generic_workerNodesTotalMemoryUsageWithoutConsidBufferedandCachedGB_*.csv')}]
         },
         'spark_net_worker': {
             'ax': ax[2][0], 'title': 'Spark Structured Streaming - Worker Network Traffic', 'ylabel': 'MB/s', 'ylim': (-5, 60),
-            'series': [{'label': 'Workers', 'pattern': get_pattern(args.spark_path, args.spark_exp, 'generic_workerNodesNetworkReceiveMB_60s_*.csv'), 'smooth': True}]
+            'series': [{'label': 'Workers', 'pattern': get_pattern(spark_path, spark_exp, 'generic_workerNodesNetworkReceiveMB_60s_*.csv')}]
         },
         'spark_cpu_additional': {
             'ax': ax[3][0], 'title': 'Spark Structured Streaming - Additional nodes CPUs usage', 'ylabel': 'CPUs Usage (%)', 'ylim': (0, 100),
             'series': [
-                {'pattern': get_pattern(args.spark_path, args.spark_exp, args.broker_cpu_pattern), 'pivot': True},
-                {'pattern': get_pattern(args.spark_path, args.spark_exp, args.manager_cpu_pattern), 'pivot': True}
+                {'pattern': get_pattern(spark_path, spark_exp, broker_cpu_pattern), 'pivot': True},
+                {'pattern': get_pattern(spark_path, spark_exp, manager_cpu_pattern), 'pivot': True}
             ]
         },
         'kafka_cpu_worker': {
             'ax': ax[0][1], 'title': 'Kafka Streams - Worker CPUs Usage', 'ylabel': 'CPUs Usage (%)', 'ylim': (0, 100),
-            'series': [{'label': 'Workers', 'pattern': get_pattern(args.kafka_path, args.kafka_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv'), 'smooth': True}]
+            'series': [{'label': 'Workers', 'pattern': get_pattern(kafka_path, kafka_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv')}]
         },
         'kafka_mem_worker': {
             'ax': ax[1][1], 'title': 'Kafka Streams - Worker Memory Usage', 'ylabel': 'Memory (GB)', 'ylim': (0, 4.5),
-            'series': [{'label': 'Workers', 'pattern': get_pattern(args.kafka_path, args.kafka_exp, 'generic_workerNodesTotalMemoryUsageWithoutConsidBufferedandCachedGB_*.csv')}]
+            'series': [{'label': 'Workers', 'pattern': get_pattern(kafka_path, kafka_exp, 'generic_workerNodesTotalMemoryUsageWithoutConsidBufferedandCachedGB_*.csv')}]
         },
         'kafka_net_worker': {
             'ax': ax[2][1], 'title': 'Kafka Streams - Worker Network Traffic', 'ylabel': 'MB/s', 'ylim': (-5, 60),
-            'series': [{'label': 'Workers', 'pattern': get_pattern(args.kafka_path, args.kafka_exp, 'generic_workerNodesNetworkReceiveMB_60s_*.csv'), 'smooth': True}]
+            'series': [{'label': 'Workers', 'pattern': get_pattern(kafka_path, kafka_exp, 'generic_workerNodesNetworkReceiveMB_60s_*.csv')}]
         },
         'kafka_cpu_additional': {
             'ax': ax[3][1], 'title': 'Kafka Streams - Additional nodes CPUs usage', 'ylabel': 'CPUs Usage (%)', 'ylim': (0, 100),
             'series': [
-                {'pattern': get_pattern(args.kafka_path, args.kafka_exp, args.broker_cpu_pattern), 'pivot': True},
-                {'pattern': get_pattern(args.kafka_path, args.kafka_exp, args.manager_cpu_pattern), 'pivot': True}
+                {'pattern': get_pattern(kafka_path, kafka_exp, broker_cpu_pattern), 'pivot': True},
+                {'pattern': get_pattern(kafka_path, kafka_exp, manager_cpu_pattern), 'pivot': True}
             ]
         }
     }
 
     # Tempos de início independentes
-    spark_pattern = get_pattern(args.spark_path, args.spark_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv')
-    spark_file = glob.glob(spark_pattern)
+    spark_pattern = get_pattern(spark_path, spark_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv')
+    spark_file = results_store.glob_files(spark_pattern)
     if not spark_file:
         print(f"Erro: Não foi possível encontrar arquivos de dados do SPARK para determinar o tempo inicial. Saindo.\nPadrão procurado: {spark_pattern}")
-        return
-    df_spark_temp = pd.read_csv(spark_file[0])
+        return None
+    df_spark_temp = results_store.read_csv(spark_file[0])
     spark_start_time = pd.to_datetime(df_spark_temp['timestamp'].min(), unit='s')
 
-    kafka_pattern = get_pattern(args.kafka_path, args.kafka_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv')
-    kafka_file = glob.glob(kafka_pattern)
+    kafka_pattern = get_pattern(kafka_path, kafka_exp, 'generic_workerNodesCPUsPercentageUtilization_60s_*.csv')
+    kafka_file = results_store.glob_files(kafka_pattern)
     if not kafka_file:
         print(f"Erro: Não foi possível encontrar arquivos de dados do KAFKA para determinar o tempo inicial. Saindo.\nPadrão procurado: {kafka_pattern}")
-        return
-    df_kafka_temp = pd.read_csv(kafka_file[0])
+        return None
+    df_kafka_temp = results_store.read_csv(kafka_file[0])
     kafka_start_time = pd.to_datetime(df_kafka_temp['timestamp'].min(), unit='s')
     
     for key, definition in plot_definitions.items():
         start_time_to_use = spark_start_time if 'spark' in key.lower() else kafka_start_time
-        create_subplot(definition['ax'], definition, start_time_to_use, args.duration)
+        create_subplot(definition['ax'], definition, start_time_to_use, duration, resolution)
 
-    fig.suptitle(f'Average Resource Consumption for {args.registers}/s Load', fontsize=24, y=1.02)
+    fig.suptitle(f'Average Resource Consumption for {registers}/s Load', fontsize=24, y=1.02)
     fig.tight_layout(pad=3.0)
-    output_dir = '../plots'
     os.makedirs(output_dir, exist_ok=True)
-    output_filename = f'{output_dir}/resources-average-{args.registers}-final'
+    output_filename = f'{output_dir}/{output_name or f"resources-average-{registers}-final"}'
     plt.savefig(f'{output_filename}.pdf')
     plt.savefig(f'{output_filename}.png')
     print(f"Gráficos salvos em {output_filename}.(pdf/png)")
+    plt.close(fig)
+    return output_filename
+
+def main():
+    # (O resto do script permanece o mesmo)
+    parser = argparse.ArgumentParser(description='Generate resource consumption plots from experiment data.')
+    parser.add_argument('--kafka-exp', type=str, required=True, help='Experiment ID for Kafka.')
+    parser.add_argument('--spark-exp', type=str, required=True, help='Experiment ID for Spark.')
+    parser.add_argument('--registers', type=str, default='5000', help='Number of registers per second.')
+    parser.add_argument('--instances', type=str, default='3', help='Number of instances.')
+    parser.add_argument('--spark-path', type=str, required=True, help='Path to the Spark results directory.')
+    parser.add_argument('--kafka-path', type=str, required=True, help='Path to the Kafka Streams results directory.')
+    parser.add_argument('--broker-cpu-pattern', type=str, 
+                        default='generic_kafkaBrokerNodesCPUsPercentageUtilization_60s_*.csv',
+                        help='Filename pattern for Kafka brokers, use *.')
+    parser.add_argument('--manager-cpu-pattern', type=str,
+                        default='generic_managerNodesCPUsPercentageUtilization_60s_*.csv',
+                        help='Filename pattern for the manager node CPU usage.')
+    parser.add_argument('--duration', type=int, default=64, 
+                        help='Experiment duration in minutes for the x-axis limit.')
+    parser.add_argument('--resolution', type=int, default=None,
+                        help='Averages the values over intervals of this many seconds (e.g. 60).')
+    
+    args = parser.parse_args()
+
+    plot_resources(args.kafka_exp, args.spark_exp, args.registers, args.instances, args.spark_path, args.kafka_path,
+                   args.broker_cpu_pattern, args.manager_cpu_pattern, args.duration, args.resolution)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,124 @@
+import argparse
+import fnmatch
+import json
+import os
+import re
+import pandas as pd
+import results_store
+
+# --- CATÁLOGO DOS RESULTADOS DE EXPERIMENTOS ---
+
+EXECUTION_CONFIGURATION_PATTERN = re.compile(r'^exp(\d+)-execution-configuration\.json$')
+
+INDEX_COLUMNS = ['framework', 'benchmark', 'exp_id', 'load', 'instances', 'kind', 'metric', 'repetition', 'directory', 'filename', 'source']
+
+def framework_name(benchmark):
+    """Deriva o framework do nome do benchmark do Theodolite (ex: shuffle-kstreams -> kstreams)."""
+    return benchmark[len('shuffle-'):] if benchmark.startswith('shuffle-') else benchmark
+
+class ResultsCatalog:
+    """
+    Índice de todas as séries de um arquivo de resultados, montado uma única vez a partir dos
+    nomes dos CSVs, dos arquivos colunares (`results_store`) e das configurações de execução.
+    As consultas filtram primeiro o índice e só leem as partições selecionadas, restritas ao
+    intervalo de tempo pedido.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.configurations = {}
+        rows = []
+        for directory, _, filenames in os.walk(root):
+            directory_configurations = {}
+            for filename in filenames:
+                match = EXECUTION_CONFIGURATION_PATTERN.match(filename)
+                if match is not None:
+                    with open(os.path.join(directory, filename)) as configuration_file:
+                        directory_configurations[match.group(1)] = json.load(configuration_file)
+            store = results_store.open_store(directory)
+            if store is not None:
+                for filename, content in store.files.items():
+                    match = EXECUTION_CONFIGURATION_PATTERN.match(filename)
+                    if match is not None and match.group(1) not in directory_configurations:
+                        directory_configurations[match.group(1)] = json.loads(content)
+            self.configurations.update({(directory, exp_id): configuration for exp_id, configuration in directory_configurations.items()})
+
+            sources = {filename: 'csv' for filename in filenames}
+            if store is not None:
+                sources.update({partition['filename']: 'store' for partition in store.partitions if partition['filename'] not in sources})
+            for filename, source in sources.items():
+                run = results_store.parse_series_filename(filename)
+                if run is None:
+                    continue
+                exp_id, load, instances, kind, metric, repetition = run
+                benchmark = directory_configurations.get(exp_id, {}).get('benchmark')
+                rows.append({'framework': framework_name(benchmark) if benchmark else None, 'benchmark': benchmark,
+                             'exp_id': exp_id, 'load': load, 'instances': instances, 'kind': kind, 'metric': metric,
+                             'repetition': repetition, 'directory': directory, 'filename': filename, 'source': source})
+        self.index = pd.DataFrame(rows, columns=INDEX_COLUMNS).sort_values(['framework', 'load', 'instances', 'metric', 'repetition'], ignore_index=True)
+
+    def find(self, framework=None, exp_id=None, load=None, instances=None, kind=None, metric=None, repetition=None):
+        """
+        Retorna as linhas do índice que atendem a todos os filtros informados. Cada filtro aceita
+        um valor ou uma lista de valores; `metric` também aceita padrões como 'latency_p99_*'.
+        """
+        mask = pd.Series(True, index=self.index.index)
+        filters = {'framework': framework, 'exp_id': None if exp_id is None else str(exp_id), 'load': load,
+                   'instances': instances, 'kind': kind, 'repetition': repetition}
+        for column, value in filters.items():
+            if value is not None:
+                mask &= self.index[column].isin(value if isinstance(value, (list, tuple, set)) else [value])
+        if metric is not None:
+            patterns = metric if isinstance(metric, (list, tuple, set)) else [metric]
+            mask &= self.index['metric'].map(lambda name: any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns))
+        return self.index.loc[mask]
+
+    def read(self, entry, start=None, end=None, resolution=None, aggregation='mean'):
+        """
+        Lê uma linha do índice como DataFrame (labels, timestamp, value), restrita a [start, end] e,
+        com `resolution`, agregada em intervalos de `resolution` segundos (veja `results_store.read_csv`).
+        """
+        return results_store.read_csv(os.path.join(entry['directory'], entry['filename']), start, end, resolution, aggregation)
+
+    def query(self, framework=None, exp_id=None, load=None, instances=None, kind=None, metric=None, repetition=None, start=None, end=None,
+              resolution=None, aggregation='mean'):
+        """
+        Retorna, em um único DataFrame, as amostras de todas as séries que atendem aos filtros (veja
+        `find`), entre os timestamps Unix `start` e `end` (inclusivos), com as colunas do índice
+        que identificam cada série. Com `resolution`, retorna um valor por intervalo (veja `read`).
+        """
+        frames = []
+        for _, entry in self.find(framework, exp_id, load, instances, kind, metric, repetition).iterrows():
+            df = self.read(entry, start, end, resolution, aggregation)
+            for column in ['framework', 'exp_id', 'load', 'instances', 'kind', 'metric', 'repetition']:
+                df.insert(len(df.columns) - 3, column, entry[column])
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=['framework', 'exp_id', 'load', 'instances', 'kind', 'metric', 'repetition', 'labels', 'timestamp', 'value'])
+        return pd.concat(frames, ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Consulta os resultados de experimentos.')
+    parser.add_argument('root', help='Diretório com os resultados (ex: ../results).')
+    parser.add_argument('--framework', type=str, help='Framework (ex: kstreams, spark).')
+    parser.add_argument('--exp-id', type=str, help='ID do experimento.')
+    parser.add_argument('--load', type=int, help='Carga (registros por segundo).')
+    parser.add_argument('--instances', type=int, help='Número de instâncias.')
+    parser.add_argument('--metric', type=str, help="Métrica ou padrão (ex: 'latency_p99_*').")
+    parser.add_argument('--repetition', type=int, help='Repetição.')
+    parser.add_argument('--start', type=float, help='Timestamp Unix inicial.')
+    parser.add_argument('--end', type=float, help='Timestamp Unix final.')
+    parser.add_argument('--resolution', type=int, help='Agrega os valores em intervalos desta duração (segundos).')
+    parser.add_argument('--aggregation', type=str, default='mean', choices=results_store.AGGREGATIONS, help='Agregação por intervalo.')
+    parser.add_argument('--list', action='store_true', help='Lista as séries encontradas em vez de seus valores.')
+    args = parser.parse_args()
+
+    catalog = ResultsCatalog(args.root)
+    filters = dict(framework=args.framework, exp_id=args.exp_id, load=args.load, instances=args.instances, metric=args.metric, repetition=args.repetition)
+    if args.list:
+        print(catalog.find(**filters).to_string(index=False))
+    else:
+        print(catalog.query(**filters, start=args.start, end=args.end, resolution=args.resolution, aggregation=args.aggregation).to_csv(index=False), end='')
+
+if __name__ == '__main__':
+    main()
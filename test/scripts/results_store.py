@@ -0,0 +1,466 @@
+import argparse
+import fnmatch
+import glob
+import io
+import json
+import mmap
+import os
+import re
+import numpy as np
+import pandas as pd
+
+# --- ARMAZENAMENTO COLUNAR DOS RESULTADOS DE UM EXPERIMENTO ---
+#
+# Formato do arquivo: MAGIC, tamanho do cabeçalho (uint64), cabeçalho JSON e os blocos de dados,
+# alinhados em 8 bytes. O cabeçalho contém o dicionário de labels e, para cada CSV (partição),
+# as séries com o código do label, o número de amostras e a posição dos arrays de timestamps e
+# valores. Timestamps regulares são guardados só como início e passo; os demais como deslocamentos
+# inteiros em relação ao início, marcados com `sorted: false` se não forem crescentes. Os arrays
+# são lidos por memory mapping, sem cópia.
+
+MAGIC = b'SBRESULTS1\n'
+STORE_FILENAME = 'results.colstore'
+FORMAT_VERSION = 1
+
+# Resoluções (segundos) das agregações pré-calculadas de cada série, com soma, contagem, mínimo e
+# máximo por intervalo. Intervalos são alinhados a múltiplos da resolução, como no `resample`.
+ROLLUP_RESOLUTIONS = (10, 60, 300)
+AGGREGATIONS = ('mean', 'min', 'max', 'sum', 'count')
+
+# exp<id>_<carga>_<instâncias>_generic_<métrica>_<repetição>.csv e ..._lag-trend_<slo>_<repetição>.csv
+SERIES_FILENAME_PATTERN = re.compile(r'^exp(\d+)_(\d+)_(\d+)_(generic|lag-trend)_(.+)_(\d+)\.csv$')
+
+def parse_series_filename(filename):
+    """Retorna (exp_id, carga, instâncias, tipo, métrica, repetição) ou None para outros arquivos."""
+    match = SERIES_FILENAME_PATTERN.match(filename)
+    if match is None:
+        return None
+    exp_id, load, instances, kind, metric, repetition = match.groups()
+    return exp_id, int(load), int(instances), kind, metric, int(repetition)
+
+def _timestamp_encoding(timestamps):
+    """
+    Escolhe a representação mais compacta dos timestamps de uma série. Séries fora de ordem
+    (passos negativos) são marcadas, pois a janela de tempo não pode ser buscada nelas.
+    """
+    if len(timestamps) == 0:
+        return {'start': 0, 'step': 0}, None
+    start = timestamps[0]
+    steps = np.diff(timestamps)
+    if len(steps) == 0 or (steps[0] >= 0 and (steps == steps[0]).all()):
+        return {'start': float(start), 'step': float(steps[0]) if len(steps) else 0.0}, None
+    order = {} if (steps >= 0).all() else {'sorted': False}
+    if (timestamps == np.floor(timestamps)).all():
+        offsets = timestamps - start
+        for dtype in (np.uint16, np.uint32, np.int64):
+            if offsets.min() >= np.iinfo(dtype).min and offsets.max() <= np.iinfo(dtype).max:
+                return {'start': float(start), 'dtype': np.dtype(dtype).str, **order}, offsets.astype(dtype)
+    return {'start': 0.0, 'dtype': np.dtype(np.float64).str, **order}, timestamps
+
+def _buckets(times, resolution, sums, counts, mins, maxs):
+    """
+    Agrega pontos (amostras ou intervalos já agregados) em intervalos de `resolution` segundos.
+    Retorna o índice do primeiro intervalo (em múltiplos da resolução) e somas, contagens, mínimos
+    e máximos de todos os intervalos a partir dele, inclusive os vazios (contagem 0, mínimo NaN).
+    """
+    if len(times) == 0:
+        return 0, np.empty(0), np.empty(0), np.empty(0), np.empty(0)
+    bucket = np.floor(times / resolution)
+    first = bucket.min()
+    index = (bucket - first).astype(np.int64)
+    size = int(index.max()) + 1
+    bucket_mins = np.full(size, np.nan)
+    bucket_maxs = np.full(size, np.nan)
+    np.fmin.at(bucket_mins, index, mins)
+    np.fmax.at(bucket_maxs, index, maxs)
+    return int(first), np.bincount(index, sums, size), np.bincount(index, counts, size), bucket_mins, bucket_maxs
+
+def rollup(timestamps, values, resolution):
+    """Agrega as amostras de uma série em intervalos de `resolution` segundos (NaNs são ignorados)."""
+    valid = ~np.isnan(values)
+    return _buckets(timestamps, resolution, np.where(valid, values, 0.0), valid.astype(np.float64), values, values)
+
+def rollup_values(rollup_arrays, aggregation):
+    """Valor de cada intervalo de um rollup para uma das AGGREGATIONS."""
+    _, sums, counts, mins, maxs = rollup_arrays
+    if aggregation == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / counts, np.nan)
+    if aggregation in ('min', 'max', 'sum', 'count'):
+        return {'min': mins, 'max': maxs, 'sum': sums, 'count': counts}[aggregation]
+    raise ValueError(f'Agregação inválida: {aggregation}. Use uma de {", ".join(AGGREGATIONS)}.')
+
+def _regular_bounds(first_timestamp, step, count, start, end):
+    """
+    Índices [primeiro, último) das amostras de uma série regular dentro de [start, end]. Com passo
+    negativo (timestamps decrescentes), os papéis de `start` e `end` se invertem.
+    """
+    first, last = 0, count
+    if step > 0:
+        if start is not None:
+            first = int(np.clip(np.ceil((start - first_timestamp) / step), 0, count))
+        if end is not None:
+            last = int(np.clip(np.floor((end - first_timestamp) / step) + 1, 0, count))
+    elif step < 0:
+        if end is not None:
+            first = int(np.clip(np.ceil((end - first_timestamp) / step), 0, count))
+        if start is not None:
+            last = int(np.clip(np.floor((start - first_timestamp) / step) + 1, 0, count))
+    elif count > 0 and ((start is not None and first_timestamp < start) or (end is not None and first_timestamp > end)):
+        last = 0
+    return first, max(first, last)
+
+def _read_series_csv(path):
+    """Lê o CSV de uma série com os tipos usados no arquivo colunar."""
+    return pd.read_csv(path, dtype={'labels': str, 'timestamp': np.float64, 'value': np.float64}, keep_default_na=False, na_values={'timestamp': ['NaN'], 'value': ['NaN']})
+
+def pack(directory, output=None):
+    """
+    Empacota os CSVs e os arquivos JSON de um diretório de resultados em um único arquivo. Se o
+    arquivo já existir, as partições e arquivos que não estão mais no diretório (por exemplo,
+    removidos com `--remove-csv`) são mantidos; os do diretório substituem os empacotados antes.
+    O arquivo é escrito com outro nome e renomeado no fim, para nunca ficar incompleto.
+    """
+    output = output or os.path.join(directory, STORE_FILENAME)
+    labels, label_codes = [], {}
+    partitions, files, blocks = [], {}, []
+    offset = 0
+
+    def label_code(label):
+        if label not in label_codes:
+            label_codes[label] = len(labels)
+            labels.append(label)
+        return label_codes[label]
+
+    def add_block(array):
+        nonlocal offset
+        data = np.ascontiguousarray(array).tobytes()
+        block_offset = offset
+        padding = -len(data) % 8
+        blocks.append(data + b'\0' * padding)
+        offset += len(data) + padding
+        return block_offset
+
+    for path in sorted(glob.glob(os.path.join(directory, '*'))):
+        filename = os.path.basename(path)
+        run = parse_series_filename(filename)
+        if run is None:
+            if filename.endswith(('.csv', '.json')):
+                with open(path) as other_file:
+                    files[filename] = other_file.read()
+            continue
+        exp_id, load, instances, kind, metric, repetition = run
+        df = _read_series_csv(path)
+        series = []
+        # As amostras de cada label são contíguas nos CSVs exportados pelo Theodolite
+        for label, rows in df.groupby('labels', sort=False):
+            timestamps = rows['timestamp'].to_numpy()
+            encoding, encoded_timestamps = _timestamp_encoding(timestamps)
+            if encoded_timestamps is not None:
+                encoding['offset'] = add_block(encoded_timestamps)
+            values = rows['value'].to_numpy(dtype=np.float64)
+            rollups = {}
+            for resolution in ROLLUP_RESOLUTIONS:
+                first, sums, counts, mins, maxs = rollup(timestamps, values, resolution)
+                rollups[str(resolution)] = {'first': first, 'count': len(sums), 'offset': add_block(np.concatenate((sums, counts, mins, maxs)))}
+            series.append({'label': label_code(label), 'count': len(rows), 'timestamps': encoding,
+                           'values': add_block(values), 'rollups': rollups})
+        partitions.append({'filename': filename, 'exp_id': exp_id, 'load': load, 'instances': instances,
+                           'kind': kind, 'metric': metric, 'repetition': repetition, 'series': series})
+
+    if os.path.exists(output):
+        packed_filenames = {partition['filename'] for partition in partitions} | set(files)
+        with ResultsStore(output) as old_store:
+            for partition in old_store.partitions:
+                if partition['filename'] not in packed_filenames:
+                    series = [_copy_series(old_store, series, label_code(old_store.labels[series['label']]), add_block)
+                              for series in partition['series']]
+                    partitions.append(dict(partition, series=series))
+            for filename, content in old_store.files.items():
+                files.setdefault(filename, content)
+        partitions.sort(key=lambda partition: partition['filename'])
+
+    header = json.dumps({'version': FORMAT_VERSION, 'labels': labels, 'partitions': partitions, 'files': files}).encode()
+    header += b' ' * (-(len(MAGIC) + 8 + len(header)) % 8)
+    temp_output = f'{output}.tmp'
+    with open(temp_output, 'wb') as store_file:
+        store_file.write(MAGIC)
+        store_file.write(np.uint64(len(header)).tobytes())
+        store_file.write(header)
+        for block in blocks:
+            store_file.write(block)
+    os.replace(temp_output, output)
+    return output
+
+def _copy_series(store, series, label, add_block):
+    """Copia os blocos de uma série de outro arquivo colunar, com o novo código do label."""
+    count, encoding = series['count'], dict(series['timestamps'])
+    if 'offset' in encoding:
+        encoding['offset'] = add_block(store._array(encoding['offset'], np.dtype(encoding['dtype']), count))
+    rollups = {resolution: dict(stored_rollup, offset=add_block(store._array(stored_rollup['offset'], np.float64, 4 * stored_rollup['count'])))
+               for resolution, stored_rollup in series.get('rollups', {}).items()}
+    return dict(series, label=label, timestamps=encoding, values=add_block(store._array(series['values'], np.float64, count)), rollups=rollups)
+
+def verify(directory, store):
+    """
+    Compara os arquivos de um diretório com os empacotados em `store` e retorna os nomes dos que
+    foram empacotados corretamente: mesmas séries, número de amostras, timestamps e valores (NaNs
+    inclusive) nos CSVs de séries e mesmo conteúdo nos demais arquivos.
+    """
+    verified = []
+    for filename in store.filenames():
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            continue
+        if filename in store.files:
+            with open(path) as other_file:
+                if other_file.read() == store.files[filename]:
+                    verified.append(filename)
+            continue
+        expected = [(label, rows['timestamp'].to_numpy(), rows['value'].to_numpy(dtype=np.float64))
+                    for label, rows in _read_series_csv(path).groupby('labels', sort=False)]
+        actual = list(store.series(filename))
+        if len(expected) == len(actual) and all(
+                expected_label == label and len(expected_values) == len(values)
+                and np.allclose(expected_timestamps, timestamps, rtol=0, atol=1e-6)
+                and np.array_equal(expected_values, values, equal_nan=True)
+                for (expected_label, expected_timestamps, expected_values), (label, timestamps, values) in zip(expected, actual)):
+            verified.append(filename)
+    return verified
+
+class ResultsStore:
+    """Leitura de um arquivo gerado por `pack`, com os arrays mapeados em memória."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as store_file:
+            self._mmap = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} não é um arquivo de resultados.')
+        header_size = int(np.frombuffer(self._mmap, np.uint64, 1, len(MAGIC))[0])
+        header = json.loads(self._mmap[len(MAGIC) + 8:len(MAGIC) + 8 + header_size])
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f'Versão {header["version"]} do formato não suportada.')
+        self._data_offset = len(MAGIC) + 8 + header_size
+        self.labels = header['labels']
+        self.partitions = header['partitions']
+        self.files = header['files']
+        self._by_filename = {partition['filename']: partition for partition in self.partitions}
+
+    def close(self):
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass # ainda há arrays apontando para o mapeamento, que é liberado junto com eles
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def filenames(self):
+        return list(self._by_filename) + list(self.files)
+
+    def find(self, load=None, instances=None, kind=None, metric=None, repetition=None):
+        """Retorna as partições que correspondem a todos os critérios informados."""
+        criteria = {'load': load, 'instances': instances, 'kind': kind, 'metric': metric, 'repetition': repetition}
+        return [partition for partition in self.partitions
+                if all(value is None or partition[key] == value for key, value in criteria.items())]
+
+    def _array(self, offset, dtype, count):
+        return np.frombuffer(self._mmap, dtype, count, self._data_offset + offset)
+
+    def series(self, partition, start=None, end=None):
+        """
+        Gera (label, timestamps, valores) para cada série de uma partição; os valores não são copiados.
+        Com `start`/`end` (timestamps Unix, inclusivos), só o intervalo pedido é lido: o início e o
+        fim são calculados a partir do passo ou por busca binária, sem materializar a série inteira.
+        Séries empacotadas fora de ordem são filtradas amostra a amostra (e os valores, copiados).
+        """
+        if isinstance(partition, str):
+            partition = self._by_filename[partition]
+        for series in partition['series']:
+            count, encoding = series['count'], series['timestamps']
+            if not encoding.get('sorted', True) and (start is not None or end is not None):
+                timestamps = encoding['start'] + self._array(encoding['offset'], np.dtype(encoding['dtype']), count).astype(np.float64)
+                window = np.ones(count, dtype=bool)
+                if start is not None:
+                    window &= timestamps >= start
+                if end is not None:
+                    window &= timestamps <= end
+                yield self.labels[series['label']], timestamps[window], self._array(series['values'], np.float64, count)[window]
+                continue
+            if 'offset' in encoding:
+                offsets = self._array(encoding['offset'], np.dtype(encoding['dtype']), count)
+                first = 0 if start is None else int(np.searchsorted(offsets, start - encoding['start'], side='left'))
+                last = count if end is None else int(np.searchsorted(offsets, end - encoding['start'], side='right'))
+                last = max(first, last)
+                timestamps = encoding['start'] + offsets[first:last].astype(np.float64)
+            else:
+                first, last = _regular_bounds(encoding['start'], encoding['step'], count, start, end)
+                timestamps = encoding['start'] + encoding['step'] * np.arange(first, last, dtype=np.float64)
+            yield self.labels[series['label']], timestamps, self._array(series['values'], np.float64, count)[first:last]
+
+    def rollups(self, partition, resolution, start=None, end=None):
+        """
+        Gera (label, rollup) para cada série de uma partição em intervalos de `resolution` segundos,
+        no formato de `rollup`. Usa o maior rollup pré-calculado do qual a resolução é múltipla e
+        recorre às amostras só se não houver nenhum. A janela [start, end] é aplicada por intervalo.
+        """
+        if isinstance(partition, str):
+            partition = self._by_filename[partition]
+        window_start = None if start is None else np.floor(start / resolution) * resolution
+        for series, (label, timestamps, values) in zip(partition['series'], self.series(partition, window_start, end)):
+            stored = [int(level) for level in series.get('rollups', {}) if resolution % int(level) == 0]
+            if not stored:
+                yield label, rollup(timestamps, values, resolution)
+                continue
+            level = max(stored)
+            stored_rollup = series['rollups'][str(level)]
+            size = stored_rollup['count']
+            sums, counts, mins, maxs = self._array(stored_rollup['offset'], np.float64, 4 * size).reshape(4, size)
+            first, last = _regular_bounds(stored_rollup['first'] * level, level, size, window_start, end)
+            times = (stored_rollup['first'] + np.arange(first, last)) * float(level)
+            yield label, _buckets(times, resolution, sums[first:last], counts[first:last], mins[first:last], maxs[first:last])
+
+    def read(self, partition, start=None, end=None, resolution=None, aggregation='mean'):
+        """
+        Retorna uma partição como o DataFrame (labels, timestamp, value) do CSV original. Com
+        `resolution`, retorna um valor por intervalo de `resolution` segundos, agregado por
+        `aggregation` (mean, min, max, sum ou count), a partir dos rollups pré-calculados.
+        """
+        if resolution is not None:
+            return _rollup_frame(self.rollups(partition, resolution, start, end), resolution, aggregation)
+        all_series = list(self.series(partition, start, end))
+        if not all_series:
+            return pd.DataFrame({'labels': pd.Series(dtype=str), 'timestamp': pd.Series(dtype=np.int64), 'value': pd.Series(dtype=np.float64)})
+        codes = np.concatenate([np.full(len(timestamps), index) for index, (_, timestamps, _) in enumerate(all_series)])
+        timestamps = np.concatenate([timestamps for _, timestamps, _ in all_series])
+        return pd.DataFrame({
+            # Os labels são referências às strings do dicionário, sem uma cópia por linha
+            'labels': np.array([label for label, _, _ in all_series], dtype=object)[codes],
+            'timestamp': timestamps.astype(np.int64) if (timestamps == np.floor(timestamps)).all() else timestamps,
+            'value': np.concatenate([values for _, _, values in all_series])})
+
+def _rollup_frame(rollups, resolution, aggregation):
+    """Monta o DataFrame (labels, timestamp, value) de uma sequência de (label, rollup)."""
+    frames = []
+    for label, rollup_arrays in rollups:
+        first, sums = rollup_arrays[0], rollup_arrays[1]
+        frames.append(pd.DataFrame({'labels': label, 'timestamp': (first + np.arange(len(sums))) * resolution,
+                                    'value': rollup_values(rollup_arrays, aggregation)}))
+    if not frames:
+        return pd.DataFrame({'labels': pd.Series(dtype=str), 'timestamp': pd.Series(dtype=np.int64), 'value': pd.Series(dtype=np.float64)})
+    return pd.concat(frames, ignore_index=True)
+
+def downsample(df, resolution, aggregation='mean'):
+    """Agrega um DataFrame (labels, timestamp, value) em intervalos de `resolution` segundos por label."""
+    groups = df.groupby('labels', sort=False) if 'labels' in df.columns else [(None, df)]
+    return _rollup_frame(((label, rollup(rows['timestamp'].to_numpy(dtype=np.float64), rows['value'].to_numpy(dtype=np.float64), resolution))
+                          for label, rows in groups), resolution, aggregation)
+
+_open_stores = {}
+
+def open_store(directory):
+    """Retorna o arquivo colunar de um diretório (None se não houver), reaproveitando o mapeamento."""
+    store_path = os.path.join(directory, STORE_FILENAME)
+    try:
+        mtime = os.stat(store_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    store = _open_stores.get(store_path)
+    if store is None or store.mtime != mtime:
+        store = _open_stores[store_path] = ResultsStore(store_path)
+        store.mtime = mtime
+    return store
+
+def exists(filepath):
+    """Como `os.path.exists`, mas também considera os arquivos empacotados."""
+    if os.path.exists(filepath):
+        return True
+    store = open_store(os.path.dirname(filepath))
+    return store is not None and os.path.basename(filepath) in store.filenames()
+
+def glob_files(pattern):
+    """Como `glob.glob`, mas também retorna os arquivos empacotados que correspondem ao padrão."""
+    files = set(glob.glob(pattern))
+    store = open_store(os.path.dirname(pattern))
+    if store is not None:
+        files.update(os.path.join(os.path.dirname(pattern), filename)
+                     for filename in fnmatch.filter(store.filenames(), os.path.basename(pattern)))
+    return sorted(files)
+
+_frame_cache = None
+
+def cache_frames(enabled=True):
+    """
+    Ativa (ou desativa e esvazia) o cache de `read_csv` no processo atual, para gerar vários
+    gráficos dos mesmos resultados sem ler e converter as mesmas séries de novo. O cache guarda
+    cada arquivo inteiro, sem janela nem agregação, que são aplicadas a cada leitura.
+    """
+    global _frame_cache
+    _frame_cache = {} if enabled else None
+
+def read_csv(filepath, start=None, end=None, resolution=None, aggregation='mean'):
+    """
+    Lê um CSV de resultados. Se o arquivo não existir, mas o diretório tiver sido empacotado com
+    `pack`, a partição correspondente é lida do arquivo colunar. `start`/`end` (timestamps Unix)
+    restringem a janela de tempo e `resolution` agrega os valores em intervalos (veja
+    `ResultsStore.read`); no arquivo colunar, ambos são aplicados antes de materializar a série.
+    Com `cache_frames` ativo, cada arquivo é lido uma única vez, inteiro, e a janela e a agregação
+    são aplicadas às amostras em memória, como nos CSVs; leituras do mesmo arquivo com janelas ou
+    resoluções diferentes (ex: o início do experimento e o trecho exibido) usam a mesma cópia.
+    """
+    if _frame_cache is None:
+        return _read_csv(filepath, start, end, resolution, aggregation)
+    key = os.path.abspath(filepath)
+    if key not in _frame_cache:
+        _frame_cache[key] = _read_csv(filepath, None, None, None, aggregation)
+    df = _window(_frame_cache[key], start, end, resolution, aggregation)
+    return df.copy() if df is _frame_cache[key] else df
+
+def _read_csv(filepath, start, end, resolution, aggregation):
+    store = None if os.path.exists(filepath) else open_store(os.path.dirname(filepath))
+    filename = os.path.basename(filepath)
+    if store is not None and filename in store.filenames() and filename not in store.files:
+        return store.read(filename, start, end, resolution, aggregation)
+    if store is not None and filename in store.files:
+        return pd.read_csv(io.StringIO(store.files[filename]))
+    if store is not None:
+        raise FileNotFoundError(filepath)
+    return _window(pd.read_csv(filepath), start, end, resolution, aggregation)
+
+def _window(df, start, end, resolution, aggregation):
+    """Restringe um DataFrame (labels, timestamp, value) à janela [start, end] e o agrega."""
+    if 'timestamp' not in df.columns:
+        return df
+    if start is not None:
+        df = df.loc[df['timestamp'] >= (start if resolution is None else np.floor(start / resolution) * resolution)]
+    if end is not None:
+        df = df.loc[df['timestamp'] <= end]
+    if resolution is not None:
+        return downsample(df, resolution, aggregation)
+    return df.reset_index(drop=True) if start is not None or end is not None else df
+
+def main():
+    parser = argparse.ArgumentParser(description='Empacota diretórios de resultados em arquivos colunares.')
+    parser.add_argument('directories', nargs='+', help='Diretórios com os CSVs de resultados.')
+    parser.add_argument('--remove-csv', action='store_true', help='Remove os arquivos empacotados depois de comparar as séries e os valores lidos do arquivo colunar com os originais.')
+    args = parser.parse_args()
+
+    for directory in args.directories:
+        output = pack(directory)
+        with ResultsStore(output) as store:
+            packed = [filename for filename in store.filenames() if os.path.exists(os.path.join(directory, filename))]
+            verified = verify(directory, store) if args.remove_csv else []
+        size = sum(os.path.getsize(os.path.join(directory, filename)) for filename in packed)
+        print(f"{directory}: {len(packed)} arquivos, {size / 1e6:.1f} MB -> {os.path.getsize(output) / 1e6:.1f} MB em {output}")
+        if args.remove_csv:
+            for filename in sorted(set(packed) - set(verified)):
+                print(f"{directory}: {filename} difere do arquivo colunar e não foi removido")
+            for filename in verified:
+                os.remove(os.path.join(directory, filename))
+
+if __name__ == '__main__':
+    main()
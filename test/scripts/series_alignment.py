@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import results_store
+
+# --- ALINHAMENTO DAS SÉRIES POR INSTÂNCIA ---
+
+class AlignedSeries:
+    """
+    Séries de várias instâncias (pods, brokers, ...) alinhadas em uma matriz densa (tempo ×
+    instância) com um valor por intervalo de `resolution` segundos, NaN onde a instância não tem
+    amostras. Todas as visões dos gráficos (média, pivot) derivam desta matriz.
+    """
+
+    def __init__(self, first_bin, resolution, columns, values, starts, ends):
+        self.first_bin = first_bin
+        self.resolution = resolution
+        self.columns = columns
+        self.values = values
+        # Primeira e última linha com amostras de cada instância
+        self.starts = starts
+        self.ends = ends
+
+    @property
+    def timestamps(self):
+        return pd.to_datetime((self.first_bin + np.arange(len(self.values))) * self.resolution, unit='s')
+
+    def mean(self):
+        """
+        Média entre as instâncias por intervalo, restrita aos intervalos em que ao menos uma
+        instância tem dados (como reamostrar cada instância e concatená-las).
+        """
+        rows = np.arange(len(self.values))
+        covered = ((rows[:, None] >= self.starts) & (rows[:, None] <= self.ends)).any(axis=1)
+        valid = ~np.isnan(self.values[covered])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, self.values[covered], 0.0).sum(axis=1) / valid.sum(axis=1)
+        return pd.DataFrame({'timestamp': self.timestamps[covered], 'value': mean})
+
+    def pivot(self, fill=True):
+        """Uma coluna por instância, indexada pelo tempo; com `fill`, lacunas repetem o último valor."""
+        values = _forward_fill(self.values) if fill else self.values
+        pivoted = pd.DataFrame(values, index=self.timestamps, columns=pd.Index(self.columns, name='instance'))
+        pivoted.index.name = 'timestamp'
+        return pivoted
+
+def _forward_fill(values):
+    rows = np.arange(len(values))[:, None]
+    last_valid = np.maximum.accumulate(np.where(np.isnan(values), -1, rows), axis=0)
+    filled = values[np.maximum(last_valid, 0), np.arange(values.shape[1])]
+    filled[last_valid < 0] = np.nan
+    return filled
+
+def align(timestamps, values, keys, resolution=1, average_duplicates=False):
+    """
+    Alinha amostras (timestamps Unix, valores e a instância de cada uma) em um `AlignedSeries`.
+    O valor de um intervalo é a média das amostras da instância nele; com `average_duplicates`,
+    amostras da mesma instância no mesmo timestamp (ex: de repetições diferentes) são primeiro
+    reduzidas à sua média, como em um `pivot_table` seguido de `resample`. Amostras NaN são ignoradas.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    timestamps, values = timestamps[valid], values[valid]
+    if len(values) == 0:
+        return None
+    column, columns = pd.factorize(np.asarray(keys, dtype=object)[valid], sort=True)
+    if average_duplicates:
+        order = np.lexsort((timestamps, column))
+        column, timestamps, values = column[order], timestamps[order], values[order]
+        first = np.concatenate(([True], (column[1:] != column[:-1]) | (timestamps[1:] != timestamps[:-1])))
+        sample = np.cumsum(first) - 1
+        values = np.bincount(sample, values) / np.bincount(sample)
+        column, timestamps = column[first], timestamps[first]
+    bins = np.floor(timestamps / resolution).astype(np.int64)
+    first_bin = int(bins.min())
+    row = bins - first_bin
+    shape = (int(row.max()) + 1, len(columns))
+    cell = row * shape[1] + column
+    counts = np.bincount(cell, minlength=shape[0] * shape[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        matrix = (np.bincount(cell, values, shape[0] * shape[1]) / counts).reshape(shape)
+    starts = np.full(shape[1], shape[0])
+    ends = np.full(shape[1], -1)
+    np.minimum.at(starts, column, row)
+    np.maximum.at(ends, column, row)
+    return AlignedSeries(first_bin, resolution, list(columns), matrix, starts, ends)
+
+_loaded_metrics = {}
+
+def load_metric(file_pattern, start=None, end=None, resolution=None):
+    """
+    Lê de uma só vez todos os arquivos de um padrão (CSVs ou arquivos empacotados) e retorna um
+    DataFrame com as colunas file, labels, timestamp e value, ou None se nada for encontrado.
+    Cada combinação de padrão e janela é lida uma única vez por processo.
+    """
+    key = (file_pattern, start, end, resolution)
+    if key not in _loaded_metrics:
+        frames = []
+        for file_path in sorted(results_store.glob_files(file_pattern)):
+            try:
+                df = results_store.read_csv(file_path, start, end, resolution)
+                if 'timestamp' not in df.columns or 'value' not in df.columns:
+                    continue
+                frames.append(pd.DataFrame({'file': file_path, 'labels': df['labels'] if 'labels' in df.columns else '',
+                                            'timestamp': df['timestamp'], 'value': pd.to_numeric(df['value'], errors='coerce')}))
+            except Exception as e:
+                print(f"Erro ao processar {file_path}: {e}")
+        _loaded_metrics[key] = pd.concat(frames, ignore_index=True) if frames else None
+    return _loaded_metrics[key]